@@ -20,6 +20,10 @@ To run in open-source:
 
   python examples/openml_cc18_benchmark.py
 
+To run as several smaller pipelines, e.g. on Kubeflow:
+
+  python examples/openml_cc18_benchmark.py --max_components_per_shard=100
+
 """  # pylint: disable=line-too-long
 # pyformat: enable
 # pylint: disable=g-import-not-at-top
@@ -48,18 +52,20 @@ class OpenMLCC18Benchmark(nitroml.Benchmark):
                 use_keras: bool = True,
                 enable_tuning: bool = True):
 
-    for i, task in enumerate(
-        nitroml.suites.OpenMLCC18(data_dir, mock_data=mock_data)):
-
-      if not mock_data and i not in range(20, 40):
-        # Use only 20 of the datasets for now.
-        # TODO(nikhilmehta): Create subbenchmarks for all 72 tasks.
-        # Kubeflow throws a "Max work worflow size error" when pipeline contains
-        # too many components.
-        # Track issue: https://github.com/kubeflow/pipelines/issues/4170
-        continue
-
-      with self.sub_benchmark(task.name):
+    # Kubeflow throws a "Max work worflow size error" when a pipeline contains
+    # too many components, so run the full suite with `--num_shards` or
+    # `--max_components_per_shard` on Kubeflow.
+    # Track issue: https://github.com/kubeflow/pipelines/issues/4170
+    # Only the datasets of the tasks which may match `--match` are downloaded
+    # when `--lazy_match` is set.
+    for task in nitroml.suites.OpenMLCC18(
+        data_dir,
+        mock_data=mock_data,
+        task_filter=self.matches_sub_benchmark):
+
+      with self.sub_benchmark(task.name) as matched:
+        if not matched:
+          continue
 
         autodata = nitroml.autodata.AutoData(
             task.problem_statement,
@@ -15,17 +15,39 @@
 # Lint as: python3
 """Package nitroml."""
 
-from nitroml import autodata
-from nitroml import results
-from nitroml import suites
-from nitroml import tasks
-from nitroml.nitroml import Benchmark
-from nitroml.nitroml import get_default_kubeflow_dag_runner
-from nitroml.nitroml import main
-from nitroml.nitroml import run
+import typing
+
+from nitroml import _lazy
+
+if typing.TYPE_CHECKING:
+  from nitroml import analysis
+  from nitroml import autodata
+  from nitroml import orchestration
+  from nitroml import results
+  from nitroml import suites
+  from nitroml import tasks
+  from nitroml.nitroml import Benchmark
+  from nitroml.nitroml import get_default_kubeflow_dag_runner
+  from nitroml.nitroml import main
+  from nitroml.nitroml import run
+
+__getattr__, __dir__ = _lazy.attach(__name__, {
+    "analysis": "nitroml.analysis",
+    "autodata": "nitroml.autodata",
+    "orchestration": "nitroml.orchestration",
+    "results": "nitroml.results",
+    "suites": "nitroml.suites",
+    "tasks": "nitroml.tasks",
+    "Benchmark": "nitroml.nitroml",
+    "get_default_kubeflow_dag_runner": "nitroml.nitroml",
+    "main": "nitroml.nitroml",
+    "run": "nitroml.nitroml",
+})
 
 __all__ = [
+    "analysis",
     "autodata",
+    "orchestration",
     "suites",
     "tasks",
     "Benchmark",
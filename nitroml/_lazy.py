@@ -0,0 +1,62 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+# Lint as: python3
+"""Lazy loading of package attributes.
+
+Importing the TF stack takes several seconds, which every containerized
+component and every script that only reads results would otherwise pay. Package
+`__init__` modules use `attach` so that their submodules and exported names are
+only imported when they are first accessed.
+"""
+
+import importlib
+from typing import Any, Callable, Dict, List, Text, Tuple
+
+
+def attach(
+    package_name: Text, attributes: Dict[Text, Text]
+) -> Tuple[Callable[[Text], Any], Callable[[], List[Text]]]:
+  """Returns module-level `__getattr__` and `__dir__` functions for a package.
+
+  Args:
+    package_name: The `__name__` of the package.
+    attributes: A dict mapping each lazily loaded attribute name to the module
+      which defines it. Submodules of the package map to themselves, e.g.
+      `{"results": "nitroml.results", "run": "nitroml.nitroml"}`.
+
+  Returns:
+    A (`__getattr__`, `__dir__`) tuple to assign at the package level, as
+    described in PEP 562.
+  """
+
+  def __getattr__(name: Text) -> Any:  # pylint: disable=invalid-name
+    if name not in attributes:
+      raise AttributeError(
+          f"module {package_name!r} has no attribute {name!r}")
+    module_name = attributes[name]
+    module = importlib.import_module(module_name)
+    if module_name == f"{package_name}.{name}":
+      value = module
+    else:
+      value = getattr(module, name)
+    # Cache the attribute, so that __getattr__ is only called once.
+    setattr(importlib.import_module(package_name), name, value)
+    return value
+
+  def __dir__() -> List[Text]:  # pylint: disable=invalid-name
+    package = importlib.import_module(package_name)
+    return sorted(set(vars(package)) | set(attributes))
+
+  return __getattr__, __dir__
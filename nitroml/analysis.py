@@ -0,0 +1,300 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+# Lint as: python3
+"""Vectorized statistical comparison of NitroML benchmark results.
+
+The functions below take the DataFrame returned by `nitroml.results.overview`
+without aggregation, where each row is one repetition of a pipeline on a task,
+and compare pipelines across tasks. Every statistic is computed with array
+operations over all the groups at once rather than by looping over them, so
+thousands of task x pipeline x repetition cells take seconds.
+
+Example:
+
+  df = analysis.split_benchmark(results.overview(store))
+  print(analysis.average_ranks(df, 'accuracy'))
+  print(analysis.paired_tests(df, 'accuracy'))
+
+See Demšar, "Statistical Comparisons of Classifiers over Multiple Data Sets",
+JMLR 2006, for the methodology.
+"""
+
+import itertools
+from typing import NamedTuple, Optional, Sequence, Text
+
+from nitroml import results
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# Column name constants
+PIPELINE_KEY = 'pipeline'
+TASK_KEY = 'task'
+
+# Critical values of the two-tailed Nemenyi test by number of pipelines, i.e.
+# the studentized range statistic divided by sqrt(2). See Table 5 of Demšar.
+_NEMENYI_CRITICAL_VALUES = {
+    0.05: (1.960, 2.343, 2.569, 2.728, 2.850, 2.949, 3.031, 3.102, 3.164),
+    0.10: (1.645, 2.052, 2.291, 2.459, 2.589, 2.693, 2.780, 2.855, 2.920),
+}
+
+
+class CriticalDifference(NamedTuple):
+  """Result of the Friedman test followed by the Nemenyi post-hoc test."""
+  average_ranks: pd.Series
+  critical_difference: float
+  friedman_statistic: float
+  friedman_p_value: float
+  num_tasks: int
+
+
+def split_benchmark(df: pd.DataFrame) -> pd.DataFrame:
+  """Returns `df` with pipeline and task columns split from benchmark names.
+
+  A benchmark named `<Benchmark>.benchmark.<sub-benchmark>` is the pipeline
+  `<Benchmark>` run on the task `<sub-benchmark>`, e.g. an OpenML task.
+
+  Args:
+    df: A DataFrame returned by `nitroml.results.overview`.
+
+  Returns:
+    A copy of `df` with the additional `pipeline` and `task` columns.
+  """
+  df = df.copy()
+  parts = df[results.BENCHMARK_KEY].str.extract(
+      r'^(?P<pipeline>.*?)\.benchmark(?:\.(?P<task>.*))?$')
+  df[PIPELINE_KEY] = parts['pipeline'].fillna(df[results.BENCHMARK_KEY])
+  df[TASK_KEY] = parts['task'].fillna('')
+  return df
+
+
+def _task_by_pipeline(df: pd.DataFrame, metric: Text, pipeline_column: Text,
+                      task_column: Text) -> pd.DataFrame:
+  """Returns the mean of `metric` over repetitions, by task and pipeline."""
+  return df.groupby([task_column, pipeline_column])[metric].mean().unstack()
+
+
+def bootstrap_ci(df: pd.DataFrame,
+                 metric: Text,
+                 groupby: Sequence[Text] = (PIPELINE_KEY, TASK_KEY),
+                 num_samples: int = 1000,
+                 confidence: float = .95,
+                 seed: Optional[int] = None) -> pd.DataFrame:
+  """Returns bootstrap confidence intervals of the mean of `metric`.
+
+  All the groups are resampled at once: their values are padded into a single
+  array, from which `num_samples` resamples of each group are drawn.
+
+  Args:
+    df: A DataFrame returned by `nitroml.results.overview`.
+    metric: The name of the metric column.
+    groupby: The columns whose values identify a group, e.g. its pipeline and
+      task.
+    num_samples: The number of bootstrap resamples of each group.
+    confidence: The confidence level of the percentile intervals.
+    seed: Optional seed of the random generator.
+
+  Returns:
+    A DataFrame indexed by group, with the `count` of values and their `mean`,
+    and the `lower` and `upper` bounds of the confidence interval.
+
+  Raises:
+    ValueError: If `num_samples` is not strictly positive, or if `confidence`
+      is not in (0, 1).
+  """
+  if num_samples <= 0:
+    raise ValueError('num_samples must be strictly positive; '
+                     f'got num_samples={num_samples} instead.')
+  if not 0 < confidence < 1:
+    raise ValueError('confidence must be in (0, 1); '
+                     f'got confidence={confidence} instead.')
+
+  df = df.dropna(subset=[metric, *groupby])
+  grouped = df.groupby(list(groupby))[metric]
+  group_index = grouped.ngroup().to_numpy()
+  counts = grouped.size()
+  num_groups = len(counts)
+  sizes = counts.to_numpy()
+  # Pad the values of each group into a row of a (groups, max size) array.
+  positions = grouped.cumcount().to_numpy()
+  values = np.full((num_groups, sizes.max(initial=0)), np.nan)
+  values[group_index, positions] = df[metric].to_numpy(dtype=float)
+
+  rng = np.random.default_rng(seed)
+  # Draw indices within each group's size; padded positions are masked out.
+  draws = rng.random((num_groups, num_samples, values.shape[1]))
+  indices = (draws * sizes[:, None, None]).astype(int)
+  resampled = np.take_along_axis(values[:, None, :], indices, axis=2)
+  mask = np.arange(values.shape[1]) < sizes[:, None, None]
+  means = np.where(mask, resampled, 0.).sum(axis=2) / sizes[:, None]
+
+  alpha = (1 - confidence) / 2
+  lower, upper = np.quantile(means, [alpha, 1 - alpha], axis=1)
+  return pd.DataFrame(
+      {
+          'count': sizes,
+          'mean': np.nanmean(values, axis=1),
+          'lower': lower,
+          'upper': upper,
+      },
+      index=counts.index)
+
+
+def average_ranks(df: pd.DataFrame,
+                  metric: Text,
+                  higher_is_better: bool = True,
+                  pipeline_column: Text = PIPELINE_KEY,
+                  task_column: Text = TASK_KEY) -> pd.Series:
+  """Returns the average rank of each pipeline across tasks.
+
+  Pipelines are ranked on each task by their mean `metric` over repetitions,
+  rank 1 being the best, and ties sharing their average rank. Only the tasks
+  on which every pipeline has a result are ranked.
+
+  Args:
+    df: A DataFrame returned by `nitroml.results.overview`.
+    metric: The name of the metric column.
+    higher_is_better: Whether higher values of `metric` are better.
+    pipeline_column: The column identifying pipelines.
+    task_column: The column identifying tasks.
+
+  Returns:
+    A Series of average ranks indexed by pipeline, from best to worst.
+  """
+  scores = _task_by_pipeline(df, metric, pipeline_column, task_column).dropna()
+  ranks = scores.rank(axis=1, ascending=not higher_is_better)
+  return ranks.mean().sort_values()
+
+
+def paired_tests(df: pd.DataFrame,
+                 metric: Text,
+                 pipeline_column: Text = PIPELINE_KEY,
+                 task_column: Text = TASK_KEY) -> pd.DataFrame:
+  """Returns Wilcoxon signed-rank tests between every pair of pipelines.
+
+  Each pair of pipelines is compared on the tasks where both have a result,
+  by their mean `metric` over repetitions. Tasks on which both are tied are
+  discarded. The statistics of all the pairs are computed at once, and the
+  p-values use the normal approximation, which is accurate from about ten
+  tasks.
+
+  Args:
+    df: A DataFrame returned by `nitroml.results.overview`.
+    metric: The name of the metric column.
+    pipeline_column: The column identifying pipelines.
+    task_column: The column identifying tasks.
+
+  Returns:
+    A DataFrame with a row per pair of pipelines `pipeline_a` and `pipeline_b`,
+    with the `num_tasks` both were run on, the `mean_difference` of a minus b,
+    the number of `wins` and `losses` of a against b, the `statistic` W+ of a
+    and the two-sided `p_value`.
+  """
+  scores = _task_by_pipeline(df, metric, pipeline_column, task_column)
+  pipelines = scores.columns.tolist()
+  values = scores.to_numpy(dtype=float)
+  # Differences of every pair of pipelines, of shape (tasks, pairs).
+  pairs = list(itertools.combinations(range(len(pipelines)), 2))
+  first = np.array([i for i, _ in pairs], dtype=int)
+  second = np.array([j for _, j in pairs], dtype=int)
+  diffs = values[:, first] - values[:, second]
+  both = ~np.isnan(diffs)
+  nonzero = both & (diffs != 0)
+
+  # Rank the absolute differences of each pair, the discarded ones last.
+  ranks = stats.rankdata(
+      np.where(nonzero, np.abs(diffs), np.inf), axis=0) * nonzero
+  n = nonzero.sum(axis=0)
+  w_plus = (ranks * (diffs > 0)).sum(axis=0)
+  mean = n * (n + 1) / 4
+  std = np.sqrt(n * (n + 1) * (2 * n + 1) / 24)
+  with np.errstate(divide='ignore', invalid='ignore'):
+    z = (w_plus - mean) / std
+    mean_difference = np.where(both, diffs, 0.).sum(axis=0) / both.sum(axis=0)
+  p_value = np.where(n > 0, 2 * stats.norm.sf(np.abs(z)), np.nan)
+
+  return pd.DataFrame({
+      'pipeline_a': [pipelines[i] for i in first],
+      'pipeline_b': [pipelines[i] for i in second],
+      'num_tasks': both.sum(axis=0),
+      'mean_difference': mean_difference,
+      'wins': (diffs > 0).sum(axis=0),
+      'losses': (diffs < 0).sum(axis=0),
+      'statistic': w_plus,
+      'p_value': p_value,
+  })
+
+
+def _nemenyi_critical_value(num_pipelines: int, alpha: float) -> float:
+  """Returns the critical value of the Nemenyi test."""
+  if alpha not in _NEMENYI_CRITICAL_VALUES:
+    raise ValueError(f'alpha must be one of {sorted(_NEMENYI_CRITICAL_VALUES)}'
+                     f'; got alpha={alpha} instead.')
+  critical_values = _NEMENYI_CRITICAL_VALUES[alpha]
+  if num_pipelines - 2 < len(critical_values):
+    return critical_values[num_pipelines - 2]
+  # The studentized range distribution is only available in recent SciPy.
+  if not hasattr(stats, 'studentized_range'):
+    raise ValueError('The Nemenyi test of more than '
+                     f'{len(critical_values) + 1} pipelines requires '
+                     'scipy.stats.studentized_range (SciPy >= 1.7).')
+  return stats.studentized_range.ppf(1 - alpha, num_pipelines,
+                                     np.inf) / np.sqrt(2)
+
+
+def critical_difference(df: pd.DataFrame,
+                        metric: Text,
+                        alpha: float = .05,
+                        higher_is_better: bool = True,
+                        pipeline_column: Text = PIPELINE_KEY,
+                        task_column: Text = TASK_KEY) -> CriticalDifference:
+  """Returns the Friedman test and the Nemenyi critical difference.
+
+  The performance of two pipelines is significantly different when their
+  average ranks differ by at least the critical difference.
+
+  Args:
+    df: A DataFrame returned by `nitroml.results.overview`.
+    metric: The name of the metric column.
+    alpha: The significance level, either 0.05 or 0.10.
+    higher_is_better: Whether higher values of `metric` are better.
+    pipeline_column: The column identifying pipelines.
+    task_column: The column identifying tasks.
+
+  Returns:
+    A CriticalDifference, computed over the tasks on which every pipeline has a
+    result.
+
+  Raises:
+    ValueError: If there are fewer than two pipelines or no complete task, or
+      if `alpha` is not supported.
+  """
+  scores = _task_by_pipeline(df, metric, pipeline_column, task_column).dropna()
+  num_tasks, num_pipelines = scores.shape
+  if num_pipelines < 2 or not num_tasks:
+    raise ValueError('At least two pipelines with results on a common task '
+                     f'are required; got {num_pipelines} pipelines and '
+                     f'{num_tasks} tasks instead.')
+  critical_value = _nemenyi_critical_value(num_pipelines, alpha)
+  ranks = scores.rank(axis=1, ascending=not higher_is_better).mean()
+  k, n = num_pipelines, num_tasks
+  friedman_statistic = 12 * n / (k * (k + 1)) * (
+      (ranks**2).sum() - k * (k + 1)**2 / 4)
+  return CriticalDifference(
+      average_ranks=ranks.sort_values(),
+      critical_difference=critical_value * np.sqrt(k * (k + 1) / (6 * n)),
+      friedman_statistic=friedman_statistic,
+      friedman_p_value=stats.chi2.sf(friedman_statistic, k - 1),
+      num_tasks=n)
@@ -0,0 +1,151 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+# Lint as: python3
+"""Tests for nitroml.analysis."""
+
+from absl.testing import absltest
+from nitroml import analysis
+from nitroml import results
+import numpy as np
+import pandas as pd
+
+
+def _make_results(num_tasks: int, offsets, num_runs: int = 3, seed: int = 0):
+  """Returns overview-like results of pipelines offset from each other."""
+  rng = np.random.default_rng(seed)
+  rows = []
+  for task in range(num_tasks):
+    difficulty = rng.random()
+    for pipeline, offset in offsets.items():
+      for _ in range(num_runs):
+        rows.append({
+            analysis.PIPELINE_KEY: pipeline,
+            analysis.TASK_KEY: f'task_{task}',
+            'accuracy': difficulty + offset + .01 * rng.standard_normal(),
+        })
+  return pd.DataFrame(rows)
+
+
+class SplitBenchmarkTest(absltest.TestCase):
+
+  def testSplitBenchmark(self):
+    df = pd.DataFrame({
+        results.BENCHMARK_KEY: [
+            'AutoTFX.benchmark.credit_g', 'AutoTFX.benchmark', 'Other'
+        ]
+    })
+
+    df = analysis.split_benchmark(df)
+
+    self.assertEqual(['AutoTFX', 'AutoTFX', 'Other'],
+                     df[analysis.PIPELINE_KEY].tolist())
+    self.assertEqual(['credit_g', '', ''], df[analysis.TASK_KEY].tolist())
+
+
+class BootstrapCITest(absltest.TestCase):
+
+  def testIntervalsContainTheMean(self):
+    df = _make_results(num_tasks=20, offsets={'a': 0., 'b': .1})
+
+    ci = analysis.bootstrap_ci(df, 'accuracy', num_samples=200, seed=0)
+
+    self.assertLen(ci, 40)
+    self.assertTrue((ci['count'] == 3).all())
+    self.assertTrue((ci['lower'] <= ci['mean']).all())
+    self.assertTrue((ci['mean'] <= ci['upper']).all())
+
+  def testConstantGroupsHaveEmptyIntervals(self):
+    df = pd.DataFrame({
+        analysis.PIPELINE_KEY: ['a', 'a', 'b'],
+        analysis.TASK_KEY: ['t', 't', 't'],
+        'accuracy': [.5, .5, .25],
+    })
+
+    ci = analysis.bootstrap_ci(df, 'accuracy', seed=0)
+
+    np.testing.assert_allclose([.5, .25], ci['lower'])
+    np.testing.assert_allclose([.5, .25], ci['upper'])
+
+  def testInvalidArgumentsThrow(self):
+    df = _make_results(num_tasks=1, offsets={'a': 0.})
+    with self.assertRaises(ValueError):
+      analysis.bootstrap_ci(df, 'accuracy', num_samples=0)
+    with self.assertRaises(ValueError):
+      analysis.bootstrap_ci(df, 'accuracy', confidence=1.)
+
+
+class AverageRanksTest(absltest.TestCase):
+
+  def testAverageRanks(self):
+    df = _make_results(num_tasks=10, offsets={'a': 0., 'b': 1., 'c': 2.})
+
+    ranks = analysis.average_ranks(df, 'accuracy')
+
+    self.assertEqual({'c': 1., 'b': 2., 'a': 3.}, ranks.to_dict())
+
+  def testLowerIsBetter(self):
+    df = _make_results(num_tasks=10, offsets={'a': 0., 'b': 1.})
+
+    ranks = analysis.average_ranks(df, 'accuracy', higher_is_better=False)
+
+    self.assertEqual(['a', 'b'], ranks.index.tolist())
+
+
+class PairedTestsTest(absltest.TestCase):
+
+  def testDetectsTheBetterPipeline(self):
+    df = _make_results(num_tasks=30, offsets={'a': 0., 'b': .1, 'c': .1})
+
+    tests = analysis.paired_tests(df, 'accuracy').set_index(
+        ['pipeline_a', 'pipeline_b'])
+
+    self.assertEqual([('a', 'b'), ('a', 'c'), ('b', 'c')], tests.index.tolist())
+    self.assertEqual(30, tests.loc[('a', 'b'), 'losses'])
+    self.assertAlmostEqual(-.1, tests.loc[('a', 'b'), 'mean_difference'], 2)
+    self.assertLess(tests.loc[('a', 'b'), 'p_value'], 1e-3)
+    self.assertGreater(tests.loc[('b', 'c'), 'p_value'], 1e-3)
+
+  def testOnlyComparesCommonTasks(self):
+    df = _make_results(num_tasks=10, offsets={'a': 0., 'b': .1})
+    df = df[~((df[analysis.PIPELINE_KEY] == 'b') &
+              (df[analysis.TASK_KEY] == 'task_0'))]
+
+    tests = analysis.paired_tests(df, 'accuracy')
+
+    self.assertEqual([9], tests['num_tasks'].tolist())
+
+
+class CriticalDifferenceTest(absltest.TestCase):
+
+  def testCriticalDifference(self):
+    df = _make_results(num_tasks=10, offsets={'a': 0., 'b': 1., 'c': 2.})
+
+    cd = analysis.critical_difference(df, 'accuracy')
+
+    self.assertEqual(10, cd.num_tasks)
+    self.assertEqual(['c', 'b', 'a'], cd.average_ranks.index.tolist())
+    # q_0.05 * sqrt(k * (k + 1) / (6 * N)) with k = 3 and N = 10.
+    self.assertAlmostEqual(2.343 * np.sqrt(.2), cd.critical_difference)
+    self.assertAlmostEqual(20., cd.friedman_statistic)
+    self.assertLess(cd.friedman_p_value, 1e-3)
+
+  def testTooFewPipelinesThrows(self):
+    df = _make_results(num_tasks=10, offsets={'a': 0.})
+    with self.assertRaises(ValueError):
+      analysis.critical_difference(df, 'accuracy')
+
+
+if __name__ == '__main__':
+  absltest.main()
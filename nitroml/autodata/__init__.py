@@ -15,9 +15,20 @@
 # Lint as: python3
 """Package nitroml.autodata."""
 
-from nitroml.autodata.autodata_pipeline import AutoData
-from nitroml.autodata.preprocessors.basic_preprocessor import BasicPreprocessor
-from nitroml.autodata.preprocessors.preprocessor import Preprocessor
+import typing
+
+from nitroml import _lazy
+
+if typing.TYPE_CHECKING:
+  from nitroml.autodata.autodata_pipeline import AutoData
+  from nitroml.autodata.preprocessors.basic_preprocessor import BasicPreprocessor
+  from nitroml.autodata.preprocessors.preprocessor import Preprocessor
+
+__getattr__, __dir__ = _lazy.attach(__name__, {
+    "AutoData": "nitroml.autodata.autodata_pipeline",
+    "BasicPreprocessor": "nitroml.autodata.preprocessors.basic_preprocessor",
+    "Preprocessor": "nitroml.autodata.preprocessors.preprocessor",
+})
 
 __all__ = [
     "AutoData",
@@ -23,6 +23,7 @@ from typing import Any, Dict, List, Tuple, Type, cast
 from absl import logging
 import kerastuner
 from kerastuner.engine import base_tuner
+from nitroml.components.publisher import constants
 import numpy as np
 import tensorflow as tf
 from tfx import types
@@ -298,6 +299,11 @@ class Executor(base_executor.BaseExecutor):
     else:
       best_tuner = tuner
     tfx_tuner.write_best_hyperparameters(best_tuner, output_dict)
+    # The number of trials is published with the benchmark results.
+    for artifact in output_dict['best_hyperparameters']:
+      artifact.set_int_custom_property(
+          constants.TUNER_TRIALS_KEY,
+          len(tuner_trial_data[BEST_CUMULATIVE_SCORE]))
     tuner_plot_path = os.path.join(
         artifact_utils.get_single_uri(output_dict['trial_summary_plot']),
         'tuner_plot_data.txt')
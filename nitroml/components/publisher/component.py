@@ -15,7 +15,9 @@
 # Lint as: python3
 """Component for publishing NitroML benchmark results to MLMD."""
 
-from typing import Text
+import json
+import re
+from typing import Dict, List, Optional, Text, Type
 
 from nitroml.components.publisher import executor
 from tfx.dsl.components.base import base_component
@@ -34,6 +36,14 @@ class BenchmarkResult(Artifact):
   TYPE_NAME = 'NitroML.BenchmarkResult'
 
 
+# Types of the optional upstream inputs from which cost signals are published.
+_UPSTREAM_TYPES = {
+    executor.MODEL_KEY: standard_artifacts.Model,
+    executor.HYPERPARAMETERS_KEY: standard_artifacts.HyperParameters,
+    executor.TRANSFORMED_EXAMPLES_KEY: standard_artifacts.Examples,
+}
+
+
 class BenchmarkResultPublisherSpec(ComponentSpec):
   """BenchmarkResultPublisher component spec."""
   PARAMETERS = {
@@ -42,11 +52,80 @@ class BenchmarkResultPublisherSpec(ComponentSpec):
       'num_runs': ExecutionParameter(type=int),
   }
   INPUTS = {
-      'evaluation': ChannelParameter(type=standard_artifacts.ModelEvaluation),
+      executor.EVALUATION_KEY:
+          ChannelParameter(type=standard_artifacts.ModelEvaluation),
+      **{
+          key: ChannelParameter(type=artifact_type, optional=True)
+          for key, artifact_type in _UPSTREAM_TYPES.items()
+      },
   }
   OUTPUTS = {
-      'benchmark_result': ChannelParameter(type=BenchmarkResult),
+      executor.BENCHMARK_RESULT_KEY: ChannelParameter(type=BenchmarkResult),
+  }
+
+
+class AggregateBenchmarkResultPublisherSpec(ComponentSpec):
+  """AggregateBenchmarkResultPublisher component spec.
+
+  The inputs and outputs are declared by a subclass per number of benchmark
+  runs, see `aggregate_spec_class`.
+  """
+  PARAMETERS = {
+      'benchmarks': ExecutionParameter(type=Text),
+      'max_workers': ExecutionParameter(type=int, optional=True),
   }
+  INPUTS = {}
+  OUTPUTS = {}
+
+
+_AGGREGATE_SPEC_NAME = AggregateBenchmarkResultPublisherSpec.__name__
+_AGGREGATE_SPEC_PATTERN = re.compile(_AGGREGATE_SPEC_NAME + r'([1-9]\d*)')
+
+
+def aggregate_spec_class(
+    num_benchmarks: int) -> Type[AggregateBenchmarkResultPublisherSpec]:
+  """Returns the spec of an aggregate publisher of `num_benchmarks` runs.
+
+  The spec declares an `evaluation_<i>` input, optional `model_<i>`,
+  `hyperparameters_<i>` and `transformed_examples_<i>` inputs, and a
+  `benchmark_result_<i>` output per benchmark run. It is registered in this
+  module as `AggregateBenchmarkResultPublisherSpec<num_benchmarks>`, and is
+  created on import by name too, so that components can be serialized, e.g.
+  to run them in Kubeflow containers or in other processes.
+
+  Args:
+    num_benchmarks: The number of benchmark runs.
+
+  Returns:
+    The spec class.
+  """
+  name = f'{_AGGREGATE_SPEC_NAME}{num_benchmarks}'
+  if name not in globals():
+    inputs = {}
+    outputs = {}
+    for i in range(num_benchmarks):
+      inputs[f'{executor.EVALUATION_KEY}_{i}'] = ChannelParameter(
+          type=standard_artifacts.ModelEvaluation)
+      for key, artifact_type in _UPSTREAM_TYPES.items():
+        inputs[f'{key}_{i}'] = ChannelParameter(
+            type=artifact_type, optional=True)
+      outputs[f'{executor.BENCHMARK_RESULT_KEY}_{i}'] = ChannelParameter(
+          type=BenchmarkResult)
+    globals()[name] = type(name, (AggregateBenchmarkResultPublisherSpec,), {
+        '__module__': __name__,
+        '__doc__': f'Spec of an aggregate publisher of {num_benchmarks} runs.',
+        'INPUTS': inputs,
+        'OUTPUTS': outputs,
+    })
+  return globals()[name]
+
+
+def __getattr__(name: Text):
+  """Creates the aggregate publisher specs when they are imported by name."""
+  match = _AGGREGATE_SPEC_PATTERN.fullmatch(name)
+  if not match:
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+  return aggregate_spec_class(int(match.group(1)))
 
 
 class BenchmarkResultPublisher(base_component.BaseComponent):
@@ -56,8 +135,14 @@ class BenchmarkResultPublisher(base_component.BaseComponent):
   EXECUTOR_SPEC = executor_spec.ExecutorClassSpec(
       executor.BenchmarkResultPublisherExecutor)
 
-  def __init__(self, benchmark_name: Text, evaluation: Channel, run: int,
-               num_runs: int):
+  def __init__(self,
+               benchmark_name: Text,
+               evaluation: Channel,
+               run: int,
+               num_runs: int,
+               model: Optional[Channel] = None,
+               hyperparameters: Optional[Channel] = None,
+               transformed_examples: Optional[Channel] = None):
     """Construct a BenchmarkResultPublisher.
 
     Args:
@@ -65,6 +150,12 @@ class BenchmarkResultPublisher(base_component.BaseComponent):
       evaluation: A Channel of `ModelEvaluation` to load evaluation results.
       run: The integer benchmark run repetition.
       num_runs: The integer total number of benchmark run repetitions.
+      model: Optional Channel of the evaluated `Model`, from which the Trainer's
+        wall time, steps and model size are published.
+      hyperparameters: Optional Channel of the Tuner's best `HyperParameters`,
+        from which the Tuner's wall time and number of trials are published.
+      transformed_examples: Optional Channel of the Transform's `Examples`,
+        whose size is published.
     """
     if not benchmark_name:
       raise ValueError(
@@ -89,6 +180,99 @@ class BenchmarkResultPublisher(base_component.BaseComponent):
         run=run,
         num_runs=num_runs,
         evaluation=evaluation,
+        model=model,
+        hyperparameters=hyperparameters,
+        transformed_examples=transformed_examples,
         benchmark_result=benchmark_result)
 
     super(BenchmarkResultPublisher, self).__init__(spec=spec)
+
+
+class AggregateBenchmarkResultPublisher(base_component.BaseComponent):
+  """Component for publishing the results of many benchmark runs at once.
+
+  A single execution publishes a `BenchmarkResult` per evaluation, loading the
+  evaluations concurrently, instead of running a `BenchmarkResultPublisher`
+  per benchmark run, e.g. a Kubeflow pod each.
+  """
+
+  SPEC_CLASS = AggregateBenchmarkResultPublisherSpec
+  EXECUTOR_SPEC = executor_spec.ExecutorClassSpec(
+      executor.AggregateBenchmarkResultPublisherExecutor)
+
+  def __init__(self,
+               benchmark_names: List[Text],
+               evaluations: List[Channel],
+               runs: List[int],
+               num_runs: List[int],
+               upstreams: Optional[List[Dict[Text, Channel]]] = None,
+               max_workers: Optional[int] = None,
+               instance_name: Optional[Text] = None):
+    """Construct an AggregateBenchmarkResultPublisher.
+
+    Args:
+      benchmark_names: The unique names of the benchmark runs.
+      evaluations: A Channel of `ModelEvaluation` per benchmark run.
+      runs: The integer repetition of each benchmark run.
+      num_runs: The integer total number of repetitions of each benchmark run.
+      upstreams: Optional dict per benchmark run, from the name of an optional
+        `BenchmarkResultPublisher` input, e.g. 'model', to its Channel.
+      max_workers: The maximum number of evaluations loaded concurrently.
+      instance_name: Optional unique instance name.
+
+    Raises:
+      ValueError: If the arguments do not have the same lengths, or are
+        invalid for a `BenchmarkResultPublisher`.
+    """
+    if not benchmark_names:
+      raise ValueError('At least one benchmark is required to run '
+                       'AggregateBenchmarkResultPublisher component.')
+    upstreams = upstreams or [{} for _ in benchmark_names]
+    if not (len(benchmark_names) == len(evaluations) == len(runs) ==
+            len(num_runs) == len(upstreams)):
+      raise ValueError(
+          'benchmark_names, evaluations, runs, num_runs and upstreams must '
+          f'have the same lengths; got {len(benchmark_names)}, '
+          f'{len(evaluations)}, {len(runs)}, {len(num_runs)} and '
+          f'{len(upstreams)} instead.')
+    if not all(benchmark_names):
+      raise ValueError('A valid benchmark name is required to run '
+                       'AggregateBenchmarkResultPublisher component.')
+    if not all(evaluations):
+      raise ValueError('An evaluation channel is required to run '
+                       'AggregateBenchmarkResultPublisher component.')
+    if not all(runs) or not all(num_runs):
+      raise ValueError('Positive runs and num_runs are required to run '
+                       'AggregateBenchmarkResultPublisher component.')
+    if max_workers is not None and max_workers <= 0:
+      raise ValueError('max_workers must be strictly positive; '
+                       f'got max_workers={max_workers} instead.')
+
+    kwargs = {
+        f'{executor.EVALUATION_KEY}_{i}': evaluation
+        for i, evaluation in enumerate(evaluations)
+    }
+    for i, upstream in enumerate(upstreams):
+      for key, channel in upstream.items():
+        if channel:
+          kwargs[f'{key}_{i}'] = channel
+    kwargs.update({
+        f'{executor.BENCHMARK_RESULT_KEY}_{i}':
+        channel_utils.as_channel([BenchmarkResult()])
+        for i in range(len(evaluations))
+    })
+    benchmarks = json.dumps([{
+        'benchmark_name': benchmark_name,
+        'run': run,
+        'num_runs': num_runs_,
+    } for benchmark_name, run, num_runs_ in zip(benchmark_names, runs,
+                                                 num_runs)])
+
+    if max_workers is not None:
+      kwargs['max_workers'] = max_workers
+
+    spec = aggregate_spec_class(len(evaluations))(
+        benchmarks=benchmarks, **kwargs)
+
+    super(AggregateBenchmarkResultPublisher, self).__init__(
+        spec=spec, instance_name=instance_name)
@@ -15,8 +15,13 @@
 # Lint as: python3
 """Tests for nitroml.components.publisher.component."""
 
+import importlib
+import pickle
+
 from absl.testing import absltest
 
+from nitroml.components.publisher import component
+from nitroml.components.publisher.component import AggregateBenchmarkResultPublisher
 from nitroml.components.publisher.component import BenchmarkResultPublisher
 from tfx.types import channel_utils
 from tfx.types import standard_artifacts
@@ -43,5 +48,47 @@ class ComponentTest(absltest.TestCase):
           num_runs=2)
 
 
+class AggregateComponentTest(absltest.TestCase):
+
+  def testConstruction(self):
+    publisher = AggregateBenchmarkResultPublisher(
+        ['a', 'b'], [
+            channel_utils.as_channel([standard_artifacts.ModelEvaluation()]),
+            channel_utils.as_channel([standard_artifacts.ModelEvaluation()])
+        ],
+        runs=[1, 1],
+        num_runs=[1, 1])
+
+    self.assertEqual(['evaluation_0', 'evaluation_1'],
+                     sorted(publisher.inputs.get_all()))
+    self.assertEqual('NitroML.BenchmarkResult',
+                     publisher.outputs['benchmark_result_1'].type_name)
+
+  def testSpecIsImportableByName(self):
+    publisher = AggregateBenchmarkResultPublisher(
+        ['a', 'b', 'c'], [
+            channel_utils.as_channel([standard_artifacts.ModelEvaluation()])
+            for _ in range(3)
+        ],
+        runs=[1, 1, 1],
+        num_runs=[1, 1, 1])
+    spec_class = type(publisher.spec)
+
+    module = importlib.import_module(spec_class.__module__)
+
+    self.assertIs(spec_class, getattr(module, spec_class.__name__))
+    self.assertIs(component.AggregateBenchmarkResultPublisherSpec3,  # pylint: disable=no-member
+                  spec_class)
+    self.assertIs(spec_class, pickle.loads(pickle.dumps(spec_class)))
+
+  def testMismatchedLengthsThrows(self):
+    with self.assertRaises(ValueError):
+      AggregateBenchmarkResultPublisher(
+          ['a', 'b'],
+          [channel_utils.as_channel([standard_artifacts.ModelEvaluation()])],
+          runs=[1, 1],
+          num_runs=[1, 1])
+
+
 if __name__ == '__main__':
   absltest.main()
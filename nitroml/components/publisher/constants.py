@@ -0,0 +1,30 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+# Lint as: python3
+"""Names of the cost signals which the BenchmarkResultPublisher publishes.
+
+This module has no dependencies, so that the components which record cost
+signals on their artifacts, e.g. the metalearning Tuner, can import it without
+importing `nitroml.results`. The names are also exported by `nitroml.results`.
+"""
+
+TRAINER_WALL_TIME_KEY = 'trainer_wall_time_seconds'
+TRAIN_STEPS_KEY = 'train_steps'
+TRAIN_STEPS_PER_SECOND_KEY = 'train_steps_per_second'
+MODEL_SIZE_KEY = 'model_size_bytes'
+# Also recorded by the Tuner on its best `HyperParameters` artifact.
+TUNER_TRIALS_KEY = 'tuner_trials'
+TUNER_WALL_TIME_KEY = 'tuner_wall_time_seconds'
+TRANSFORMED_EXAMPLES_SIZE_KEY = 'transformed_examples_bytes'
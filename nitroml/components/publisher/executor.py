@@ -15,15 +15,166 @@
 # Lint as: python3
 """Executor for BenchmarkResultPublisher."""
 
-from typing import Any, Dict, List, Text
+from concurrent import futures
+import io
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Text, Tuple
 
+from absl import logging
 from nitroml import results
+from nitroml.orchestration import instrumentation
+import numpy as np
 import tensorflow.compat.v2 as tf
-import tensorflow_model_analysis as tfma
+from tensorflow_model_analysis.proto import metrics_for_slice_pb2
+from tensorflow_model_analysis.slicer import slicer_lib
 
 from tfx.dsl.components.base import base_executor
 from tfx.types import artifact_utils
 from tfx.types.artifact import Artifact
+from tfx.utils import path_utils
+
+# Keys of the evaluation inputs and BenchmarkResult outputs. The aggregate
+# publisher suffixes them with the index of each benchmark run.
+EVALUATION_KEY = 'evaluation'
+BENCHMARK_RESULT_KEY = 'benchmark_result'
+# Keys of the optional upstream inputs from which cost signals are published.
+MODEL_KEY = 'model'
+HYPERPARAMETERS_KEY = 'hyperparameters'
+TRANSFORMED_EXAMPLES_KEY = 'transformed_examples'
+UPSTREAM_KEYS = (MODEL_KEY, HYPERPARAMETERS_KEY, TRANSFORMED_EXAMPLES_KEY)
+_DEFAULT_MAX_WORKERS = 16
+# Variables counting the training steps in the exported SavedModels of
+# Estimators and of Keras models respectively.
+_STEP_VARIABLES = ('global_step', 'optimizer/iter/.ATTRIBUTES/VARIABLE_VALUE')
+
+# The prefix of the files of `MetricsForSlice` records written by the
+# Evaluator. Plots and validation results are written to other files.
+_METRICS_PREFIX = 'metrics'
+_OVERALL_SLICE = slicer_lib.stringify_slice_key(())
+
+# A metric value of a slice: its output name, sub key, metric name and value.
+_MetricRow = Tuple[Text, Text, Text, Optional[float]]
+
+
+def _sub_key_name(sub_key: metrics_for_slice_pb2.SubKey) -> Text:
+  """Returns the name of the sub key, formatted like `tfma.metrics.SubKey`."""
+  if sub_key.HasField('class_id'):
+    return f'classId:{sub_key.class_id.value}'
+  if sub_key.HasField('k'):
+    return f'k:{sub_key.k.value}'
+  if sub_key.HasField('top_k'):
+    return f'topK:{sub_key.top_k.value}'
+  return ''
+
+
+def _to_double(value: metrics_for_slice_pb2.MetricValue) -> Optional[float]:
+  """Returns the double of a metric value, or None if it is not a scalar."""
+  if value.HasField('double_value'):
+    return value.double_value.value
+  if value.HasField('bounded_value'):
+    return value.bounded_value.value.value
+  return None
+
+
+def _directory_bytes(path: Text) -> int:
+  """Returns the total size of the files under `path` in bytes."""
+  total_bytes = 0
+  for dir_name, _, file_names in tf.io.gfile.walk(path):
+    for file_name in file_names:
+      total_bytes += tf.io.gfile.stat(os.path.join(dir_name, file_name)).length
+  return total_bytes
+
+
+def _train_steps(model_path: Text) -> Optional[int]:
+  """Returns the number of steps which trained the exported model, if known."""
+  checkpoint = os.path.join(model_path, 'variables', 'variables')
+  try:
+    names = {name for name, _ in tf.train.list_variables(checkpoint)}
+  except (tf.errors.OpError, ValueError):
+    return None
+  for name in _STEP_VARIABLES:
+    if name in names:
+      return int(tf.train.load_variable(checkpoint, name))
+  return None
+
+
+def _load_costs(upstream: Dict[Text, Artifact]) -> Dict[Text, Any]:
+  """Returns the cost signals of a benchmark run from its upstream artifacts.
+
+  Wall times are the ones recorded by `nitroml.orchestration.instrumentation`,
+  so they are only published for instrumented components.
+
+  Args:
+    upstream: Dict from upstream key to the artifact, including any of:
+      - model: The Trainer's `Model`.
+      - hyperparameters: The Tuner's best `HyperParameters`.
+      - transformed_examples: The Transform's transformed `Examples`.
+
+  Returns:
+    A dict from cost property name to its int or float value.
+  """
+  costs = {}
+  model = upstream.get(MODEL_KEY)
+  if model:
+    properties = model.mlmd_artifact.custom_properties
+    if instrumentation.WALL_TIME_SECONDS in properties:
+      costs[results.TRAINER_WALL_TIME_KEY] = properties[
+          instrumentation.WALL_TIME_SECONDS].double_value
+    model_path = path_utils.serving_model_path(model.uri)
+    costs[results.MODEL_SIZE_KEY] = _directory_bytes(model_path)
+    train_steps = _train_steps(model_path)
+    if train_steps is not None:
+      costs[results.TRAIN_STEPS_KEY] = train_steps
+      if costs.get(results.TRAINER_WALL_TIME_KEY):
+        costs[results.TRAIN_STEPS_PER_SECOND_KEY] = (
+            train_steps / costs[results.TRAINER_WALL_TIME_KEY])
+  hyperparameters = upstream.get(HYPERPARAMETERS_KEY)
+  if hyperparameters:
+    properties = hyperparameters.mlmd_artifact.custom_properties
+    if instrumentation.WALL_TIME_SECONDS in properties:
+      costs[results.TUNER_WALL_TIME_KEY] = properties[
+          instrumentation.WALL_TIME_SECONDS].double_value
+    if results.TUNER_TRIALS_KEY in properties:
+      costs[results.TUNER_TRIALS_KEY] = properties[
+          results.TUNER_TRIALS_KEY].int_value
+  transformed_examples = upstream.get(TRANSFORMED_EXAMPLES_KEY)
+  if transformed_examples:
+    costs[results.TRANSFORMED_EXAMPLES_SIZE_KEY] = _directory_bytes(
+        transformed_examples.uri)
+  return costs
+
+
+def _iter_metrics(uri: Text) -> Iterator[Tuple[Text, List[_MetricRow]]]:
+  """Yields the metrics of each slice of an evaluation, in file order.
+
+  Only the `MetricsForSlice` records are read, one at a time, so that large
+  evaluations are streamed rather than loaded. Plots, validation results and
+  the eval config are never parsed.
+
+  Args:
+    uri: The uri of the Evaluator's `ModelEvaluation` artifact.
+
+  Yields:
+    Tuples of the stringified slice key, e.g. 'Overall', and of the metric rows
+    of the slice.
+  """
+  paths = sorted(tf.io.gfile.glob(os.path.join(uri, _METRICS_PREFIX + '*')))
+  for path in paths:
+    for record in tf.compat.v1.io.tf_record_iterator(path):
+      metrics = metrics_for_slice_pb2.MetricsForSlice.FromString(record)
+      slice_name = slicer_lib.stringify_slice_key(
+          slicer_lib.deserialize_slice_key(metrics.slice_key))
+      # Legacy evaluations map metric names to the values of the single output.
+      rows = [('', '', name, _to_double(value))
+              for name, value in sorted(metrics.metrics.items())]
+      for key_and_value in metrics.metric_keys_and_values:
+        key = key_and_value.key
+        if key.is_diff:
+          continue
+        rows.append((key.output_name, _sub_key_name(key.sub_key), key.name,
+                     _to_double(key_and_value.value)))
+      yield slice_name, rows
 
 
 class BenchmarkResultPublisherExecutor(base_executor.BaseExecutor):
@@ -37,9 +188,20 @@ class BenchmarkResultPublisherExecutor(base_executor.BaseExecutor):
     It updates custom properties of BenchmarkResult artifact to contain
     benchmark results.
 
+    Every slice, output and sub key of the evaluation is also written to a
+    compressed NPZ file in the `BenchmarkResult` artifact's uri, which can be
+    read back with `nitroml.results.get_slice_metrics`.
+
+    Cost signals, e.g. the Trainer's wall time and the size of the model, are
+    published next to the metrics when the optional upstream artifacts are
+    given.
+
     Args:
       input_dict: Input dict from input key to a list of artifacts, including:
         - evaluation: Model evaluation results.
+        - model: Optional Trainer model.
+        - hyperparameters: Optional Tuner best hyperparameters.
+        - transformed_examples: Optional Transform transformed examples.
       output_dict: Output dict from key to a list of artifacts, including:
         - benchmark_result: `BenchmarkResult` artifact.
       exec_properties: A dict of execution properties, including either one of:
@@ -49,52 +211,196 @@ class BenchmarkResultPublisherExecutor(base_executor.BaseExecutor):
       ValueError: If evaluation uri doesn't exists.
     """
 
-    uri = artifact_utils.get_single_uri(input_dict['evaluation'])
+    upstream = {
+        key: artifact_utils.get_single_instance(input_dict[key])
+        for key in UPSTREAM_KEYS
+        if input_dict.get(key)
+    }
+    self._publish(
+        artifact_utils.get_single_instance(input_dict[EVALUATION_KEY]),
+        artifact_utils.get_single_instance(output_dict[BENCHMARK_RESULT_KEY]),
+        exec_properties['benchmark_name'], exec_properties['run'],
+        exec_properties['num_runs'], upstream)
+
+  def _publish(self,
+               evaluation: Artifact,
+               benchmark_result: Artifact,
+               benchmark_name: Text,
+               run: int,
+               num_runs: int,
+               upstream: Optional[Dict[Text, Artifact]] = None) -> None:
+    """Publishes the evaluation of a benchmark run to its BenchmarkResult."""
+
+    uri = evaluation.uri
     if not tf.io.gfile.exists(uri):
       raise ValueError('The uri="{}" does not exist.'.format(uri))
 
-    benchmark_result = artifact_utils.get_single_instance(
-        output_dict['benchmark_result'])
-    benchmark_result.set_string_custom_property(
-        results.BENCHMARK_KEY, exec_properties['benchmark_name'])
-    benchmark_result.set_int_custom_property(results.RUN_KEY,
-                                             exec_properties['run'])
-    benchmark_result.set_int_custom_property(results.NUM_RUNS_KEY,
-                                             exec_properties['num_runs'])
+    benchmark_result.set_string_custom_property(results.BENCHMARK_KEY,
+                                                benchmark_name)
+    benchmark_result.set_int_custom_property(results.RUN_KEY, run)
+    benchmark_result.set_int_custom_property(results.NUM_RUNS_KEY, num_runs)
+    if evaluation.id:
+      benchmark_result.set_int_custom_property(results.EVALUATION_ID_KEY,
+                                               evaluation.id)
 
     # Publish evaluation metrics
-    evals = self._load_evaluation(uri)
+    evals, slice_metrics = self._load_metrics(uri)
     for name, val in evals.items():
-      # TODO(b/151723291): Use correct type instead of string.
-      benchmark_result.set_string_custom_property(name, str(val))
+      # Metrics are published as doubles so that reading them back in
+      # `nitroml.results` does not need to parse strings.
+      if isinstance(val, (int, float)):
+        benchmark_result.mlmd_artifact.custom_properties[
+            name].double_value = val
+      else:
+        benchmark_result.set_string_custom_property(name, str(val))
 
-  def _load_evaluation(self, file_path: Text) -> Dict[str, Any]:
-    """Returns evaluations for a bechmark run.
+    # Publish cost signals as typed properties.
+    for name, val in _load_costs(upstream or {}).items():
+      if isinstance(val, int):
+        benchmark_result.set_int_custom_property(name, val)
+      else:
+        benchmark_result.mlmd_artifact.custom_properties[
+            name].double_value = val
+
+    # Publish every slice as a single columnar blob.
+    self._write_slice_metrics(
+        slice_metrics,
+        os.path.join(benchmark_result.uri, results.SLICE_METRICS_FILENAME))
+
+  def _load_metrics(
+      self, file_path: Text) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """Returns the evaluation of a benchmark run, and the metrics of its slices.
 
     This method makes following assumptions:
       1. `tf.enable_v2_behavior()` was called beforehand.
       2. file_path points to a dir containing artifacts of single output model.
 
+    The metrics records are streamed in a single pass, which picks the metrics
+    of the overall slice and collects the scalar metrics of every slice.
+
     Args:
       file_path: A root directory where pipeline's evaluation artifacts are
         stored.
 
     Returns:
-      An evaluation metrics dictionary. If no evaluations found then returns an
-      empty dictionary.
+      A tuple of the evaluation metrics dictionary, which is empty if no
+      evaluations are found, and of a dict of equally long columns, with a row
+      per metric value of every slice, output and sub key: `slice`,
+      `output_name`, `sub_key` and `metric` string columns, and a float64
+      `value` column.
+
+    Raises:
+      ValueError: If the evaluation is not of a single output model.
     """
     # We assume this is a single output model, hence the following keys are "".
     output_name = ''
     multi_class_key = ''
 
-    eval_result = tfma.load_eval_result(file_path)
-
-    # Slicing_metric is a tuple, index 0 is slice, index 1 is its value.
-    _, metrics_dict = eval_result.slicing_metrics[0]
+    columns = {name: [] for name in results.SLICE_METRICS_COLUMNS}
+    first_rows = None
+    overall_rows = None
+    for slice_name, rows in _iter_metrics(file_path):
+      if first_rows is None:
+        first_rows = rows
+      if slice_name == _OVERALL_SLICE and overall_rows is None:
+        overall_rows = rows
+      for row_output_name, sub_key, metric, value in rows:
+        if value is None:
+          continue
+        columns[results.SLICE_KEY].append(slice_name)
+        columns[results.OUTPUT_NAME_KEY].append(row_output_name)
+        columns[results.SUB_KEY].append(sub_key)
+        columns[results.METRIC_KEY].append(metric)
+        columns[results.VALUE_KEY].append(value)
 
-    if output_name not in metrics_dict or multi_class_key not in metrics_dict[
-        output_name]:
+    # Without an overall slice, fall back to the first one.
+    rows = overall_rows or first_rows or []
+    evals = {
+        metric: value for output, sub_key, metric, value in rows
+        if output == output_name and sub_key == multi_class_key
+    }
+    if rows and not evals:
       raise ValueError('Evaluation can only be loaded for single output model.')
-    metrics_dict = metrics_dict[output_name][multi_class_key]
+    slice_metrics = {
+        name: np.array(
+            column, dtype=np.float64 if name == results.VALUE_KEY else str)
+        for name, column in columns.items()
+    }
+    return evals, slice_metrics
+
+  def _write_slice_metrics(self, columns: Dict[str, np.ndarray],
+                           path: Text) -> None:
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **columns)
+    tf.io.gfile.makedirs(os.path.dirname(path))
+    with tf.io.gfile.GFile(path, 'wb') as f:
+      f.write(buffer.getvalue())
+
+
+class AggregateBenchmarkResultPublisherExecutor(
+    BenchmarkResultPublisherExecutor):
+  """Executor for AggregateBenchmarkResultPublisher."""
+
+  def Do(self, input_dict: Dict[Text, List[Artifact]],
+         output_dict: Dict[Text, List[Artifact]],
+         exec_properties: Dict[Text, Any]) -> None:
+    """Publishes the results of many benchmark runs in a single execution.
+
+    The evaluations are loaded concurrently, and each is published to its own
+    `BenchmarkResult` artifact like `BenchmarkResultPublisherExecutor` does.
+
+    A benchmark run which cannot be published, e.g. because its evaluation
+    cannot be loaded, does not prevent the others from being published. Its
+    error is logged and its `BenchmarkResult` is left without properties, so it
+    is ignored by `nitroml.results` and is run again by `--resume`. Failed
+    upstream components are not handled here: TFX does not launch the
+    publisher at all then, see `nitroml.run`'s `aggregate_publisher`.
+
+    Args:
+      input_dict: Input dict from input key to a list of artifacts, including:
+        - evaluation_<i>: Model evaluation results of the i-th benchmark run.
+        - model_<i>, hyperparameters_<i>, transformed_examples_<i>: Optional
+          upstream artifacts of the i-th benchmark run.
+      output_dict: Output dict from key to a list of artifacts, including:
+        - benchmark_result_<i>: `BenchmarkResult` artifact of the i-th
+          benchmark run.
+      exec_properties: A dict of execution properties, including:
+        - benchmarks: JSON list of the `benchmark_name`, `run` and `num_runs`
+          of each benchmark run.
+        - max_workers: The maximum number of evaluations loaded concurrently.
+
+    Raises:
+      Exception: The first error, when no benchmark run could be published.
+    """
+
+    benchmarks = json.loads(exec_properties['benchmarks'])
+
+    def _publish_benchmark(i):
+      benchmark = benchmarks[i]
+      upstream = {
+          key: artifact_utils.get_single_instance(input_dict[f'{key}_{i}'])
+          for key in UPSTREAM_KEYS
+          if input_dict.get(f'{key}_{i}')
+      }
+      self._publish(
+          artifact_utils.get_single_instance(
+              input_dict[f'{EVALUATION_KEY}_{i}']),
+          artifact_utils.get_single_instance(
+              output_dict[f'{BENCHMARK_RESULT_KEY}_{i}']),
+          benchmark['benchmark_name'], benchmark['run'], benchmark['num_runs'],
+          upstream)
 
-    return {k: v.get('doubleValue') for k, v in metrics_dict.items()}
+    with futures.ThreadPoolExecutor(
+        max_workers=exec_properties.get('max_workers') or
+        _DEFAULT_MAX_WORKERS) as executor:
+      publications = [
+          executor.submit(_publish_benchmark, i) for i in range(len(benchmarks))
+      ]
+    errors = []
+    for benchmark, publication in zip(benchmarks, publications):
+      if publication.exception() is not None:
+        logging.error('Could not publish %s: %s', benchmark['benchmark_name'],
+                      publication.exception())
+        errors.append(publication.exception())
+    if errors and len(errors) == len(benchmarks):
+      raise errors[0]
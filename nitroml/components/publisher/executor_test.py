@@ -15,12 +15,18 @@
 # Lint as: python3
 """Tests for nitroml.components.publisher.executor."""
 
+import json
 import os
+import shutil
 from typing import Text, Dict, List, Any
 
 from absl.testing import absltest
+from nitroml import results
+from nitroml.orchestration import instrumentation
 from nitroml.components.publisher.component import BenchmarkResult
+from nitroml.components.publisher.executor import AggregateBenchmarkResultPublisherExecutor
 from nitroml.components.publisher.executor import BenchmarkResultPublisherExecutor
+import numpy as np
 
 from tfx.types import standard_artifacts
 from tfx.types.artifact import Artifact
@@ -38,17 +44,19 @@ class ExecutorTest(absltest.TestCase):
     return {'evaluation': [evaluation]}
 
   def _make_output_dict(self) -> Dict[Text, List[Artifact]]:
-    return {'benchmark_result': [BenchmarkResult()]}
+    benchmark_result = BenchmarkResult()
+    benchmark_result.uri = self.create_tempdir().full_path
+    return {'benchmark_result': [benchmark_result]}
 
   def _make_executor_properties(self, name: Text) -> Dict[Text, Any]:
     return {'benchmark_name': name, 'run': 1, 'num_runs': 3}
 
   def _get_eval_metrics(
-      self, output_dict: Dict[Text, List[Artifact]]) -> Dict[str, str]:
+      self, output_dict: Dict[Text, List[Artifact]]) -> Dict[str, Any]:
     benchmark_result = output_dict['benchmark_result'][0]
     benchmark_result = benchmark_result.mlmd_artifact
     return {
-        k: v.int_value if v.int_value else v.string_value
+        k: getattr(v, v.WhichOneof('value'))
         for k, v in benchmark_result.custom_properties.items()
     }
 
@@ -65,14 +73,91 @@ class ExecutorTest(absltest.TestCase):
 
     self.assertEqual(
         {
-            'accuracy': '0.042553190141916275',
-            'average_loss': '2.397735834121704',
-            'post_export_metrics/example_count': '94.0',
+            'accuracy': 0.042553190141916275,
+            'average_loss': 2.397735834121704,
+            'post_export_metrics/example_count': 94.0,
             'run': 1,
             'num_runs': 3,
             'benchmark': 'test'
         }, self._get_eval_metrics(output_dict))
 
+  def testDoWritesSliceMetrics(self):
+    test_evaluation_uri = os.path.join(
+        self._base_dir, 'testdata', 'benchmark_results',
+        'Evaluator.AutoTFXTasks.benchmark.openml_vowel', 'evaluation', '1062')
+    input_dict = self._make_input_dict(test_evaluation_uri)
+    output_dict = self._make_output_dict()
+    exec_prop = self._make_executor_properties('test')
+    executor = BenchmarkResultPublisherExecutor()
+
+    executor.Do(input_dict, output_dict, exec_prop)
+
+    path = os.path.join(output_dict['benchmark_result'][0].uri,
+                        results.SLICE_METRICS_FILENAME)
+    with np.load(path) as columns:
+      slice_metrics = {
+          metric: value
+          for slice_name, metric, value in zip(
+              columns[results.SLICE_KEY], columns[results.METRIC_KEY],
+              columns[results.VALUE_KEY])
+          if slice_name == 'Overall'
+      }
+    self.assertEqual(
+        {
+            'accuracy': 0.042553190141916275,
+            'average_loss': 2.397735834121704,
+            'post_export_metrics/example_count': 94.0,
+        }, slice_metrics)
+
+  def testDoOnlyReadsMetrics(self):
+    test_evaluation_uri = os.path.join(
+        self._base_dir, 'testdata', 'benchmark_results',
+        'Evaluator.AutoTFXTasks.benchmark.openml_vowel', 'evaluation', '1062')
+    # Without the eval config and plots, which the publisher must not read.
+    evaluation_uri = self.create_tempdir().full_path
+    shutil.copy(os.path.join(test_evaluation_uri, 'metrics'), evaluation_uri)
+    input_dict = self._make_input_dict(evaluation_uri)
+    output_dict = self._make_output_dict()
+    exec_prop = self._make_executor_properties('test')
+    executor = BenchmarkResultPublisherExecutor()
+
+    executor.Do(input_dict, output_dict, exec_prop)
+
+    self.assertEqual(0.042553190141916275,
+                     self._get_eval_metrics(output_dict)['accuracy'])
+
+  def testDoPublishesCosts(self):
+    test_evaluation_uri = os.path.join(
+        self._base_dir, 'testdata', 'benchmark_results',
+        'Evaluator.AutoTFXTasks.benchmark.openml_vowel', 'evaluation', '1062')
+    input_dict = self._make_input_dict(test_evaluation_uri)
+    model = standard_artifacts.Model()
+    model_dir = self.create_tempdir()
+    model_dir.create_file(
+        os.path.join('serving_model_dir', 'saved_model.pb'),
+        content='0123456789')
+    model.uri = model_dir.full_path
+    model.mlmd_artifact.custom_properties[
+        instrumentation.WALL_TIME_SECONDS].double_value = 60.
+    hyperparameters = standard_artifacts.HyperParameters()
+    hyperparameters.set_int_custom_property(results.TUNER_TRIALS_KEY, 5)
+    hyperparameters.mlmd_artifact.custom_properties[
+        instrumentation.WALL_TIME_SECONDS].double_value = 300.
+    input_dict['model'] = [model]
+    input_dict['hyperparameters'] = [hyperparameters]
+    output_dict = self._make_output_dict()
+    exec_prop = self._make_executor_properties('test')
+    executor = BenchmarkResultPublisherExecutor()
+
+    executor.Do(input_dict, output_dict, exec_prop)
+
+    metrics = self._get_eval_metrics(output_dict)
+    self.assertEqual(60., metrics[results.TRAINER_WALL_TIME_KEY])
+    self.assertEqual(10, metrics[results.MODEL_SIZE_KEY])
+    self.assertEqual(5, metrics[results.TUNER_TRIALS_KEY])
+    self.assertEqual(300., metrics[results.TUNER_WALL_TIME_KEY])
+    self.assertNotIn(results.TRAIN_STEPS_KEY, metrics)
+
   def testDoWithInvalidEvaluatorURIThrows(self):
     input_dict = self._make_input_dict('/invalid_path')
     output_dict = self._make_output_dict()
@@ -83,5 +168,103 @@ class ExecutorTest(absltest.TestCase):
       executor.Do(input_dict, output_dict, exec_prop)
 
 
+class AggregateExecutorTest(absltest.TestCase):
+
+  def testDo(self):
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    evaluation = standard_artifacts.ModelEvaluation()
+    evaluation.uri = os.path.join(
+        base_dir, 'testdata', 'benchmark_results',
+        'Evaluator.AutoTFXTasks.benchmark.openml_vowel', 'evaluation', '1062')
+    input_dict = {'evaluation_0': [evaluation], 'evaluation_1': [evaluation]}
+    output_dict = {}
+    for i in range(2):
+      benchmark_result = BenchmarkResult()
+      benchmark_result.uri = self.create_tempdir().full_path
+      output_dict[f'benchmark_result_{i}'] = [benchmark_result]
+    exec_properties = {
+        'benchmarks':
+            json.dumps([{
+                'benchmark_name': 'test.run_1_of_2',
+                'run': 1,
+                'num_runs': 2
+            }, {
+                'benchmark_name': 'test.run_2_of_2',
+                'run': 2,
+                'num_runs': 2
+            }]),
+        'max_workers': 2,
+    }
+    executor = AggregateBenchmarkResultPublisherExecutor()
+
+    executor.Do(input_dict, output_dict, exec_properties)
+
+    for i in range(2):
+      properties = output_dict[f'benchmark_result_{i}'][0].mlmd_artifact
+      properties = properties.custom_properties
+      self.assertEqual(f'test.run_{i + 1}_of_2',
+                       properties[results.BENCHMARK_KEY].string_value)
+      self.assertEqual(i + 1, properties[results.RUN_KEY].int_value)
+      self.assertEqual(0.042553190141916275,
+                       properties['accuracy'].double_value)
+
+  def _make_missing_evaluation(self):
+    evaluation = standard_artifacts.ModelEvaluation()
+    evaluation.uri = os.path.join(self.create_tempdir().full_path, 'missing')
+    return evaluation
+
+  def testDoPublishesRemainingBenchmarks(self):
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    evaluation = standard_artifacts.ModelEvaluation()
+    evaluation.uri = os.path.join(
+        base_dir, 'testdata', 'benchmark_results',
+        'Evaluator.AutoTFXTasks.benchmark.openml_vowel', 'evaluation', '1062')
+    input_dict = {
+        'evaluation_0': [self._make_missing_evaluation()],
+        'evaluation_1': [evaluation],
+    }
+    output_dict = {
+        f'benchmark_result_{i}': [BenchmarkResult()] for i in range(2)
+    }
+    exec_properties = {
+        'benchmarks':
+            json.dumps([{
+                'benchmark_name': name,
+                'run': 1,
+                'num_runs': 1
+            } for name in ('failed', 'published')]),
+    }
+    for artifacts in output_dict.values():
+      artifacts[0].uri = self.create_tempdir().full_path
+
+    AggregateBenchmarkResultPublisherExecutor().Do(input_dict, output_dict,
+                                                   exec_properties)
+
+    failed = output_dict['benchmark_result_0'][0].mlmd_artifact
+    published = output_dict['benchmark_result_1'][0].mlmd_artifact
+    self.assertNotIn(results.BENCHMARK_KEY, failed.custom_properties)
+    self.assertEqual(
+        'published',
+        published.custom_properties[results.BENCHMARK_KEY].string_value)
+
+  def testDoWithoutAnyEvaluationThrows(self):
+    benchmark_result = BenchmarkResult()
+    benchmark_result.uri = self.create_tempdir().full_path
+    input_dict = {'evaluation_0': [self._make_missing_evaluation()]}
+    output_dict = {'benchmark_result_0': [benchmark_result]}
+    exec_properties = {
+        'benchmarks':
+            json.dumps([{
+                'benchmark_name': 'failed',
+                'run': 1,
+                'num_runs': 1
+            }]),
+    }
+
+    with self.assertRaises(ValueError):
+      AggregateBenchmarkResultPublisherExecutor().Do(input_dict, output_dict,
+                                                     exec_properties)
+
+
 if __name__ == '__main__':
   absltest.main()
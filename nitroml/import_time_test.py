@@ -0,0 +1,93 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+# Lint as: python3
+"""Import-time benchmark for the nitroml package.
+
+Guards against regressions of the lazy loading in the package `__init__`
+modules: importing nitroml, or only the submodule which is used, must not
+import the TF stack.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+from absl import logging
+from absl.testing import absltest
+from absl.testing import parameterized
+
+# Top-level modules which are slow to import.
+_HEAVY_MODULES = (
+    'kerastuner',
+    'tensorflow',
+    'tensorflow_data_validation',
+    'tensorflow_datasets',
+    'tensorflow_model_analysis',
+    'tensorflow_transform',
+    'tfx',
+)
+
+
+def _import_in_subprocess(statement):
+  """Runs `statement` in a fresh interpreter and returns its import stats."""
+
+  script = textwrap.dedent(f"""
+      import json
+      import sys
+      import time
+
+      start = time.time()
+      {statement}
+      print(json.dumps({{
+          'seconds': time.time() - start,
+          'modules': sorted({{m.split('.')[0] for m in sys.modules}}),
+      }}))
+  """)
+  root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+  output = subprocess.check_output([sys.executable, '-c', script],
+                                   cwd=root_dir)
+  return json.loads(output.decode('utf-8').splitlines()[-1])
+
+
+class ImportTimeTest(parameterized.TestCase):
+
+  @parameterized.named_parameters(
+      ('package', 'import nitroml'),
+      ('results', 'from nitroml import results'),
+      ('publisher constants',
+       'from nitroml.components.publisher import constants'),
+      ('suites', 'import nitroml.suites'),
+      ('tasks', 'import nitroml.tasks'),
+      ('autodata', 'import nitroml.autodata'),
+  )
+  def test_import_does_not_load_tf_stack(self, statement):
+    stats = _import_in_subprocess(statement)
+    logging.info('`%s` took %.3fs.', statement, stats['seconds'])
+    self.assertEmpty(set(_HEAVY_MODULES) & set(stats['modules']))
+
+  def test_attributes_are_loaded_on_access(self):
+    stats = _import_in_subprocess('import nitroml; nitroml.results.overview')
+    self.assertIn('pandas', stats['modules'])
+
+  def test_dir_lists_lazy_attributes(self):
+    import nitroml  # pylint: disable=g-import-not-at-top
+    self.assertContainsSubset(['Benchmark', 'results', 'run', 'suites'],
+                              dir(nitroml))
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -32,25 +32,38 @@ test cases.
 """
 
 import abc
+import collections
 import contextlib
+import hashlib
+import json
 import os
 import re
 import tempfile
-from typing import List, Optional, Text, TypeVar
+from typing import Any, Dict, List, Optional, Set, Text, Tuple, TypeVar
 
 from absl import app
 from absl import flags
 from absl import logging
+from nitroml import results
+from nitroml.components.publisher import component as publisher_component
+from nitroml.components.publisher.component import AggregateBenchmarkResultPublisher
 from nitroml.components.publisher.component import BenchmarkResultPublisher
+from nitroml.components.transform import component as transform
+from nitroml.orchestration import instrumentation
+from nitroml.orchestration import process_pool_dag_runner
 import tensorflow as tf
 import tensorflow_model_analysis as tfma
 from tfx import components as tfx
 from tfx import types
+from tfx.components.example_gen import component as example_gen
 from tfx.dsl.components.base import base_component
 from tfx.orchestration import pipeline as pipeline_lib
 from tfx.orchestration import tfx_runner as tfx_runner_lib
 from tfx.orchestration.beam import beam_dag_runner
 
+from google.protobuf import json_format
+from google.protobuf import message
+from ml_metadata import metadata_store
 from ml_metadata.proto import metadata_store_pb2
 # pylint: disable=g-import-not-at-top
 try:
@@ -61,6 +74,21 @@ except ModuleNotFoundError:
 
 T = TypeVar("T")
 
+# Number of hex digits of a fingerprint appended to component ids when the
+# `fingerprint_cache` flag is set.
+_FINGERPRINT_LENGTH = 12
+
+# Components whose outputs only depend on their inputs and execution properties.
+# Equivalent deterministic components are shared by every repetition of a
+# benchmark, whereas other components are assumed to be stochastic and are
+# repeated.
+_DETERMINISTIC_COMPONENTS = (
+    example_gen.FileBasedExampleGen,
+    tfx.StatisticsGen,
+    tfx.SchemaGen,
+    tfx.Transform,
+    transform.Transform,
+)
 
 FLAGS = flags.FLAGS
 
@@ -79,6 +107,93 @@ flags.DEFINE_integer(
     "parallel. When calling nitroml.results.overview(), metrics in benchmark "
     "run results can be optionally aggregated to compute means, standard "
     "deviations, and other aggregate metrics.")
+flags.DEFINE_integer(
+    "max_workers", None,
+    "Specifies the number of components to run concurrently on the local "
+    "machine when no `tfx_runner` is given. When set, the benchmark DAG is "
+    "executed by a `ProcessPoolDagRunner` which launches each component in a "
+    "worker process as soon as its upstream components have finished. For "
+    "example, passing `--max_workers=8` runs up to 8 components at a time. "
+    "Defaults to running the DAG with the BeamDagRunner.")
+flags.DEFINE_bool(
+    "lazy_match", False,
+    "When set, benchmarks and sub-benchmarks which do not match the `match` "
+    "regex are skipped before their components are built, instead of being "
+    "filtered out afterwards. Benchmark classes are skipped when the literal "
+    "prefix of the regex rules them out, e.g. `--match=\"MyBenchmark.*\"`. "
+    "Sub-benchmarks are skipped in the same way, e.g. with "
+    "`--match=\"MyBenchmark\\.benchmark\\.mnist.*\"`, and benchmark runs are "
+    "matched exactly before their evaluator is added. Suites such as "
+    "`OpenMLCC18` only download the datasets of matching tasks when given "
+    "`task_filter=self.matches_sub_benchmark`.")
+flags.DEFINE_integer(
+    "num_shards", None,
+    "Specifies the number of shards to split the benchmark DAG into. Each "
+    "shard runs as its own pipeline named `<pipeline_name>_shard_<i>_of_<k>` "
+    "against the same pipeline root and metadata store, so that, for example, "
+    "a large suite can run as several smaller Kubeflow workflows. Benchmarks "
+    "which share components, such as the repetitions of a benchmark or the "
+    "sub-benchmarks of a shared subpipeline, are always kept in the same "
+    "shard. Defaults to a single shard, unless `max_components_per_shard` is "
+    "set.")
+flags.DEFINE_integer(
+    "shard_index", None,
+    "Specifies the zero-based index of the single shard to run, e.g. to run "
+    "the shards from different processes. Defaults to running every shard one "
+    "after the other.")
+flags.DEFINE_integer(
+    "max_components_per_shard", None,
+    "Specifies the maximum number of components of a shard, including its "
+    "publisher when `aggregate_publisher` is set. When "
+    "`num_shards` is not set, it is the number of shards needed to satisfy "
+    "this limit.")
+flags.DEFINE_bool(
+    "fingerprint_cache", False,
+    "Whether to reuse the outputs of components from previous runs. When set, "
+    "caching is enabled and component ids are suffixed with a fingerprint of "
+    "the component's class, execution properties and inputs instead of with "
+    "the benchmark name, so that unchanged components have the same ids "
+    "across runs, e.g. after a crash or when a benchmark is added. When no "
+    "`pipeline_root` is given, a persistent one is used instead of a "
+    "temporary directory. TFX only reuses the outputs of executions with the "
+    "same pipeline name and component id. Shards are named "
+    "`<pipeline_name>_shard_<i>_of_<k>`, so this flag is the only way to get "
+    "cache hits for sharded runs, and only with the same sharding flags. "
+    "The execution properties of components must be JSON values or protos.")
+flags.DEFINE_bool(
+    "resume", False,
+    "Whether to skip the benchmark runs whose results were already published "
+    "to the metadata store by a previous run of the same pipeline, including "
+    "by any of its shards. Implies `fingerprint_cache`, so that the finished "
+    "upstream components of the remaining benchmark runs are reused too.")
+flags.DEFINE_bool(
+    "critical_path_order", False,
+    "Whether the `ProcessPoolDagRunner` of `max_workers` launches ready "
+    "components by decreasing length of the critical path which they start, "
+    "so that the largest tasks are started first. Component costs are "
+    "estimated from the size of the datasets they consume and from the "
+    "durations of the pipeline's previous runs recorded in MLMD with "
+    "`instrument`. Ignored by other runners.")
+flags.DEFINE_bool(
+    "aggregate_publisher", False,
+    "Whether to publish the results of the benchmark runs which share "
+    "components, e.g. the runs on the same dataset, with a single component "
+    "instead of with a component per benchmark run. The evaluations are "
+    "loaded concurrently in a single execution, which avoids starting "
+    "hundreds of small containers on Kubeflow. A publisher depends on every "
+    "evaluator of its group of benchmark runs, so a failed benchmark run "
+    "prevents the other runs of its group from being published, but not the "
+    "runs of other groups. Ignored with `resume`, which publishes every "
+    "benchmark run separately so that the finished runs are published "
+    "despite the failed ones.")
+flags.DEFINE_bool(
+    "instrument", False,
+    "Whether to record the wall time, CPU time, peak memory and I/O of each "
+    "component execution in MLMD. The measurements can be read back as cost "
+    "columns with `nitroml.results.overview(store, include_costs=True)`. "
+    "In-process components are launched by an `InstrumentedComponentLauncher` "
+    "in the runner's config; on Kubeflow the container image must be able to "
+    "import `nitroml.orchestration.instrumentation`.")
 
 
 def _validate_regex(regex: Text) -> bool:
@@ -92,11 +207,181 @@ def _validate_regex(regex: Text) -> bool:
 flags.register_validator(
     "match", _validate_regex, message="--match must be a valid regex.")
 
+_REGEX_SPECIAL_CHARS = frozenset("^$*+?{}[]|()")
+_REGEX_QUANTIFIERS = frozenset("*+?{")
+
+
+def _regex_prefix(regex: Text) -> List[Optional[Text]]:
+  """Returns the characters which any match of the regex must start with.
+
+  Only the leading literal characters and '.' wildcards of the regex are
+  considered. Parsing stops at the first other construct, and the last
+  character is dropped when it is quantified.
+
+  Args:
+    regex: A regex.
+
+  Returns:
+    A list of characters, where None stands for any character.
+  """
+
+  if "|" in regex:
+    return []
+  if regex.startswith("^"):
+    regex = regex[1:]
+  prefix = []
+  i = 0
+  while i < len(regex):
+    char = regex[i]
+    if char == "\\":
+      if i + 1 == len(regex) or regex[i + 1].isalnum():
+        # Character classes like \d and special escapes like \n.
+        break
+      atom, width = regex[i + 1], 2
+    elif char == ".":
+      atom, width = None, 1
+    elif char in _REGEX_SPECIAL_CHARS:
+      break
+    else:
+      atom, width = char, 1
+    if regex[i + width:i + width + 1] in _REGEX_QUANTIFIERS:
+      break
+    prefix.append(atom)
+    i += width
+  return prefix
+
+
+def _may_match(regex: Text, name: Text) -> bool:
+  """Returns whether the regex may match `name` or a name nested under it.
+
+  Nested names are of the form '<name>.<suffix>'. The check is conservative:
+  it only returns False when the literal prefix of the regex rules out every
+  nested name.
+
+  Args:
+    regex: A regex, matched with `re.match`.
+    name: A benchmark name.
+  """
+
+  if re.match(regex, name):
+    return True
+  prefix = _regex_prefix(regex)
+  for char, atom in zip(name + ".", prefix):
+    if atom is not None and atom != char:
+      return False
+  return True
+
 
 def _qualified_name(prefix: Text, name: Text) -> Text:
   return "{}.{}".format(prefix, name) if prefix else name
 
 
+def _run_name(benchmark_name: Text, repetition: int,
+              num_repetitions: int) -> Text:
+  """Returns the name of a repetition of a benchmark."""
+
+  if num_repetitions == 1:
+    return benchmark_name
+  return f"{benchmark_name}.run_{repetition}_of_{num_repetitions}"
+
+
+def _message_to_dict(value: Any) -> Dict[Text, Any]:
+  """Converts protos nested in execution properties for `json.dumps`."""
+
+  if isinstance(value, message.Message):
+    return json_format.MessageToDict(value)
+  raise TypeError(f"{type(value).__name__} is not JSON serializable.")
+
+
+def _serialize_property(value: Any) -> Optional[Text]:
+  """Returns a stable string representation of an execution property.
+
+  Args:
+    value: The value of the execution property.
+
+  Returns:
+    The JSON representation of the value, or None if it cannot be serialized
+    deterministically, e.g. for custom objects.
+  """
+
+  try:
+    return json.dumps(value, sort_keys=True, default=_message_to_dict)
+  except (TypeError, ValueError):
+    return None
+
+
+class _Fingerprinter(object):
+  """Computes content fingerprints of components.
+
+  Two components have the same fingerprint when they are of the same class,
+  have the same execution properties, and consume the same outputs of upstream
+  components with the same fingerprints, or the same external artifacts.
+  Stochastic components additionally need to belong to the same benchmark
+  repetition.
+
+  Components with execution properties which cannot be serialized
+  deterministically only have the same fingerprint as themselves, unless the
+  fingerprints must be stable across runs.
+  """
+
+  def __init__(self,
+               components: List[base_component.BaseComponent],
+               repetitions: Dict[base_component.BaseComponent, int],
+               stable: bool = False):
+    """Constructs a _Fingerprinter.
+
+    Args:
+      components: All the components of the DAG.
+      repetitions: The benchmark repetition each component belongs to.
+      stable: Whether fingerprints must be the same across runs, e.g. to name
+        components after them.
+    """
+
+    self._producers = {}
+    for component in components:
+      for key, channel in component.outputs.items():
+        self._producers[channel] = (component, key)
+    self._repetitions = repetitions
+    self._stable = stable
+    self._fingerprints = {}
+
+  def fingerprint(self, component: base_component.BaseComponent) -> Text:
+    """Returns the component's fingerprint."""
+
+    if component not in self._fingerprints:
+      self._fingerprints[component] = self._compute_fingerprint(component)
+    return self._fingerprints[component]
+
+  def _compute_fingerprint(self,
+                           component: base_component.BaseComponent) -> Text:
+    component_class = component.__class__
+    parts = [f"{component_class.__module__}.{component_class.__qualname__}"]
+    executor_class = getattr(component.executor_spec, "executor_class", None)
+    if executor_class:
+      parts.append(f"{executor_class.__module__}.{executor_class.__qualname__}")
+    for key, value in sorted(component.exec_properties.items()):
+      serialized_value = _serialize_property(value)
+      if serialized_value is None:
+        if self._stable:
+          raise ValueError(
+              f"Cannot fingerprint execution property {key} of {component.id}: "
+              f"{type(value).__name__} is not JSON serializable. Use JSON "
+              "values or protos, or unset `fingerprint_cache` and `resume`.")
+        # The component is not deduplicated with any other.
+        serialized_value = f"<unique {id(component)}>"
+      parts.append(f"{key}={serialized_value}")
+    for key, channel in sorted(component.inputs.items()):
+      if channel in self._producers:
+        producer, output_key = self._producers[channel]
+        parts.append(f"{key}<-{self.fingerprint(producer)}.{output_key}")
+      else:
+        uris = sorted(artifact.uri for artifact in channel.get())
+        parts.append(f"{key}<-{channel.type_name}{uris}")
+    if not isinstance(component, _DETERMINISTIC_COMPONENTS):
+      parts.append(f"repetition={self._repetitions.get(component)}")
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
 class _BenchmarkPipeline(object):
   """A pipeline for a benchmark."""
 
@@ -130,6 +415,46 @@ class _BenchmarkPipeline(object):
       return self._base_pipeline
 
 
+def _upstream_channels(
+    benchmark_pipeline: _BenchmarkPipeline,
+    replacements: Optional[Dict[base_component.BaseComponent,
+                                base_component.BaseComponent]] = None
+) -> Dict[Text, types.Channel]:
+  """Returns the channels from which the publisher reads cost signals.
+
+  Args:
+    benchmark_pipeline: A benchmark pipeline with an evaluator.
+    replacements: Optional dict mapping the deduplicated components to the
+      components replacing them, whose outputs the consumers were rewired to.
+
+  Returns:
+    A dict with the evaluated `model` channel, and the `hyperparameters` and
+    `transformed_examples` channels consumed by the Trainer of the model, when
+    they exist.
+  """
+
+  replacements = replacements or {}
+  evaluator = replacements.get(benchmark_pipeline.evaluator,
+                               benchmark_pipeline.evaluator)
+  model = evaluator.inputs.get_all().get("model")
+  if not model:
+    return {}
+  channels = {"model": model}
+  trainers = [
+      c for c in (replacements.get(c, c)
+                  for c in benchmark_pipeline.base_pipeline)
+      if any(channel is model for channel in c.outputs.get_all().values())
+  ]
+  if trainers:
+    trainer_inputs = trainers[0].inputs.get_all()
+    if trainer_inputs.get("hyperparameters"):
+      channels["hyperparameters"] = trainer_inputs["hyperparameters"]
+    # Trainers consume transformed examples alongside the transform graph.
+    if trainer_inputs.get("transform_graph") and trainer_inputs.get("examples"):
+      channels["transformed_examples"] = trainer_inputs["examples"]
+  return channels
+
+
 class _RepeatablePipeline(object):
   """A repeatable benchmark."""
 
@@ -146,10 +471,20 @@ class _RepeatablePipeline(object):
 
   @property
   def benchmark_name(self) -> Text:
-    name = self.benchmark_pipeline.benchmark_name
-    if self._num_repetitions == 1:
-      return name
-    return f"{name}.run_{self._repetition}_of_{self._num_repetitions}"
+    return _run_name(self.benchmark_pipeline.benchmark_name, self._repetition,
+                     self._num_repetitions)
+
+  @property
+  def repetition(self) -> int:
+    return self._repetition
+
+  @property
+  def num_repetitions(self) -> int:
+    return self._num_repetitions
+
+  @property
+  def add_publisher(self) -> bool:
+    return self._add_publisher
 
   @property
   def publisher(self) -> BenchmarkResultPublisher:
@@ -158,7 +493,8 @@ class _RepeatablePipeline(object):
           self.benchmark_name,
           self.benchmark_pipeline.evaluator.outputs.evaluation,
           run=self._repetition,
-          num_runs=self._num_repetitions)
+          num_runs=self._num_repetitions,
+          **_upstream_channels(self.benchmark_pipeline))
     return self._publisher
 
   @property
@@ -172,16 +508,290 @@ class _RepeatablePipeline(object):
 class _ConcatenatedPipelineBuilder(object):
   """Constructs a pipeline composed of repeatable benchmark pipelines.
 
-  For combining multiple benchmarked pipelines into a single DAG.
+  For combining multiple benchmarked pipelines into a single DAG. Equivalent
+  components of different benchmarks, or of different repetitions of the same
+  benchmark, are collapsed into a single shared component.
+
+  When `aggregate_publisher` is set, the results of the pipelines are
+  published by an `AggregateBenchmarkResultPublisher` per group of pipelines
+  which share components, instead of by a `BenchmarkResultPublisher` per
+  pipeline. TFX does not launch a component after one of its upstream
+  components failed, so the groups are the failure boundaries: a failed
+  component only prevents the results of its own group from being published.
   """
 
-  def __init__(self, pipelines: List[_RepeatablePipeline]):
+  def __init__(self,
+               pipelines: List[_RepeatablePipeline],
+               aggregate_publisher: bool = False):
     self._pipelines = pipelines
+    self._aggregate_publisher = aggregate_publisher
 
   @property
   def benchmark_names(self) -> List[Text]:
     return [p.benchmark_name for p in self._pipelines]
 
+  @property
+  def pipelines(self) -> List[_RepeatablePipeline]:
+    return self._pipelines
+
+  def _pipeline_components(
+      self, repeatable_pipeline: _RepeatablePipeline
+  ) -> List[base_component.BaseComponent]:
+    """Returns the components of a pipeline, except an aggregated publisher."""
+
+    if self._aggregate_publisher:
+      return repeatable_pipeline.benchmark_pipeline.pipeline
+    return repeatable_pipeline.components
+
+  def _make_aggregate_publishers(
+      self, replacements: Dict[base_component.BaseComponent,
+                               base_component.BaseComponent]
+  ) -> List[base_component.BaseComponent]:
+    """Returns a publisher of the results of each group of pipelines, if any.
+
+    Args:
+      replacements: A dict mapping each deduplicated component to the component
+        replacing it, as returned by `_deduplicate`.
+
+    Returns:
+      An `AggregateBenchmarkResultPublisher` per group of pipelines sharing
+      components, named after its first benchmark run, for the groups with
+      published pipelines.
+    """
+
+    publishers = []
+    for group, _ in self._connected_groups(replacements):
+      published_pipelines = [p for p in group if p.add_publisher]
+      if not published_pipelines:
+        continue
+      evaluators = [
+          replacements.get(p.benchmark_pipeline.evaluator,
+                           p.benchmark_pipeline.evaluator)
+          for p in published_pipelines
+      ]
+      publishers.append(
+          AggregateBenchmarkResultPublisher(
+              benchmark_names=[p.benchmark_name for p in published_pipelines],
+              evaluations=[
+                  evaluator.outputs.evaluation for evaluator in evaluators
+              ],
+              runs=[p.repetition for p in published_pipelines],
+              num_runs=[p.num_repetitions for p in published_pipelines],
+              upstreams=[
+                  _upstream_channels(p.benchmark_pipeline, replacements)
+                  for p in published_pipelines
+              ],
+              instance_name=published_pipelines[0].benchmark_name))
+    return publishers
+
+  def _connected_groups(
+      self,
+      replacements: Optional[Dict[base_component.BaseComponent,
+                                  base_component.BaseComponent]] = None
+  ) -> List[Tuple[List[_RepeatablePipeline], int]]:
+    """Groups the pipelines which share components after deduplication.
+
+    Pipelines which consume the outputs of another pipeline's components, like
+    the sub-benchmarks of a subpipeline created with
+    `create_subpipeline_shared_with_subbenchmarks`, are grouped with it too.
+
+    Args:
+      replacements: Optional dict returned by `_deduplicate`. Deduplicates the
+        components when not given.
+
+    Returns:
+      A list of (pipelines, num_components) tuples in the order of their first
+      pipeline, where num_components is the number of distinct components of
+      the group's pipelines.
+    """
+
+    if replacements is None:
+      replacements = self._deduplicate()
+    parents = list(range(len(self._pipelines)))
+
+    def find(i):
+      while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+      return i
+
+    def union(i, j):
+      root, other_root = find(i), find(j)
+      parents[max(root, other_root)] = min(root, other_root)
+
+    owners = {}
+    producers = {}
+    for i, repeatable_pipeline in enumerate(self._pipelines):
+      for component in self._pipeline_components(repeatable_pipeline):
+        component = replacements.get(component, component)
+        if component in owners:
+          union(i, owners[component])
+          continue
+        owners[component] = i
+        for channel in component.outputs.values():
+          producers[channel] = i
+    # Inputs were rewired to the outputs of the shared components above.
+    for i, repeatable_pipeline in enumerate(self._pipelines):
+      for component in self._pipeline_components(repeatable_pipeline):
+        component = replacements.get(component, component)
+        for channel in component.inputs.values():
+          if channel in producers:
+            union(i, producers[channel])
+
+    groups = collections.OrderedDict()
+    for i, repeatable_pipeline in enumerate(self._pipelines):
+      groups.setdefault(find(i), []).append(repeatable_pipeline)
+    result = []
+    for group in groups.values():
+      components = set()
+      for repeatable_pipeline in group:
+        components.update(
+            replacements.get(c, c)
+            for c in self._pipeline_components(repeatable_pipeline))
+      result.append((group, len(components)))
+    return result
+
+  def shard(
+      self,
+      num_shards: Optional[int] = None,
+      max_components_per_shard: Optional[int] = None
+  ) -> List["_ConcatenatedPipelineBuilder"]:
+    """Splits the pipelines into shards which can be built independently.
+
+    Pipelines which share components, or consume the outputs of each other's
+    components, are never split across shards. Groups of pipelines are
+    assigned from largest to smallest to the shard with the fewest components,
+    so the partition is deterministic. The aggregate publisher of each group
+    counts towards the components of its shard.
+
+    Args:
+      num_shards: The number of shards. Defaults to the fewest shards which
+        satisfy `max_components_per_shard`, or to a single shard.
+      max_components_per_shard: The maximum number of components of a shard.
+
+    Returns:
+      A list of `num_shards` builders. Some may be empty when there are fewer
+      groups of pipelines than shards.
+
+    Raises:
+      ValueError: If the arguments are not strictly positive, or when the
+        pipelines cannot be split to satisfy `max_components_per_shard`.
+    """
+
+    if num_shards is not None and num_shards <= 0:
+      raise ValueError("num_shards must be strictly positive; "
+                       f"got num_shards={num_shards} instead.")
+    if max_components_per_shard is not None and max_components_per_shard <= 0:
+      raise ValueError("max_components_per_shard must be strictly positive; "
+                       "got max_components_per_shard="
+                       f"{max_components_per_shard} instead.")
+
+    groups = self._connected_groups()
+    # Stable sort, so ties are broken by the order of the pipelines.
+    order = sorted(range(len(groups)), key=lambda i: -groups[i][1])
+    # Each group with published pipelines gets its own aggregate publisher.
+    publisher_sizes = [
+        1 if self._aggregate_publisher and any(
+            p.add_publisher for p in group) else 0 for group, _ in groups
+    ]
+    for i in order:
+      group, size = groups[i]
+      size += publisher_sizes[i]
+      if max_components_per_shard and size > max_components_per_shard:
+        raise ValueError(
+            f"{group[0].benchmark_name} and the benchmarks sharing its "
+            f"components have {size} components, which exceeds "
+            f"max_components_per_shard={max_components_per_shard}.")
+
+    shard_sizes = [0] * (num_shards or 1)
+
+    def _added_size(i):
+      return groups[i][1] + publisher_sizes[i]
+
+    assignments = {}
+    for i in order:
+      if num_shards:
+        shard_index = shard_sizes.index(min(shard_sizes))
+      else:
+        # First fit, adding shards as needed.
+        shard_index = next(
+            (j for j, shard_size in enumerate(shard_sizes)
+             if not max_components_per_shard or
+             shard_size + _added_size(i) <= max_components_per_shard), None)
+        if shard_index is None:
+          shard_index = len(shard_sizes)
+          shard_sizes.append(0)
+      shard_sizes[shard_index] += _added_size(i)
+      assignments[i] = shard_index
+    if max_components_per_shard and max(shard_sizes) > max_components_per_shard:
+      raise ValueError(
+          f"The benchmarks have {sum(shard_sizes)} components, which cannot be "
+          f"split into num_shards={num_shards} shards of at most "
+          f"max_components_per_shard={max_components_per_shard} components.")
+
+    shards = [[] for _ in shard_sizes]
+    for i, (group, _) in enumerate(groups):
+      shards[assignments[i]].extend(group)
+    return [
+        _ConcatenatedPipelineBuilder(pipelines, self._aggregate_publisher)
+        for pipelines in shards
+    ]
+
+  def _components(self) -> List[base_component.BaseComponent]:
+    """Returns the distinct components of the pipelines in order."""
+
+    components = []
+    seen = set()
+    for repeatable_pipeline in self._pipelines:
+      for component in self._pipeline_components(repeatable_pipeline):
+        if component not in seen:
+          components.append(component)
+          seen.add(component)
+    return components
+
+  def _make_fingerprinter(self, stable: bool = False) -> _Fingerprinter:
+    repetitions = {}
+    for repeatable_pipeline in self._pipelines:
+      for component in self._pipeline_components(repeatable_pipeline):
+        repetitions.setdefault(component, repeatable_pipeline.repetition)
+    return _Fingerprinter(self._components(), repetitions, stable=stable)
+
+  def _deduplicate(
+      self
+  ) -> Dict[base_component.BaseComponent, base_component.BaseComponent]:
+    """Collapses components with the same fingerprint into one.
+
+    The first component with a given fingerprint is kept, and the consumers of
+    its duplicates are rewired to its outputs.
+
+    Returns:
+      A dict mapping each duplicate component to the component replacing it.
+    """
+
+    components = self._components()
+    fingerprinter = self._make_fingerprinter()
+
+    canonical_components = {}
+    replacements = {}
+    replaced_channels = {}
+    for component in components:
+      fingerprint = fingerprinter.fingerprint(component)
+      if fingerprint not in canonical_components:
+        canonical_components[fingerprint] = component
+        continue
+      shared_component = canonical_components[fingerprint]
+      replacements[component] = shared_component
+      for key, channel in component.outputs.items():
+        replaced_channels[channel] = shared_component.outputs[key]
+
+    for component in components:
+      for key, channel in list(component.inputs.items()):
+        if channel in replaced_channels:
+          component.inputs[key] = replaced_channels[channel]
+    if replacements:
+      logging.info("Deduplicated %d equivalent components.", len(replacements))
+    return replacements
+
   def build(self,
             pipeline_name: Optional[Text],
             pipeline_root: Optional[Text],
@@ -189,6 +799,7 @@ class _ConcatenatedPipelineBuilder(object):
                 metadata_store_pb2.ConnectionConfig] = None,
             enable_cache: Optional[bool] = False,
             beam_pipeline_args: Optional[List[Text]] = None,
+            name_by_fingerprint: bool = False,
             **kwargs) -> pipeline_lib.Pipeline:
     """Contatenates multiple benchmarks into a single pipeline DAG.
 
@@ -199,44 +810,63 @@ class _ConcatenatedPipelineBuilder(object):
       enable_cache: whether or not cache is enabled for this run.
       beam_pipeline_args: Beam pipeline args for beam jobs within executor.
         Executor will use beam DirectRunner as Default.
+      name_by_fingerprint: whether to suffix component ids with their
+        fingerprint instead of their benchmark name, so that ids are stable
+        across runs and TFX can reuse the outputs of previous runs.
       **kwargs: additional kwargs forwarded as pipeline args.
 
     Returns:
       A TFX Pipeline.
     """
 
-    # Set defaults.
-    if not pipeline_name:
-      pipeline_name = "nitroml"
-    if not pipeline_root:
-      tmp_root_dir = os.path.join("/tmp", pipeline_name)
-      tf.io.gfile.makedirs(tmp_root_dir)
-      pipeline_root = tempfile.mkdtemp(dir=tmp_root_dir)
-      logging.info("Creating tmp pipeline_root at %s", pipeline_root)
-    if not metadata_connection_config:
-      metadata_connection_config = metadata_store_pb2.ConnectionConfig(
-          sqlite=metadata_store_pb2.SqliteMetadataSourceConfig(
-              filename_uri=os.path.join(pipeline_root, "mlmd.sqlite")))
+    (pipeline_name, pipeline_root,
+     metadata_connection_config) = _resolve_pipeline_defaults(
+         pipeline_name,
+         pipeline_root,
+         metadata_connection_config,
+         persistent_root=name_by_fingerprint)
 
     # Ensure that pipeline dirs are created.
     _make_pipeline_dirs(pipeline_root, metadata_connection_config)
 
+    replacements = self._deduplicate()
+    fingerprinter = (
+        self._make_fingerprinter(stable=True) if name_by_fingerprint else None)
+
+    # Components shared by several repetitions of a benchmark are named after
+    # the benchmark instead of after one of its repetitions.
+    repetitions = collections.defaultdict(set)
+    for repeatable_pipeline in self._pipelines:
+      for component in self._pipeline_components(repeatable_pipeline):
+        repetitions[replacements.get(component, component)].add(
+            repeatable_pipeline.repetition)
+
     dag = []
     logging.info("NitroML benchmarks:")
     seen = set()
     for repeatable_pipeline in self._pipelines:
       logging.info("\t%s", repeatable_pipeline.benchmark_name)
       logging.info("\t\tRUNNING")
-      components = repeatable_pipeline.components
+      components = [
+          replacements.get(c, c)
+          for c in self._pipeline_components(repeatable_pipeline)
+      ]
       for component in components:
         if component in seen:
           continue
+        name = repeatable_pipeline.benchmark_name
+        if len(repetitions[component]) > 1:
+          name = repeatable_pipeline.benchmark_pipeline.benchmark_name
+        if fingerprinter:
+          name = fingerprinter.fingerprint(component)[:_FINGERPRINT_LENGTH]
         # pylint: disable=protected-access
-        component._instance_name = _qualified_name(
-            component._instance_name, repeatable_pipeline.benchmark_name)
+        component._instance_name = _qualified_name(component._instance_name,
+                                                   name)
         # pylint: enable=protected-access
         seen.add(component)
       dag += components
+    if self._aggregate_publisher:
+      dag += self._make_aggregate_publishers(replacements)
     return pipeline_lib.Pipeline(
         pipeline_name=pipeline_name,
         pipeline_root=pipeline_root,
@@ -247,6 +877,72 @@ class _ConcatenatedPipelineBuilder(object):
         **kwargs)
 
 
+def _resolve_pipeline_defaults(
+    pipeline_name: Optional[Text],
+    pipeline_root: Optional[Text],
+    metadata_connection_config: Optional[metadata_store_pb2.ConnectionConfig],
+    persistent_root: bool = False):
+  """Returns the pipeline name, root and metadata config with defaults set.
+
+  Args:
+    pipeline_name: Name of the pipeline.
+    pipeline_root: Path to root directory of the pipeline.
+    metadata_connection_config: The config to connect to ML metadata.
+    persistent_root: Whether the default pipeline root, and the default
+      metadata store within it, should be the same across runs instead of a new
+      temporary directory.
+  """
+
+  if not pipeline_name:
+    pipeline_name = "nitroml"
+  if not pipeline_root:
+    tmp_root_dir = os.path.join("/tmp", pipeline_name)
+    tf.io.gfile.makedirs(tmp_root_dir)
+    if persistent_root:
+      pipeline_root = os.path.join(tmp_root_dir, "cache")
+      logging.info("Using persistent pipeline_root at %s", pipeline_root)
+    else:
+      pipeline_root = tempfile.mkdtemp(dir=tmp_root_dir)
+      logging.info("Creating tmp pipeline_root at %s", pipeline_root)
+  if not metadata_connection_config:
+    metadata_connection_config = metadata_store_pb2.ConnectionConfig(
+        sqlite=metadata_store_pb2.SqliteMetadataSourceConfig(
+            filename_uri=os.path.join(pipeline_root, "mlmd.sqlite")))
+  return pipeline_name, pipeline_root, metadata_connection_config
+
+
+def _get_published_benchmark_names(
+    metadata_connection_config: metadata_store_pb2.ConnectionConfig,
+    pipeline_name: Text) -> Set[Text]:
+  """Returns the names of the benchmarks published by the given pipeline.
+
+  Args:
+    metadata_connection_config: The config to connect to ML metadata.
+    pipeline_name: Name of the pipeline. Results published by any of its
+      shards are included.
+
+  Returns:
+    The set of benchmark names, including their run suffixes, with a
+    published BenchmarkResult.
+  """
+
+  pipeline_name_regex = re.compile(
+      re.escape(pipeline_name) + r"(_shard_\d+_of_\d+)?")
+  store = metadata_store.MetadataStore(metadata_connection_config)
+  names = set()
+  for artifact in store.get_artifacts_by_type(
+      publisher_component.BenchmarkResult.TYPE_NAME):
+    properties = artifact.custom_properties
+    if "state" in properties and (properties["state"].string_value !=
+                                  types.artifact.ArtifactState.PUBLISHED):
+      continue
+    if not pipeline_name_regex.fullmatch(
+        properties["pipeline_name"].string_value):
+      continue
+    names.add(properties[results.BENCHMARK_KEY].string_value)
+  return names
+
+
 def _make_pipeline_dirs(
     pipeline_root: Text,
     metadata_connection_config: metadata_store_pb2.ConnectionConfig) -> None:
@@ -282,6 +978,10 @@ class Benchmark(abc.ABC):
     self._benchmark = self  # The sub-benchmark stack.
     self._result = None
     self._seen_benchmarks = None
+    self._match = ""  # Regex which benchmark names must match.
+    self._lazy_match = False  # Whether to skip non-matching sub-benchmarks.
+    self._repetition = 1  # The run of the benchmark being built.
+    self._num_repetitions = 1
 
   @abc.abstractmethod
   def benchmark(self, **kwargs):
@@ -306,16 +1006,45 @@ class Benchmark(abc.ABC):
 
     Yields:
       A context manager which executes the enclosed code block as a
-      sub-benchmark.
+      sub-benchmark. It yields False when the `lazy_match` flag is set and the
+      sub-benchmark does not match the `match` flag, in which case the block
+      should skip building its components. For example:
+
+        for task in suite:
+          with self.sub_benchmark(task.name) as matched:
+            if not matched:
+              continue
+            ...
     """
 
+    matched = self.matches_sub_benchmark(name)
     benchmark = self._benchmark
     self._benchmark = _SubBenchmark(benchmark, name)
     try:
-      yield
+      yield matched
     finally:
       self._benchmark = benchmark
 
+  def matches_sub_benchmark(self, name: Text) -> bool:
+    """Returns whether the sub-benchmark with the given name should be built.
+
+    Sub-benchmarks are only skipped when the `lazy_match` flag is set, and
+    when the literal prefix of the `match` regex rules out the sub-benchmark
+    and every name nested under it. Benchmark runs are matched exactly by
+    `evaluate`. This lets benchmarks skip constructing the tasks of
+    non-matching sub-benchmarks altogether, e.g. to only download the datasets
+    of matching tasks:
+
+      suite = nitroml.suites.OpenMLCC18(
+          data_dir, task_filter=self.matches_sub_benchmark)
+
+    Args:
+      name: The name of a sub-benchmark of the current benchmark.
+    """
+
+    return not self._lazy_match or _may_match(
+        self._match, _qualified_name(self._benchmark.id(), name))
+
   def evaluate(
       self,
       pipeline: List[base_component.BaseComponent],
@@ -348,6 +1077,13 @@ class Benchmark(abc.ABC):
                        "Consider creating a sub-benchmark instead.")
     self._seen_benchmarks.add(benchmark_name)
 
+    run_name = _run_name(benchmark_name, self._repetition,
+                         self._num_repetitions)
+    if not re.match(self._match, run_name):
+      logging.info("Skipping %s which does not match %s.", run_name,
+                   self._match)
+      return
+
     # Automatically add an Evaluator component to evaluate the produced model on
     # the test set.
     # TODO(b/146611976): Include a Model-agnostic Evaluator which computes
@@ -467,11 +1203,42 @@ def run(benchmarks: List[Benchmark],
   First it concatenates all the benchmark pipelines into a single DAG
   benchmark pipeline. Next it executes the workflow via tfx_runner.run().
 
-  When the `match` flag is set, matched benchmarks are filtered by name.
+  When the `match` flag is set, matched benchmarks are filtered by name. When
+  the `lazy_match` flag is also set, benchmarks and sub-benchmarks which do not
+  match are skipped before their components are built.
 
   When the `runs_per_benchmark` flag is set, each benchmark is run the number
-  of times specified.
+  of times specified. The repetitions share the outputs of their deterministic
+  components, such as ExampleGens and the AutoData components, so that only
+  the stochastic components like Tuners, Trainers and Evaluators are repeated.
+
+  Equivalent components declared by different benchmarks, e.g. the same
+  ExampleGen of a dataset used by several benchmarks, are only run once.
+
+  When the `resume` flag is set, benchmark runs whose results were already
+  published to the metadata store by this pipeline are skipped.
+
+  When the `fingerprint_cache` flag is set, caching is enabled and components
+  are identified by content fingerprints, so that unchanged components reuse
+  the outputs of previous runs against the same pipeline root and metadata
+  store.
 
+  When the `aggregate_publisher` flag is set, the results of the benchmark runs
+  which share components are published by a single component. Since that
+  component waits for every evaluator of its group, a failed benchmark run
+  prevents the other runs of its group from being published, so the flag is
+  ignored when `resume` is set.
+
+  When the `instrument` flag is set, the wall time, CPU time, peak memory and
+  I/O of every component execution are recorded in MLMD.
+
+  When the `max_workers` flag is set and no `tfx_runner` is given, the DAG is
+  executed locally by a `ProcessPoolDagRunner` with that many workers.
+
+  When the `num_shards` or `max_components_per_shard` flags are set, the DAG
+  is split into shards which run as separate pipelines against the same
+  pipeline root and metadata store. Only the shard at `shard_index` is run
+  when that flag is set.
 
   Args:
     benchmarks: List of Benchmark instances to include in the suite.
@@ -489,7 +1256,8 @@ def run(benchmarks: List[Benchmark],
     The string list of benchmark names that were included in this run.
 
   Raises:
-    ValueError: If the given tfx_runner is not supported.
+    ValueError: If the given tfx_runner is not supported, or if the sharding
+      flags are invalid.
   """
 
   runs_per_benchmark = FLAGS.runs_per_benchmark
@@ -498,37 +1266,137 @@ def run(benchmarks: List[Benchmark],
 
 
   if not tfx_runner:
-    logging.info("Setting TFX runner to OSS default: BeamDagRunner.")
-    tfx_runner = beam_dag_runner.BeamDagRunner()
+    if FLAGS.max_workers:
+      logging.info("Setting TFX runner to ProcessPoolDagRunner with %d workers.",
+                   FLAGS.max_workers)
+      tfx_runner = process_pool_dag_runner.ProcessPoolDagRunner(
+          max_workers=FLAGS.max_workers,
+          critical_path_order=FLAGS.critical_path_order)
+    else:
+      logging.info("Setting TFX runner to OSS default: BeamDagRunner.")
+      tfx_runner = beam_dag_runner.BeamDagRunner()
+  if FLAGS.critical_path_order and not isinstance(
+      tfx_runner, process_pool_dag_runner.ProcessPoolDagRunner):
+    logging.warning("--critical_path_order is ignored by %s.",
+                    type(tfx_runner).__name__)
+  if FLAGS.instrument:
+    instrumentation.instrument_config(tfx_runner.config)
 
   if runs_per_benchmark <= 0:
     raise ValueError("runs_per_benchmark must be strictly positive; "
                      f"got runs_per_benchmark={runs_per_benchmark} instead.")
 
+  fingerprint_cache = FLAGS.fingerprint_cache or FLAGS.resume
+  if fingerprint_cache:
+    enable_cache = True
+  # Every shard shares the same pipeline root and metadata store.
+  (pipeline_name, pipeline_root,
+   metadata_connection_config) = _resolve_pipeline_defaults(
+       pipeline_name,
+       pipeline_root,
+       metadata_connection_config,
+       persistent_root=fingerprint_cache)
+  published_benchmark_names = set()
+  if FLAGS.resume:
+    _make_pipeline_dirs(pipeline_root, metadata_connection_config)
+    published_benchmark_names = _get_published_benchmark_names(
+        metadata_connection_config, pipeline_name)
+
   pipelines = []
   for b in benchmarks:
+    if FLAGS.lazy_match and not _may_match(FLAGS.match, b.id()):
+      logging.info("Skipping %s which cannot match %s.", b.id(), FLAGS.match)
+      continue
+    # pylint: disable=protected-access
+    b._match = FLAGS.match
+    b._lazy_match = FLAGS.lazy_match
+    b._num_repetitions = runs_per_benchmark
+    # pylint: enable=protected-access
     for benchmark_run in range(runs_per_benchmark):
+      b._repetition = benchmark_run + 1  # pylint: disable=protected-access
       # Call benchmarks with pipeline args.
       result = b(**kwargs)
-      for pipeline in result.pipelines:
-        if re.match(FLAGS.match, pipeline.benchmark_name):
-          pipelines.append(
-              _RepeatablePipeline(
-                  pipeline,
-                  repetition=benchmark_run + 1,  # One-index runs.
-                  num_repetitions=runs_per_benchmark,
-                  add_publisher=pipeline.evaluator is not None))
-  pipeline_builder = _ConcatenatedPipelineBuilder(pipelines)
-
-  benchmark_pipeline = pipeline_builder.build(
-      pipeline_name=pipeline_name,
-      pipeline_root=pipeline_root,
-      metadata_connection_config=metadata_connection_config,
-      enable_cache=enable_cache,
-      beam_pipeline_args=beam_pipeline_args,
-      **kwargs)
-  tfx_runner.run(benchmark_pipeline)
-  return pipeline_builder.benchmark_names
+      repeatable_pipelines = [
+          _RepeatablePipeline(
+              pipeline,
+              repetition=benchmark_run + 1,  # One-index runs.
+              num_repetitions=runs_per_benchmark,
+              add_publisher=pipeline.evaluator is not None)
+          for pipeline in result.pipelines
+      ]
+      benchmark_pipelines = []
+      for p in repeatable_pipelines:
+        if not p.benchmark_pipeline.evaluator:
+          continue
+        if not re.match(FLAGS.match, p.benchmark_name):
+          continue
+        if p.benchmark_name in published_benchmark_names:
+          logging.info("Skipping %s which was already published.",
+                       p.benchmark_name)
+          continue
+        benchmark_pipelines.append(p)
+      if not benchmark_pipelines:
+        # Every benchmark was filtered out, so shared subpipelines are unused.
+        continue
+      # Subpipelines shared with sub-benchmarks have no evaluator, and are
+      # kept for the remaining sub-benchmarks.
+      pipelines += [
+          p for p in repeatable_pipelines
+          if p in benchmark_pipelines or not p.benchmark_pipeline.evaluator
+      ]
+  if FLAGS.resume and not pipelines:
+    logging.info("Every benchmark was already published.")
+    return []
+  aggregate_publisher = FLAGS.aggregate_publisher
+  if aggregate_publisher and FLAGS.resume:
+    logging.info("Publishing each benchmark run separately, since `resume` is "
+                 "set.")
+    aggregate_publisher = False
+  pipeline_builder = _ConcatenatedPipelineBuilder(
+      pipelines, aggregate_publisher=aggregate_publisher)
+
+  if not FLAGS.num_shards and not FLAGS.max_components_per_shard:
+    if FLAGS.shard_index:
+      raise ValueError("shard_index must be 0 when there is a single shard; "
+                       f"got shard_index={FLAGS.shard_index} instead.")
+    benchmark_pipeline = pipeline_builder.build(
+        pipeline_name=pipeline_name,
+        pipeline_root=pipeline_root,
+        metadata_connection_config=metadata_connection_config,
+        enable_cache=enable_cache,
+        beam_pipeline_args=beam_pipeline_args,
+        name_by_fingerprint=fingerprint_cache,
+        **kwargs)
+    tfx_runner.run(benchmark_pipeline)
+    return pipeline_builder.benchmark_names
+
+  shards = pipeline_builder.shard(
+      num_shards=FLAGS.num_shards,
+      max_components_per_shard=FLAGS.max_components_per_shard)
+  shard_indices = range(len(shards))
+  if FLAGS.shard_index is not None:
+    if FLAGS.shard_index not in shard_indices:
+      raise ValueError(f"shard_index must be in [0, {len(shards)}); "
+                       f"got shard_index={FLAGS.shard_index} instead.")
+    shard_indices = [FLAGS.shard_index]
+
+  benchmark_names = []
+  for shard_index in shard_indices:
+    shard = shards[shard_index]
+    if not shard.pipelines:
+      logging.info("Shard %d of %d is empty.", shard_index, len(shards))
+      continue
+    benchmark_pipeline = shard.build(
+        pipeline_name=f"{pipeline_name}_shard_{shard_index}_of_{len(shards)}",
+        pipeline_root=pipeline_root,
+        metadata_connection_config=metadata_connection_config,
+        enable_cache=enable_cache,
+        beam_pipeline_args=beam_pipeline_args,
+        name_by_fingerprint=fingerprint_cache,
+        **kwargs)
+    tfx_runner.run(benchmark_pipeline)
+    benchmark_names += shard.benchmark_names
+  return benchmark_names
 
 
 def main(*args, **kwargs) -> None:
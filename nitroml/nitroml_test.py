@@ -18,6 +18,7 @@
 import abc
 import base64
 import json
+import os
 import re
 import sys
 
@@ -25,11 +26,16 @@ from absl import flags
 from absl.testing import absltest
 from absl.testing import parameterized
 from nitroml import nitroml
+from nitroml.orchestration import instrumentation
+from tfx import components as tfx
 
 from tfx.orchestration.beam import beam_dag_runner
 from tfx.types import channel_utils
 from tfx.types import standard_artifacts
 
+from ml_metadata import metadata_store
+from ml_metadata.proto import metadata_store_pb2
+
 FLAGS = flags.FLAGS
 
 
@@ -51,15 +57,32 @@ class FakePipeline(object):
     return channel_utils.as_channel([model])
 
 
+class FakeComponent(object):
+  """A fake component without inputs and outputs for testing."""
+
+  def __init__(self, exec_properties):
+    self.id = 'FakeComponent'
+    self.exec_properties = exec_properties
+    self.executor_spec = None
+    self.inputs = {}
+    self.outputs = {}
+
+
 class FakeBeamDagRunner(beam_dag_runner.BeamDagRunner):
   """A fake Beam TFX runner for testing."""
 
+  def __init__(self):
+    super(FakeBeamDagRunner, self).__init__()
+    self.pipeline = None
+    self.pipelines = []
+
   def run(self, pipeline):
+    self.pipeline = pipeline
+    self.pipelines.append(pipeline)
     return pipeline
 
 
 
-
 class Benchmarks(object):
   """Hide these benchmarks from the nitroml.main runner below."""
 
@@ -140,6 +163,82 @@ class Benchmarks(object):
             examples=pipeline.examples,
             model=pipeline.model)
 
+  class BenchmarkWithDataPreparation(nitroml.Benchmark):
+
+    def benchmark(self):
+      pipeline = FakePipeline()
+      examples = pipeline.examples
+      statistics_gen = tfx.StatisticsGen(examples=examples)
+      schema_gen = tfx.SchemaGen(
+          statistics=statistics_gen.outputs.statistics)
+      self.evaluate([statistics_gen, schema_gen],
+                    examples=examples,
+                    model=pipeline.model)
+
+  class OtherBenchmarkWithDataPreparation(BenchmarkWithDataPreparation):
+    pass
+
+  class BenchmarkWithSharedSubpipeline(nitroml.Benchmark):
+
+    def benchmark(self):
+      pipeline = FakePipeline()
+      examples = pipeline.examples
+      statistics_gen = tfx.StatisticsGen(examples=examples)
+      self.create_subpipeline_shared_with_subbenchmarks([statistics_gen])
+      for name, infer_feature_shape in [('mnist', True),
+                                        ('chicago_taxi', False)]:
+        with self.sub_benchmark(name):
+          # Only consumes the outputs of the shared subpipeline.
+          schema_gen = tfx.SchemaGen(
+              statistics=statistics_gen.outputs.statistics,
+              infer_feature_shape=infer_feature_shape)
+          model = standard_artifacts.Model()
+          model.uri = f'/models/{name}'
+          self.evaluate([schema_gen],
+                        examples=examples,
+                        model=channel_utils.as_channel([model]))
+
+  class BenchmarkWithTwoDatasets(nitroml.Benchmark):
+
+    def benchmark(self):
+      for name in ['mnist', 'chicago_taxi']:
+        with self.sub_benchmark(name):
+          examples = standard_artifacts.Examples()
+          examples.uri = f'/examples/{name}'
+          examples = channel_utils.as_channel([examples])
+          statistics_gen = tfx.StatisticsGen(examples=examples)
+          schema_gen = tfx.SchemaGen(
+              statistics=statistics_gen.outputs.statistics)
+          model = standard_artifacts.Model()
+          model.uri = f'/models/{name}'
+          self.evaluate([statistics_gen, schema_gen],
+                        examples=examples,
+                        model=channel_utils.as_channel([model]))
+
+  class LazySubBenchmarks(nitroml.Benchmark):
+
+    def __init__(self):
+      super(Benchmarks.LazySubBenchmarks, self).__init__()
+      self.constructed = []
+      self.built = []
+
+    def benchmark(self):
+      # Tasks are only constructed for the sub-benchmarks which may be built.
+      self.constructed = [
+          name for name in ['mnist', 'chicago_taxi']
+          if self.matches_sub_benchmark(name)
+      ]
+      for name in self.constructed:
+        with self.sub_benchmark(name) as matched:
+          if not matched:
+            continue
+          self.built.append(name)
+          pipeline = FakePipeline()
+          self.evaluate(
+              pipeline.components,
+              examples=pipeline.examples,
+              model=pipeline.model)
+
   # Error causing benchmarks below:
 
   class CallAddBenchmarkTwice(nitroml.Benchmark):
@@ -173,6 +272,15 @@ class NitroMLTest(parameterized.TestCase, absltest.TestCase):
     flags.FLAGS(sys.argv)
     # Reset flags.
     FLAGS.runs_per_benchmark = 1
+    FLAGS.match = ''
+    FLAGS.lazy_match = False
+    FLAGS.num_shards = None
+    FLAGS.shard_index = None
+    FLAGS.max_components_per_shard = None
+    FLAGS.instrument = False
+    FLAGS.fingerprint_cache = False
+    FLAGS.resume = False
+    FLAGS.aggregate_publisher = False
 
   @parameterized.named_parameters(
       {
@@ -197,6 +305,393 @@ class NitroMLTest(parameterized.TestCase, absltest.TestCase):
     benchmark_names = nitroml.run(benchmarks, tfx_runner=FakeBeamDagRunner())
     self.assertEqual(want_benchmarks, benchmark_names)
 
+  def test_run_shares_deterministic_components(self):
+    FLAGS.runs_per_benchmark = 3
+    runner = FakeBeamDagRunner()
+    nitroml.run([Benchmarks.BenchmarkWithDataPreparation()], tfx_runner=runner)
+
+    name = 'Benchmarks.BenchmarkWithDataPreparation.benchmark'
+    self.assertSameElements([
+        f'StatisticsGen.{name}',
+        f'SchemaGen.{name}',
+        f'Evaluator.{name}.run_1_of_3',
+        f'Evaluator.{name}.run_2_of_3',
+        f'Evaluator.{name}.run_3_of_3',
+        f'BenchmarkResultPublisher.{name}.run_1_of_3',
+        f'BenchmarkResultPublisher.{name}.run_2_of_3',
+        f'BenchmarkResultPublisher.{name}.run_3_of_3',
+    ], [c.id for c in runner.pipeline.components])
+
+  def test_run_publishes_model_costs(self):
+    runner = FakeBeamDagRunner()
+    nitroml.run([Benchmarks.BenchmarkNoComponents()], tfx_runner=runner)
+
+    [evaluator] = [
+        c for c in runner.pipeline.components if c.id.startswith('Evaluator')
+    ]
+    [publisher] = [
+        c for c in runner.pipeline.components
+        if c.id.startswith('BenchmarkResultPublisher')
+    ]
+    self.assertIs(evaluator.inputs['model'], publisher.inputs['model'])
+
+  def test_run_with_aggregate_publisher(self):
+    FLAGS.aggregate_publisher = True
+    FLAGS.runs_per_benchmark = 2
+    runner = FakeBeamDagRunner()
+    nitroml.run([Benchmarks.BenchmarkWithDataPreparation()], tfx_runner=runner)
+
+    name = 'Benchmarks.BenchmarkWithDataPreparation.benchmark'
+    self.assertSameElements([
+        f'StatisticsGen.{name}',
+        f'SchemaGen.{name}',
+        f'Evaluator.{name}.run_1_of_2',
+        f'Evaluator.{name}.run_2_of_2',
+        f'AggregateBenchmarkResultPublisher.{name}.run_1_of_2',
+    ], [c.id for c in runner.pipeline.components])
+    publisher = runner.pipeline.components[-1]
+    self.assertSameElements(
+        [c.id for c in runner.pipeline.components if c.id.startswith('Eval')],
+        [c.id for c in publisher.upstream_nodes])
+
+  def test_run_with_aggregate_publisher_per_group(self):
+    FLAGS.aggregate_publisher = True
+    runner = FakeBeamDagRunner()
+    nitroml.run([Benchmarks.BenchmarkWithTwoDatasets()], tfx_runner=runner)
+
+    components = {c.id: c for c in runner.pipeline.components}
+    name = 'Benchmarks.BenchmarkWithTwoDatasets.benchmark'
+    self.assertSameElements([
+        f'AggregateBenchmarkResultPublisher.{name}.mnist',
+        f'AggregateBenchmarkResultPublisher.{name}.chicago_taxi',
+    ], [c for c in components if c.startswith('Aggregate')])
+    publisher = components[f'AggregateBenchmarkResultPublisher.{name}.mnist']
+    self.assertIs(components[f'Evaluator.{name}.mnist'].inputs['model'],
+                  publisher.inputs['model_0'])
+    # TFX does not launch the components downstream of a failed one, which
+    # only include the publisher of the failed benchmark's group.
+    blocked = set()
+    failed = [components[f'Evaluator.{name}.mnist']]
+    while failed:
+      for node in failed.pop().downstream_nodes:
+        if node.id not in blocked:
+          blocked.add(node.id)
+          failed.append(node)
+    self.assertIn(f'AggregateBenchmarkResultPublisher.{name}.mnist', blocked)
+    self.assertNotIn(f'AggregateBenchmarkResultPublisher.{name}.chicago_taxi',
+                     blocked)
+
+  def test_run_with_aggregate_publisher_and_resume(self):
+    FLAGS.aggregate_publisher = True
+    FLAGS.resume = True
+    FLAGS.runs_per_benchmark = 2
+    connection_config = metadata_store_pb2.ConnectionConfig()
+    connection_config.sqlite.filename_uri = os.path.join(
+        self.create_tempdir().full_path, 'mlmd.sqlite')
+    runner = FakeBeamDagRunner()
+    nitroml.run([Benchmarks.BenchmarkWithDataPreparation()],
+                tfx_runner=runner,
+                metadata_connection_config=connection_config)
+
+    name = 'Benchmarks.BenchmarkWithDataPreparation.benchmark'
+    publisher_ids = [
+        c.id for c in runner.pipeline.components if 'Publisher' in c.id
+    ]
+    self.assertSameElements([
+        f'BenchmarkResultPublisher.{name}.run_1_of_2',
+        f'BenchmarkResultPublisher.{name}.run_2_of_2',
+    ], publisher_ids)
+
+  @parameterized.named_parameters(
+      {
+          'testcase_name': 'instrumented',
+          'instrument': True,
+      }, {
+          'testcase_name': 'not instrumented',
+          'instrument': False,
+      })
+  def test_run_instruments_launchers(self, instrument):
+    FLAGS.instrument = instrument
+    runner = FakeBeamDagRunner()
+    nitroml.run([Benchmarks.BenchmarkNoComponents()], tfx_runner=runner)
+
+    self.assertEqual(
+        instrument, instrumentation.InstrumentedComponentLauncher
+        in runner.config.supported_launcher_classes)
+
+  def test_run_with_fingerprint_cache(self):
+    FLAGS.fingerprint_cache = True
+    FLAGS.runs_per_benchmark = 2
+    runner = FakeBeamDagRunner()
+    nitroml.run([Benchmarks.BenchmarkWithDataPreparation()], tfx_runner=runner)
+    first_pipeline = runner.pipeline
+    # Rerun with an additional benchmark.
+    nitroml.run([
+        Benchmarks.BenchmarkNoComponents(),
+        Benchmarks.BenchmarkWithDataPreparation()
+    ],
+                tfx_runner=runner)
+
+    self.assertTrue(runner.pipeline.enable_cache)
+    self.assertEqual(first_pipeline.pipeline_info.pipeline_root,
+                     runner.pipeline.pipeline_info.pipeline_root)
+    first_ids = [c.id for c in first_pipeline.components]
+    self.assertLen(set(first_ids), 6)
+    self.assertContainsSubset(first_ids,
+                              [c.id for c in runner.pipeline.components])
+
+  def test_run_with_resume(self):
+    FLAGS.resume = True
+    FLAGS.runs_per_benchmark = 3
+    connection_config = metadata_store_pb2.ConnectionConfig()
+    connection_config.sqlite.filename_uri = os.path.join(
+        self.create_tempdir().full_path, 'mlmd.sqlite')
+    store = metadata_store.MetadataStore(connection_config)
+    artifact_type = metadata_store_pb2.ArtifactType(
+        name='NitroML.BenchmarkResult')
+    artifact_type_id = store.put_artifact_type(artifact_type)
+    name = 'Benchmarks.BenchmarkNoComponents.benchmark'
+    for pipeline_name, benchmark_name in [
+        ('nitroml', f'{name}.run_1_of_3'),
+        ('nitroml_shard_1_of_2', f'{name}.run_3_of_3'),
+        ('other_pipeline', f'{name}.run_2_of_3'),
+    ]:
+      artifact = metadata_store_pb2.Artifact(type_id=artifact_type_id)
+      artifact.custom_properties['pipeline_name'].string_value = pipeline_name
+      artifact.custom_properties['benchmark'].string_value = benchmark_name
+      artifact.custom_properties['state'].string_value = 'published'
+      store.put_artifacts([artifact])
+
+    benchmark_names = nitroml.run([Benchmarks.BenchmarkNoComponents()],
+                                  tfx_runner=FakeBeamDagRunner(),
+                                  pipeline_name='nitroml',
+                                  metadata_connection_config=connection_config)
+
+    self.assertEqual([f'{name}.run_2_of_3'], benchmark_names)
+
+  def test_run_deduplicates_equivalent_components(self):
+    runner = FakeBeamDagRunner()
+    nitroml.run([
+        Benchmarks.BenchmarkWithDataPreparation(),
+        Benchmarks.OtherBenchmarkWithDataPreparation()
+    ],
+                tfx_runner=runner)
+
+    name = 'Benchmarks.BenchmarkWithDataPreparation.benchmark'
+    other_name = 'Benchmarks.OtherBenchmarkWithDataPreparation.benchmark'
+    self.assertSameElements([
+        f'StatisticsGen.{name}',
+        f'SchemaGen.{name}',
+        f'Evaluator.{name}',
+        f'BenchmarkResultPublisher.{name}',
+        f'BenchmarkResultPublisher.{other_name}',
+    ], [c.id for c in runner.pipeline.components])
+
+  @parameterized.named_parameters(
+      {
+          'testcase_name': 'all shards',
+          'shard_index': None,
+          'want_pipelines': {
+              'nitroml_shard_0_of_2': [
+                  'Benchmarks.BenchmarkNoComponents.benchmark.run_1_of_3',
+                  'Benchmarks.BenchmarkNoComponents.benchmark.run_3_of_3',
+              ],
+              'nitroml_shard_1_of_2': [
+                  'Benchmarks.BenchmarkNoComponents.benchmark.run_2_of_3',
+              ],
+          },
+      }, {
+          'testcase_name': 'single shard',
+          'shard_index': 1,
+          'want_pipelines': {
+              'nitroml_shard_1_of_2': [
+                  'Benchmarks.BenchmarkNoComponents.benchmark.run_2_of_3',
+              ],
+          },
+      })
+  def test_run_shards(self, shard_index, want_pipelines):
+    FLAGS.runs_per_benchmark = 3
+    FLAGS.num_shards = 2
+    FLAGS.shard_index = shard_index
+    runner = FakeBeamDagRunner()
+    benchmark_names = nitroml.run([Benchmarks.BenchmarkNoComponents()],
+                                  tfx_runner=runner)
+
+    self.assertEqual(
+        [name for names in want_pipelines.values() for name in names],
+        benchmark_names)
+    self.assertEqual(
+        list(want_pipelines),
+        [p.pipeline_info.pipeline_name for p in runner.pipelines])
+    # Every shard shares the same pipeline root and metadata store.
+    self.assertLen(set(p.pipeline_info.pipeline_root for p in runner.pipelines),
+                   1)
+    for pipeline in runner.pipelines:
+      names = want_pipelines[pipeline.pipeline_info.pipeline_name]
+      self.assertSameElements(
+          [f'{c}.{n}' for c in ('Evaluator', 'BenchmarkResultPublisher')
+           for n in names],
+          [c.id for c in pipeline.components])
+
+  def test_run_shards_keeps_shared_components_together(self):
+    FLAGS.runs_per_benchmark = 2
+    FLAGS.max_components_per_shard = 6
+    runner = FakeBeamDagRunner()
+    nitroml.run([Benchmarks.BenchmarkWithDataPreparation()], tfx_runner=runner)
+
+    self.assertLen(runner.pipelines, 1)
+    self.assertEqual('nitroml_shard_0_of_1',
+                     runner.pipeline.pipeline_info.pipeline_name)
+    self.assertLen(runner.pipeline.components, 6)
+
+  def test_run_shards_keeps_shared_subpipelines_with_their_consumers(self):
+    FLAGS.num_shards = 2
+    runner = FakeBeamDagRunner()
+    nitroml.run([Benchmarks.BenchmarkWithSharedSubpipeline()],
+                tfx_runner=runner)
+
+    self.assertLen(runner.pipelines, 1)
+    self.assertEqual('nitroml_shard_0_of_2',
+                     runner.pipeline.pipeline_info.pipeline_name)
+    self.assertLen(runner.pipeline.components, 7)
+
+  def test_run_shards_counts_aggregate_publishers(self):
+    FLAGS.aggregate_publisher = True
+    FLAGS.runs_per_benchmark = 2
+    FLAGS.max_components_per_shard = 2
+    runner = FakeBeamDagRunner()
+    nitroml.run([Benchmarks.BenchmarkNoComponents()], tfx_runner=runner)
+
+    self.assertLen(runner.pipelines, 2)
+    for pipeline in runner.pipelines:
+      self.assertEqual(['Evaluator', 'AggregateBenchmarkResultPublisher'],
+                       [c.id.split('.')[0] for c in pipeline.components])
+
+  @parameterized.named_parameters(
+      {
+          'testcase_name': 'shared components exceed max_components_per_shard',
+          'num_shards': None,
+          'shard_index': None,
+          'max_components_per_shard': 5,
+      }, {
+          'testcase_name': 'too few shards for max_components_per_shard',
+          'num_shards': 1,
+          'shard_index': None,
+          'max_components_per_shard': 5,
+      }, {
+          'testcase_name': 'zero num_shards',
+          'num_shards': 0,
+          'shard_index': None,
+          'max_components_per_shard': None,
+      }, {
+          'testcase_name': 'shard_index out of range',
+          'num_shards': 2,
+          'shard_index': 2,
+          'max_components_per_shard': None,
+      })
+  def test_run_shards_errors(self, num_shards, shard_index,
+                             max_components_per_shard):
+    FLAGS.runs_per_benchmark = 3
+    FLAGS.num_shards = num_shards
+    FLAGS.shard_index = shard_index
+    FLAGS.max_components_per_shard = max_components_per_shard
+    benchmark = Benchmarks.BenchmarkWithDataPreparation()
+    if num_shards == 1:
+      # Three independent repetitions of two components each.
+      benchmark = Benchmarks.BenchmarkNoComponents()
+    with self.assertRaises(ValueError):
+      nitroml.run([benchmark], tfx_runner=FakeBeamDagRunner())
+
+  @parameterized.named_parameters(
+      {
+          'testcase_name': 'lazy',
+          'lazy_match': True,
+          'want_built': ['mnist'],
+      }, {
+          'testcase_name': 'not lazy',
+          'lazy_match': False,
+          'want_built': ['mnist', 'chicago_taxi'],
+      })
+  def test_run_with_match(self, lazy_match, want_built):
+    FLAGS.match = r'Benchmarks\.LazySubBenchmarks\.benchmark\.mnist'
+    FLAGS.lazy_match = lazy_match
+    benchmark = Benchmarks.LazySubBenchmarks()
+    skipped_benchmark = Benchmarks.BenchmarkNoComponents()
+    benchmark_names = nitroml.run([benchmark, skipped_benchmark],
+                                  tfx_runner=FakeBeamDagRunner())
+
+    self.assertEqual(['Benchmarks.LazySubBenchmarks.benchmark.mnist'],
+                     benchmark_names)
+    self.assertEqual(want_built, benchmark.constructed)
+    self.assertEqual(want_built, benchmark.built)
+
+  def test_run_with_lazy_match_of_a_benchmark_run(self):
+    # Only matches the leaves, so the sub-benchmarks must not be skipped.
+    FLAGS.match = r'Benchmarks\.Lazy.*\.mnist\.run_2'
+    FLAGS.lazy_match = True
+    FLAGS.runs_per_benchmark = 2
+    benchmark = Benchmarks.LazySubBenchmarks()
+    benchmark_names = nitroml.run([benchmark], tfx_runner=FakeBeamDagRunner())
+
+    name = 'Benchmarks.LazySubBenchmarks.benchmark.mnist'
+    self.assertEqual([f'{name}.run_2_of_2'], benchmark_names)
+
+  @parameterized.named_parameters(
+      {
+          'testcase_name': 'matching name',
+          'regex': 'Foo.benchmark',
+          'name': 'Foo.benchmark',
+          'want': True,
+      }, {
+          'testcase_name': 'nested name may match',
+          'regex': r'Foo\.benchmark\.mnist',
+          'name': 'Foo.benchmark',
+          'want': True,
+      }, {
+          'testcase_name': 'wildcard prefix',
+          'regex': '.*mnist',
+          'name': 'Foo.benchmark',
+          'want': True,
+      }, {
+          'testcase_name': 'alternation',
+          'regex': 'Bar|Foo',
+          'name': 'Baz.benchmark',
+          'want': True,
+      }, {
+          'testcase_name': 'different prefix',
+          'regex': 'Bar.*',
+          'name': 'Foo.benchmark',
+          'want': False,
+      }, {
+          'testcase_name': 'different nested name',
+          'regex': r'Foo\.benchmarks',
+          'name': 'Foo.benchmark',
+          'want': False,
+      })
+  def test_may_match(self, regex, name, want):
+    self.assertEqual(want, nitroml._may_match(regex, name))
+
+  def test_serialize_property(self):
+    config = metadata_store_pb2.ConnectionConfig()
+    config.sqlite.filename_uri = '/tmp/mlmd.sqlite'
+
+    self.assertEqual(
+        '{"config": {"sqlite": {"filenameUri": "/tmp/mlmd.sqlite"}}, "x": 1}',
+        nitroml._serialize_property({'x': 1, 'config': config}))
+    self.assertIsNone(nitroml._serialize_property({'x': object()}))
+
+  def test_fingerprint_unserializable_property(self):
+    components = [FakeComponent({'x': object()}) for _ in range(2)]
+
+    fingerprinter = nitroml._Fingerprinter(components, {})
+    self.assertNotEqual(
+        fingerprinter.fingerprint(components[0]),
+        fingerprinter.fingerprint(components[1]))
+    stable_fingerprinter = nitroml._Fingerprinter(
+        components, {}, stable=True)
+    with self.assertRaisesRegex(ValueError, 'Cannot fingerprint'):
+      stable_fingerprinter.fingerprint(components[0])
+
   @parameterized.named_parameters(
       {
           'testcase_name': 'zero runs_per_benchmark flag',
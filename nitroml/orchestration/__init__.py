@@ -0,0 +1,31 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+# Lint as: python3
+"""Package nitroml.orchestration."""
+
+import typing
+
+from nitroml import _lazy
+
+if typing.TYPE_CHECKING:
+  from nitroml.orchestration.process_pool_dag_runner import ProcessPoolDagRunner
+
+__getattr__, __dir__ = _lazy.attach(__name__, {
+    "ProcessPoolDagRunner": "nitroml.orchestration.process_pool_dag_runner",
+})
+
+__all__ = [
+    "ProcessPoolDagRunner",
+]
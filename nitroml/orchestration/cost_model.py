@@ -0,0 +1,209 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+# Lint as: python3
+"""Estimates component costs to start the longest critical paths first.
+
+NitroML's DAGs are made of many independent per-task subgraphs whose sizes vary
+by orders of magnitude. Starting the subgraphs with the longest critical paths
+first (longest processing time first scheduling) avoids a huge dataset being
+started last and dominating the makespan.
+
+A component's cost is its mean wall time in previous runs, as recorded in MLMD
+by `nitroml.orchestration.instrumentation`. Components without history are
+estimated from their type and the size of the dataset they consume.
+"""
+
+import collections
+import os
+from typing import Dict, Iterable, List, Optional, Text
+
+from absl import logging
+from nitroml.orchestration import instrumentation
+from tfx.dsl.components.base import base_component
+
+from ml_metadata import metadata_store
+from ml_metadata.proto import metadata_store_pb2
+
+# Estimated seconds per megabyte of input data, by component class name. Class
+# names are matched by substring across the class hierarchy, e.g. 'Tuner'
+# matches `AugmentedTuner`.
+_SECONDS_PER_MEGABYTE = (
+    ("Tuner", 60.),
+    ("Trainer", 20.),
+    ("Transform", 4.),
+    ("Evaluator", 4.),
+    ("StatisticsGen", 2.),
+    ("ExampleGen", 2.),
+)
+_DEFAULT_SECONDS_PER_MEGABYTE = 1.
+# Components which don't consume a dataset are assumed to consume this much.
+_MIN_MEGABYTES = 1.
+_INPUT_BASE_KEY = "input_base"
+_COMPONENT_ID_KEY = "component_id"
+# The type of the MLMD contexts which TFX creates for each pipeline.
+_PIPELINE_CONTEXT_TYPE = "pipeline"
+
+
+def _seconds_per_megabyte(component: base_component.BaseComponent) -> float:
+  class_names = [cls.__name__ for cls in type(component).__mro__]
+  for name, seconds in _SECONDS_PER_MEGABYTE:
+    if any(name in class_name for class_name in class_names):
+      return seconds
+  return _DEFAULT_SECONDS_PER_MEGABYTE
+
+
+def _directory_megabytes(path: Text) -> float:
+  """Returns the total size of the files under `path` in megabytes."""
+
+  # TensorFlow is only imported when needed, since it is slow to import.
+  import tensorflow as tf  # pylint: disable=g-import-not-at-top
+
+  total_bytes = 0
+  try:
+    for dir_name, _, file_names in tf.io.gfile.walk(path):
+      for file_name in file_names:
+        total_bytes += tf.io.gfile.stat(os.path.join(dir_name,
+                                                     file_name)).length
+  except tf.errors.OpError as e:
+    logging.warning("Could not measure the size of %s: %s", path, e)
+  return total_bytes / 2**20
+
+
+def _input_paths(component: base_component.BaseComponent) -> List[Text]:
+  """Returns the external data paths which the component reads."""
+
+  input_base = component.exec_properties.get(_INPUT_BASE_KEY)
+  if input_base:
+    return [input_base]
+  paths = []
+  for _, channel in sorted(component.inputs.items()):
+    paths += [artifact.uri for artifact in channel.get() if artifact.uri]
+  return paths
+
+
+def load_durations(
+    metadata_connection_config: metadata_store_pb2.ConnectionConfig,
+    pipeline_name: Text) -> Dict[Text, float]:
+  """Returns the mean wall time of previous executions by component id.
+
+  Only the executions of the given pipeline are read, so the cost of the
+  lookup does not grow with the other pipelines sharing the store.
+
+  Args:
+    metadata_connection_config: The config to connect to ML metadata.
+    pipeline_name: The name of the pipeline whose executions to read.
+
+  Returns:
+    A dict mapping component ids to their mean wall time in seconds, for the
+    executions which were instrumented.
+  """
+
+  if (metadata_connection_config.HasField("sqlite") and not os.path.exists(
+      metadata_connection_config.sqlite.filename_uri)):
+    return {}
+  store = metadata_store.MetadataStore(metadata_connection_config)
+  context = store.get_context_by_type_and_name(_PIPELINE_CONTEXT_TYPE,
+                                               pipeline_name)
+  if context is None:
+    return {}
+  durations = collections.defaultdict(list)
+  for execution in store.get_executions_by_context(context.id):
+    if (_COMPONENT_ID_KEY in execution.properties and
+        instrumentation.WALL_TIME_SECONDS in execution.custom_properties):
+      durations[execution.properties[_COMPONENT_ID_KEY].string_value].append(
+          execution.custom_properties[
+              instrumentation.WALL_TIME_SECONDS].double_value)
+  return {
+      component_id: sum(times) / len(times)
+      for component_id, times in durations.items()
+  }
+
+
+def estimate_costs(
+    components: Iterable[base_component.BaseComponent],
+    durations: Optional[Dict[Text, float]] = None
+) -> Dict[base_component.BaseComponent, float]:
+  """Returns the estimated wall time of each component in seconds.
+
+  Args:
+    components: All the components of the DAG, whose upstream nodes are set,
+      e.g. the components of a TFX pipeline.
+    durations: Optional dict mapping component ids to their mean wall time in
+      previous runs, as returned by `load_durations`.
+
+  Returns:
+    A dict mapping each component to its estimated cost.
+  """
+
+  durations = durations or {}
+  components = list(components)
+  component_set = set(components)
+  megabytes = {}
+  directory_megabytes = {}
+
+  def _megabytes(component):
+    # The size of the largest dataset which the component depends on.
+    if component not in megabytes:
+      sizes = [_MIN_MEGABYTES]
+      for path in _input_paths(component):
+        if path not in directory_megabytes:
+          directory_megabytes[path] = _directory_megabytes(path)
+        sizes.append(directory_megabytes[path])
+      sizes += [
+          _megabytes(c) for c in component.upstream_nodes if c in component_set
+      ]
+      megabytes[component] = max(sizes)
+    return megabytes[component]
+
+  costs = {}
+  for component in components:
+    if component.id in durations:
+      costs[component] = durations[component.id]
+    else:
+      costs[component] = _seconds_per_megabyte(component) * _megabytes(
+          component)
+  return costs
+
+
+def critical_path_priorities(
+    costs: Dict[base_component.BaseComponent, float]
+) -> Dict[base_component.BaseComponent, float]:
+  """Returns the length of the longest path starting at each component.
+
+  A path's length is the sum of the costs of its components. Launching ready
+  components by decreasing priority starts the critical path first.
+
+  Args:
+    costs: A dict mapping every component of the DAG, whose downstream nodes
+      are set, to its cost.
+
+  Returns:
+    A dict mapping each component to its priority.
+  """
+
+  priorities = {}
+
+  def _priority(component):
+    if component not in priorities:
+      downstream_priorities = [
+          _priority(c) for c in component.downstream_nodes if c in costs
+      ]
+      priorities[component] = costs[component] + max(
+          downstream_priorities, default=0.)
+    return priorities[component]
+
+  for component in costs:
+    _priority(component)
+  return priorities
@@ -0,0 +1,126 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+# Lint as: python3
+"""Tests for nitroml.orchestration.cost_model."""
+
+import os
+
+from absl.testing import absltest
+from nitroml.orchestration import cost_model
+from nitroml.orchestration import instrumentation
+from tfx import components as tfx
+from tfx.types import channel_utils
+from tfx.types import standard_artifacts
+
+from ml_metadata import metadata_store
+from ml_metadata.proto import metadata_store_pb2
+
+
+class FakeNode(object):
+  """A fake DAG node for testing."""
+
+  def __init__(self, name, upstream_nodes=()):
+    self.id = name
+    self.upstream_nodes = set(upstream_nodes)
+    self.downstream_nodes = set()
+    for node in upstream_nodes:
+      node.downstream_nodes.add(self)
+
+
+class CostModelTest(absltest.TestCase):
+
+  def _make_components(self, examples_uri=''):
+    examples = standard_artifacts.Examples()
+    examples.uri = examples_uri
+    statistics_gen = tfx.StatisticsGen(
+        examples=channel_utils.as_channel([examples]))
+    schema_gen = tfx.SchemaGen(statistics=statistics_gen.outputs.statistics)
+    # Node dependencies are otherwise set by the TFX pipeline.
+    schema_gen.add_upstream_node(statistics_gen)
+    statistics_gen.add_downstream_node(schema_gen)
+    return statistics_gen, schema_gen
+
+  def testEstimateCostsUsesDurations(self):
+    statistics_gen, schema_gen = self._make_components()
+
+    costs = cost_model.estimate_costs([statistics_gen, schema_gen],
+                                      {statistics_gen.id: 30.})
+
+    self.assertEqual(30., costs[statistics_gen])
+    self.assertGreater(costs[schema_gen], 0)
+
+  def testEstimateCostsGrowWithDatasetSize(self):
+    small_dir = self.create_tempdir()
+    small_dir.create_file('data.csv', content='a' * 2**20)
+    large_dir = self.create_tempdir()
+    large_dir.create_file('data.csv', content='a' * 2**22)
+    small_components = self._make_components(small_dir.full_path)
+    large_components = self._make_components(large_dir.full_path)
+
+    costs = cost_model.estimate_costs(small_components + large_components)
+
+    for small, large in zip(small_components, large_components):
+      self.assertLess(costs[small], costs[large])
+
+  def testCriticalPathPriorities(self):
+    statistics_gen, schema_gen = self._make_components()
+
+    priorities = cost_model.critical_path_priorities({
+        statistics_gen: 3.,
+        schema_gen: 2.,
+    })
+
+    self.assertEqual({statistics_gen: 5., schema_gen: 2.}, priorities)
+
+  def testLoadDurationsWithoutStore(self):
+    config = metadata_store_pb2.ConnectionConfig()
+    config.sqlite.filename_uri = os.path.join(self.create_tempdir().full_path,
+                                              'missing.sqlite')
+
+    self.assertEqual({}, cost_model.load_durations(config, 'pipeline'))
+
+  def testLoadDurationsOfPipeline(self):
+    config = metadata_store_pb2.ConnectionConfig()
+    config.sqlite.filename_uri = os.path.join(self.create_tempdir().full_path,
+                                              'mlmd.sqlite')
+    store = metadata_store.MetadataStore(config)
+    context_type_id = store.put_context_type(
+        metadata_store_pb2.ContextType(name='pipeline'))
+    execution_type_id = store.put_execution_type(
+        metadata_store_pb2.ExecutionType(
+            name='Trainer',
+            properties={'component_id': metadata_store_pb2.STRING}))
+    for pipeline_name, wall_time in [('pipeline', 10.), ('other', 20.)]:
+      [context_id] = store.put_contexts([
+          metadata_store_pb2.Context(
+              type_id=context_type_id, name=pipeline_name)
+      ])
+      execution = metadata_store_pb2.Execution(type_id=execution_type_id)
+      execution.properties['component_id'].string_value = 'Trainer'
+      execution.custom_properties[
+          instrumentation.WALL_TIME_SECONDS].double_value = wall_time
+      [execution_id] = store.put_executions([execution])
+      store.put_attributions_and_associations([], [
+          metadata_store_pb2.Association(
+              context_id=context_id, execution_id=execution_id)
+      ])
+
+    self.assertEqual({'Trainer': 10.},
+                     cost_model.load_durations(config, 'pipeline'))
+    self.assertEqual({}, cost_model.load_durations(config, 'missing'))
+
+
+if __name__ == '__main__':
+  absltest.main()
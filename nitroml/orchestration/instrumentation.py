@@ -0,0 +1,189 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+# Lint as: python3
+"""Instruments component launchers to record the resource usage of executions.
+
+The `InstrumentedComponentLauncher` measures the wall time, CPU time, peak
+resident memory and I/O of each executor run, and records them as custom
+properties of the component's execution in MLMD once it is published.
+`nitroml.results.overview(store, include_costs=True)` reads them back as cost
+columns. The wall time is also recorded on the execution's output artifacts, so
+that downstream components, e.g. the BenchmarkResultPublisher, can read it from
+their inputs.
+
+CPU time and I/O are measured on the thread which runs the executor, so that
+components running concurrently in the same process, e.g. with the
+BeamDagRunner, are not charged for each other's usage. Work which an executor
+hands to other threads or processes, e.g. to multi-worker Beam pipelines, is
+not counted. On platforms without per-thread counters, the usage of the whole
+process is measured instead.
+"""
+
+import contextlib
+import resource
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Text
+
+from ml_metadata.metadata_store import metadata_store
+from tfx.orchestration.config import pipeline_config
+from tfx.orchestration.launcher import in_process_component_launcher
+from tfx.types import artifact as artifact_lib
+
+# Custom properties recorded on the executions of instrumented launchers.
+WALL_TIME_SECONDS = "nitroml_wall_time_seconds"
+USER_CPU_SECONDS = "nitroml_user_cpu_seconds"
+SYSTEM_CPU_SECONDS = "nitroml_system_cpu_seconds"
+PEAK_RSS_BYTES = "nitroml_peak_rss_bytes"
+BYTES_READ = "nitroml_bytes_read"
+BYTES_WRITTEN = "nitroml_bytes_written"
+
+# Per-thread counters are only available on Linux.
+_RUSAGE_WHO = getattr(resource, "RUSAGE_THREAD", resource.RUSAGE_SELF)
+_PROC_IO_PATH = ("/proc/thread-self/io" if hasattr(resource, "RUSAGE_THREAD")
+                 else "/proc/self/io")
+
+
+def _read_io_counters() -> Dict[Text, int]:
+  """Returns the bytes read and written by this thread, if available.
+
+  The counters include network I/O, e.g. reads from GCS, since they count the
+  bytes passed to read and write syscalls. They are only available on Linux.
+  """
+
+  counters = {}
+  try:
+    with open(_PROC_IO_PATH) as f:
+      for line in f:
+        key, value = line.split(":")
+        counters[key] = int(value)
+  except (OSError, ValueError):
+    return {}
+  if "rchar" not in counters or "wchar" not in counters:
+    return {}
+  return {BYTES_READ: counters["rchar"], BYTES_WRITTEN: counters["wchar"]}
+
+
+def _snapshot() -> Dict[Text, float]:
+  """Returns the current resource usage of this thread."""
+
+  usage = resource.getrusage(_RUSAGE_WHO)
+  # ru_maxrss is in kilobytes on Linux, and in bytes on macOS. It is the peak
+  # of the whole process, even for the usage of a thread.
+  rss_unit = 1 if sys.platform == "darwin" else 1024
+  snapshot = {
+      WALL_TIME_SECONDS: time.time(),
+      USER_CPU_SECONDS: usage.ru_utime,
+      SYSTEM_CPU_SECONDS: usage.ru_stime,
+      PEAK_RSS_BYTES: usage.ru_maxrss * rss_unit,
+  }
+  snapshot.update(_read_io_counters())
+  return snapshot
+
+
+@contextlib.contextmanager
+def measure_usage() -> Iterator[Dict[Text, float]]:
+  """Measures the resource usage of the enclosed code block on this thread.
+
+  The peak RSS is the peak of the whole process, which may have been reached
+  before the block was entered, e.g. by a previous execution in the same
+  worker process.
+
+  Yields:
+    A dict which is filled with the usage, keyed by custom property name, when
+    the block exits.
+  """
+
+  usage = {}
+  start = _snapshot()
+  try:
+    yield usage
+  finally:
+    end = _snapshot()
+    for key, value in end.items():
+      if key == PEAK_RSS_BYTES:
+        usage[key] = value
+      elif key in start:
+        usage[key] = value - start[key]
+
+
+def record_usage(store: metadata_store.MetadataStore, execution_id: int,
+                 usage: Dict[Text, float]) -> None:
+  """Records the usage as custom properties of the execution in MLMD."""
+
+  [execution] = store.get_executions_by_id([execution_id])
+  for key, value in usage.items():
+    if isinstance(value, int):
+      execution.custom_properties[key].int_value = value
+    else:
+      execution.custom_properties[key].double_value = value
+  store.put_executions([execution])
+
+
+class InstrumentedComponentLauncher(
+    in_process_component_launcher.InProcessComponentLauncher):
+  """Launches components in process and records their resource usage.
+
+  The launcher can be imported by path, e.g. by the Kubeflow container
+  entrypoint, as long as `nitroml` is installed in the component's image.
+  Executions whose results are cached are not measured.
+  """
+
+  def _run_executor(self, execution_id: int,
+                    input_dict: Dict[Text, List[artifact_lib.Artifact]],
+                    output_dict: Dict[Text, List[artifact_lib.Artifact]],
+                    exec_properties: Dict[Text, Any]) -> None:
+    with measure_usage() as usage:
+      super(InstrumentedComponentLauncher,
+            self)._run_executor(execution_id, input_dict, output_dict,
+                                exec_properties)
+    # Published with the output artifacts, for downstream components.
+    for artifacts in output_dict.values():
+      for artifact in artifacts:
+        artifact.mlmd_artifact.custom_properties[
+            WALL_TIME_SECONDS].double_value = usage[WALL_TIME_SECONDS]
+    self._measured_execution = (execution_id, usage)
+
+  def launch(self) -> Any:
+    # The execution is only recorded once it is published, since publishing
+    # overwrites it.
+    self._measured_execution = None
+    result = super(InstrumentedComponentLauncher, self).launch()
+    if self._measured_execution:
+      execution_id, usage = self._measured_execution
+      with self._metadata_connection as m:
+        record_usage(m.store, execution_id, usage)
+    return result
+
+
+def instrument_config(
+    config: pipeline_config.PipelineConfig) -> pipeline_config.PipelineConfig:
+  """Makes the config launch in-process components with instrumentation.
+
+  Args:
+    config: The pipeline config of a TFX runner, e.g. `tfx_runner.config`. It
+      is updated in place.
+
+  Returns:
+    The updated `config`.
+  """
+
+  in_process_launcher = in_process_component_launcher.InProcessComponentLauncher
+  config.supported_launcher_classes = [
+      InstrumentedComponentLauncher
+      if launcher_class is in_process_launcher else launcher_class
+      for launcher_class in config.supported_launcher_classes
+  ]
+  return config
@@ -0,0 +1,100 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+# Lint as: python3
+"""Tests for nitroml.orchestration.instrumentation."""
+
+import resource
+import threading
+
+from absl.testing import absltest
+from ml_metadata.metadata_store import metadata_store
+from ml_metadata.proto import metadata_store_pb2
+from nitroml.orchestration import instrumentation
+from tfx.orchestration.config import pipeline_config
+from tfx.orchestration.launcher import docker_component_launcher
+from tfx.orchestration.launcher import in_process_component_launcher
+
+
+def _burn_cpu():
+  return sum(i * i for i in range(1000000))
+
+
+class InstrumentationTest(absltest.TestCase):
+
+  def testMeasureUsage(self):
+    with instrumentation.measure_usage() as usage:
+      _burn_cpu()
+
+    self.assertGreater(usage[instrumentation.WALL_TIME_SECONDS], 0)
+    self.assertGreaterEqual(usage[instrumentation.USER_CPU_SECONDS], 0)
+    self.assertGreaterEqual(usage[instrumentation.SYSTEM_CPU_SECONDS], 0)
+    self.assertGreater(usage[instrumentation.PEAK_RSS_BYTES], 0)
+
+  def testMeasureUsageExcludesOtherThreads(self):
+    if not hasattr(resource, 'RUSAGE_THREAD'):
+      self.skipTest('Per-thread usage is only measured on Linux.')
+    stop = threading.Event()
+
+    def _burn_cpu_until_stopped():
+      while not stop.is_set():
+        _burn_cpu()
+
+    thread = threading.Thread(target=_burn_cpu_until_stopped)
+    with instrumentation.measure_usage() as usage:
+      thread.start()
+      stop.wait(1.)
+    stop.set()
+    thread.join()
+
+    # The thread measuring the usage was idle while the other one was busy.
+    self.assertLess(usage[instrumentation.USER_CPU_SECONDS],
+                    usage[instrumentation.WALL_TIME_SECONDS] / 2)
+
+  def testRecordUsage(self):
+    config = metadata_store_pb2.ConnectionConfig()
+    config.fake_database.SetInParent()
+    store = metadata_store.MetadataStore(config)
+    execution_type_id = store.put_execution_type(
+        metadata_store_pb2.ExecutionType(name='Trainer'))
+    [execution_id] = store.put_executions(
+        [metadata_store_pb2.Execution(type_id=execution_type_id)])
+
+    instrumentation.record_usage(
+        store, execution_id, {
+            instrumentation.WALL_TIME_SECONDS: 1.5,
+            instrumentation.BYTES_READ: 1024,
+        })
+
+    [execution] = store.get_executions_by_id([execution_id])
+    properties = execution.custom_properties
+    self.assertEqual(1.5,
+                     properties[instrumentation.WALL_TIME_SECONDS].double_value)
+    self.assertEqual(1024, properties[instrumentation.BYTES_READ].int_value)
+
+  def testInstrumentConfig(self):
+    config = pipeline_config.PipelineConfig(supported_launcher_classes=[
+        in_process_component_launcher.InProcessComponentLauncher,
+        docker_component_launcher.DockerComponentLauncher,
+    ])
+
+    self.assertIs(config, instrumentation.instrument_config(config))
+    self.assertEqual([
+        instrumentation.InstrumentedComponentLauncher,
+        docker_component_launcher.DockerComponentLauncher,
+    ], config.supported_launcher_classes)
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,255 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+# Lint as: python3
+"""A local TFX runner which executes ready components on a process pool.
+
+NitroML concatenates every benchmark into a single DAG made of many independent
+per-task subgraphs. The `ProcessPoolDagRunner` launches each component as soon
+as all of its upstream components have finished, running up to `max_workers`
+components concurrently so that a single machine can use all of its cores.
+Ready components can be launched longest critical path first, as estimated by
+`nitroml.orchestration.cost_model`, e.g. with `nitroml.run`'s
+`--critical_path_order`.
+"""
+
+from concurrent import futures
+import datetime
+import heapq
+import multiprocessing
+import os
+import pickle
+from typing import Any, Callable, Dict, List, Optional
+
+from absl import logging
+from nitroml.orchestration import cost_model
+from tfx.dsl.components.base import base_node
+from tfx.orchestration import data_types
+from tfx.orchestration import metadata
+from tfx.orchestration import pipeline as pipeline_lib
+from tfx.orchestration import tfx_runner
+from tfx.orchestration.config import config_utils
+from tfx.orchestration.config import pipeline_config
+from tfx.orchestration.launcher import docker_component_launcher
+from tfx.orchestration.launcher import in_process_component_launcher
+
+# Workers are spawned rather than forked, since forking a process in which TF,
+# Beam and gRPC have started threads may deadlock, and fork is unavailable on
+# Windows.
+_START_METHOD = 'spawn'
+
+# State of the worker processes, set once by `_init_worker` when they start, so
+# that only component indices are sent to them afterwards.
+_worker_pipeline = None
+_worker_config = None
+
+
+def _init_worker(serialized_pipeline: bytes) -> None:
+  """Initializes a worker process with the pipeline to run.
+
+  Args:
+    serialized_pipeline: The pickled (pipeline, pipeline config) pair.
+  """
+
+  global _worker_pipeline, _worker_config
+  _worker_pipeline, _worker_config = pickle.loads(serialized_pipeline)
+
+
+def _launch_component(index: int) -> None:
+  """Launches the component at `index` in the worker's pipeline."""
+
+  component = _worker_pipeline.components[index]
+  (component_launcher_class,
+   component_config) = config_utils.find_component_launch_info(
+       _worker_config, component)
+  launcher = component_launcher_class.create(
+      component=component,
+      pipeline_info=_worker_pipeline.pipeline_info,
+      driver_args=data_types.DriverArgs(
+          enable_cache=_worker_pipeline.enable_cache),
+      metadata_connection=metadata.Metadata(
+          _worker_pipeline.metadata_connection_config),
+      beam_pipeline_args=_worker_pipeline.beam_pipeline_args,
+      additional_pipeline_args=_worker_pipeline.additional_pipeline_args,
+      component_config=component_config)
+  logging.info('Component %s is running.', component.id)
+  launcher.launch()
+  logging.info('Component %s is finished.', component.id)
+
+
+def _execute_dag(components: List[base_node.BaseNode],
+                 launch_fn: Callable[[int], Any],
+                 executor: futures.Executor,
+                 priorities: Optional[Dict[base_node.BaseNode, float]] = None,
+                 max_running: Optional[int] = None) -> None:
+  """Executes each component once all of its upstream nodes have finished.
+
+  Args:
+    components: The pipeline's components, whose upstream and downstream nodes
+      define the DAG.
+    launch_fn: Function which launches the component at the given index of
+      `components`. Submitted to `executor`.
+    executor: The executor on which to run `launch_fn`.
+    priorities: Optional dict mapping components to their priority. Ready
+      components with higher priorities are launched first. Defaults to
+      launching components in order.
+    max_running: The maximum number of components submitted to `executor` at
+      once, so that ready components wait in priority order. Defaults to no
+      limit.
+
+  Raises:
+    Exception: The first exception raised by a component. Components which are
+      already running are allowed to finish, but no new component is launched.
+  """
+
+  index = {component: i for i, component in enumerate(components)}
+  priorities = priorities or {}
+  num_pending_upstreams = {
+      component: len([n for n in component.upstream_nodes if n in index])
+      for component in components
+  }
+  # Heap of (-priority, index) of the ready components.
+  ready = []
+
+  def _push_ready(component):
+    heapq.heappush(ready, (-priorities.get(component, 0.), index[component]))
+
+  for component in components:
+    if not num_pending_upstreams[component]:
+      _push_ready(component)
+  running = {}
+  error = None
+  while ready or running:
+    while ready and not error and (not max_running or
+                                   len(running) < max_running):
+      _, i = heapq.heappop(ready)
+      running[executor.submit(launch_fn, i)] = components[i]
+    if not running:
+      break
+    done, _ = futures.wait(running, return_when=futures.FIRST_COMPLETED)
+    for future in done:
+      component = running.pop(future)
+      if future.exception() is not None:
+        logging.error('Component %s failed.', component.id)
+        error = error or future.exception()
+        continue
+      if error:
+        continue
+      for downstream_node in component.downstream_nodes:
+        if downstream_node not in num_pending_upstreams:
+          continue
+        num_pending_upstreams[downstream_node] -= 1
+        if not num_pending_upstreams[downstream_node]:
+          _push_ready(downstream_node)
+  if error:
+    raise error
+
+
+class ProcessPoolDagRunner(tfx_runner.TfxRunner):
+  """Runs a TFX pipeline locally on a bounded pool of processes.
+
+  Each component runs in a worker process as soon as its upstream components
+  have finished and a worker is available. Ready components are launched in
+  the order of the pipeline's components, or by decreasing length of the
+  critical path which they start with `critical_path_order`. All workers write
+  to the pipeline's metadata store, so results can be read back with
+  `nitroml.results.overview()` as usual.
+
+  SQLite-backed metadata stores are shared between the worker processes; when
+  running with many workers, prefer a MySQL-backed store to avoid lock
+  contention.
+
+  Workers are spawned, so the pipeline and its config are pickled, and the
+  script which calls `run` must guard its entry point with
+  `if __name__ == '__main__':`.
+  """
+
+  def __init__(self,
+               max_workers: Optional[int] = None,
+               config: Optional[pipeline_config.PipelineConfig] = None,
+               critical_path_order: bool = False):
+    """Constructs a ProcessPoolDagRunner.
+
+    Args:
+      max_workers: The maximum number of components to run concurrently.
+        Defaults to the number of CPUs on the machine.
+      config: Optional pipeline config for customizing the launching of each
+        component. Defaults to launching components in process, and in Docker
+        for container-based components.
+      critical_path_order: Whether to launch ready components by decreasing
+        length of the critical path which they start. Component costs are
+        estimated once per run from the size of the datasets they consume and
+        from the durations of the pipeline's previous runs recorded in MLMD.
+
+    Raises:
+      ValueError: If `max_workers` is not strictly positive.
+    """
+
+    if config is None:
+      config = pipeline_config.PipelineConfig(supported_launcher_classes=[
+          in_process_component_launcher.InProcessComponentLauncher,
+          docker_component_launcher.DockerComponentLauncher,
+      ])
+    super(ProcessPoolDagRunner, self).__init__(config)
+    if max_workers is not None and max_workers <= 0:
+      raise ValueError('max_workers must be strictly positive; '
+                       f'got max_workers={max_workers} instead.')
+    self._max_workers = max_workers or os.cpu_count()
+    self._critical_path_order = critical_path_order
+
+  @property
+  def max_workers(self) -> int:
+    return self._max_workers
+
+  def run(self, tfx_pipeline: pipeline_lib.Pipeline) -> None:
+    """Runs the given TFX pipeline until all of its components finish.
+
+    Args:
+      tfx_pipeline: Logical pipeline containing the pipeline args and
+        components.
+    """
+
+    # For CLI, while creating or updating pipeline, pipeline_args are extracted
+    # and hence we avoid executing the pipeline.
+    if 'TFX_JSON_EXPORT_PIPELINE_ARGS_PATH' in os.environ:
+      return
+
+    priorities = None
+    if self._critical_path_order:
+      durations = {}
+      if tfx_pipeline.metadata_connection_config:
+        durations = cost_model.load_durations(
+            tfx_pipeline.metadata_connection_config,
+            tfx_pipeline.pipeline_info.pipeline_name)
+      priorities = cost_model.critical_path_priorities(
+          cost_model.estimate_costs(tfx_pipeline.components, durations))
+
+    # The run_id must be set before the pipeline is sent to the workers.
+    tfx_pipeline.pipeline_info.run_id = datetime.datetime.now().isoformat()
+    # Pickled once here, so that pipelines which cannot be sent to the workers
+    # fail before any component is launched.
+    serialized_pipeline = pickle.dumps((tfx_pipeline, self._config))
+    logging.info('Running pipeline %s with %d workers.',
+                 tfx_pipeline.pipeline_info.pipeline_name, self._max_workers)
+    with futures.ProcessPoolExecutor(
+        max_workers=self._max_workers,
+        mp_context=multiprocessing.get_context(_START_METHOD),
+        initializer=_init_worker,
+        initargs=(serialized_pipeline,)) as pool:
+      _execute_dag(
+          tfx_pipeline.components,
+          _launch_component,
+          pool,
+          priorities=priorities,
+          max_running=self._max_workers)
@@ -0,0 +1,131 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+# Lint as: python3
+"""Tests for nitroml.orchestration.process_pool_dag_runner."""
+
+from concurrent import futures
+import pickle
+import threading
+
+from absl.testing import absltest
+from nitroml.orchestration import process_pool_dag_runner
+
+
+class FakeNode(object):
+  """A fake DAG node for testing."""
+
+  def __init__(self, name, upstream_nodes=()):
+    self.id = name
+    self.upstream_nodes = set(upstream_nodes)
+    self.downstream_nodes = set()
+    for node in upstream_nodes:
+      node.downstream_nodes.add(self)
+
+
+class ExecuteDagTest(absltest.TestCase):
+
+  def setUp(self):
+    super(ExecuteDagTest, self).setUp()
+    self._lock = threading.Lock()
+    self._launched = []
+
+  def _make_launch_fn(self, components, fail=()):
+
+    def launch_fn(index):
+      component = components[index]
+      with self._lock:
+        # All upstream nodes must have finished before a node is launched.
+        for node in component.upstream_nodes:
+          assert node.id in self._launched, f'{node.id} did not run first.'
+        if component.id in fail:
+          raise RuntimeError(f'{component.id} failed.')
+        self._launched.append(component.id)
+
+    return launch_fn
+
+  def testExecutesEachComponentAfterItsUpstreams(self):
+    example_gen_1 = FakeNode('ExampleGen.1')
+    trainer_1 = FakeNode('Trainer.1', [example_gen_1])
+    example_gen_2 = FakeNode('ExampleGen.2')
+    trainer_2 = FakeNode('Trainer.2', [example_gen_2])
+    evaluator = FakeNode('Evaluator', [example_gen_1, trainer_1, trainer_2])
+    components = [example_gen_1, example_gen_2, trainer_1, trainer_2, evaluator]
+
+    with futures.ThreadPoolExecutor(max_workers=4) as executor:
+      process_pool_dag_runner._execute_dag(
+          components, self._make_launch_fn(components), executor)
+
+    self.assertSameElements([c.id for c in components], self._launched)
+    self.assertEqual('Evaluator', self._launched[-1])
+
+  def testStopsLaunchingAfterFailure(self):
+    example_gen = FakeNode('ExampleGen')
+    trainer = FakeNode('Trainer', [example_gen])
+    evaluator = FakeNode('Evaluator', [trainer])
+    components = [example_gen, trainer, evaluator]
+
+    with futures.ThreadPoolExecutor(max_workers=2) as executor:
+      with self.assertRaisesRegex(RuntimeError, 'Trainer failed'):
+        process_pool_dag_runner._execute_dag(
+            components, self._make_launch_fn(components, fail=('Trainer',)),
+            executor)
+
+    self.assertEqual(['ExampleGen'], self._launched)
+
+  def testLaunchesReadyComponentsByPriority(self):
+    small = FakeNode('ExampleGen.small')
+    large = FakeNode('ExampleGen.large')
+    small_trainer = FakeNode('Trainer.small', [small])
+    large_trainer = FakeNode('Trainer.large', [large])
+    components = [small, large, small_trainer, large_trainer]
+    priorities = {
+        small: 2.,
+        small_trainer: 1.,
+        large: 20.,
+        large_trainer: 10.,
+    }
+
+    with futures.ThreadPoolExecutor(max_workers=1) as executor:
+      process_pool_dag_runner._execute_dag(
+          components,
+          self._make_launch_fn(components),
+          executor,
+          priorities=priorities,
+          max_running=1)
+
+    self.assertEqual(
+        ['ExampleGen.large', 'Trainer.large', 'ExampleGen.small',
+         'Trainer.small'], self._launched)
+
+
+class ProcessPoolDagRunnerTest(absltest.TestCase):
+
+  def testMaxWorkers(self):
+    runner = process_pool_dag_runner.ProcessPoolDagRunner(max_workers=3)
+    self.assertEqual(3, runner.max_workers)
+
+  def testInvalidMaxWorkersThrows(self):
+    with self.assertRaises(ValueError):
+      process_pool_dag_runner.ProcessPoolDagRunner(max_workers=-1)
+
+  def testInitWorkerUnpicklesPipeline(self):
+    process_pool_dag_runner._init_worker(pickle.dumps(('pipeline', 'config')))
+
+    self.assertEqual('pipeline', process_pool_dag_runner._worker_pipeline)
+    self.assertEqual('config', process_pool_dag_runner._worker_config)
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -16,14 +16,25 @@
 """NitroML benchmark pipeline result overview."""
 
 import ast
+import collections
+import collections.abc
+from concurrent import futures
 import datetime
+import functools
+import io
+import itertools
 import json
+import math
 import os
 import re
-from typing import Dict, Any, List, NamedTuple, Optional, Text
+import threading
+from typing import (Callable, Dict, Any, Iterable, Iterator, List, Mapping,
+                    NamedTuple, Optional, Sequence, Set, Text, Tuple, Union)
 
+from absl import logging
+from nitroml.components.publisher import constants
+import numpy as np
 import pandas as pd
-import tensorflow.compat.v2 as tf
 
 from ml_metadata import metadata_store
 from ml_metadata.proto import metadata_store_pb2
@@ -35,6 +46,38 @@ BENCHMARK_FULL_KEY = 'benchmark_fullname'
 BENCHMARK_KEY = 'benchmark'
 RUN_KEY = 'run'
 NUM_RUNS_KEY = 'num_runs'
+SOURCE_KEY = 'source'
+# The id of the ModelEvaluation artifact from which a result was published.
+EVALUATION_ID_KEY = 'evaluation_id'
+# Columns of the slice metrics written by the BenchmarkResultPublisher.
+SLICE_KEY = 'slice'
+OUTPUT_NAME_KEY = 'output_name'
+SUB_KEY = 'sub_key'
+METRIC_KEY = 'metric'
+VALUE_KEY = 'value'
+SLICE_METRICS_COLUMNS = (SLICE_KEY, OUTPUT_NAME_KEY, SUB_KEY, METRIC_KEY,
+                         VALUE_KEY)
+# The file in each BenchmarkResult artifact's uri holding its slice metrics.
+SLICE_METRICS_FILENAME = 'slice_metrics.npz'
+# Column of the `PlotsForSlice` protos returned by `get_plots`.
+PLOTS_KEY = 'plots'
+# Cost signals published by the BenchmarkResultPublisher next to the metrics.
+TRAINER_WALL_TIME_KEY = constants.TRAINER_WALL_TIME_KEY
+TRAIN_STEPS_KEY = constants.TRAIN_STEPS_KEY
+TRAIN_STEPS_PER_SECOND_KEY = constants.TRAIN_STEPS_PER_SECOND_KEY
+MODEL_SIZE_KEY = constants.MODEL_SIZE_KEY
+TUNER_TRIALS_KEY = constants.TUNER_TRIALS_KEY
+TUNER_WALL_TIME_KEY = constants.TUNER_WALL_TIME_KEY
+TRANSFORMED_EXAMPLES_SIZE_KEY = constants.TRANSFORMED_EXAMPLES_SIZE_KEY
+
+# Cost column name constants
+WALL_TIME_KEY = 'wall_time_seconds'
+USER_CPU_KEY = 'user_cpu_seconds'
+SYSTEM_CPU_KEY = 'system_cpu_seconds'
+CPU_HOURS_KEY = 'cpu_hours'
+PEAK_RSS_KEY = 'peak_rss_bytes'
+BYTES_READ_KEY = 'bytes_read'
+BYTES_WRITTEN_KEY = 'bytes_written'
 
 # Component constants
 _TRAINER = 'google3.learning.elated_zebra.my_orchestrator.components.trainer.component.EstimatorTrainer'
@@ -56,6 +99,7 @@ _PIPELINE_ROOT = 'pipeline_root'
 _RUN_ID = 'run_id'
 _COMPONENT_ID = 'component_id'
 _KAGGLE = 'kaggle'
+_RUN_CONTEXT = 'run'
 
 # Default columns
 _DEFAULT_COLUMNS = (STARTED_AT, RUN_ID_KEY, BENCHMARK_KEY, RUN_KEY,
@@ -65,6 +109,67 @@ _DATAFRAME_CONTEXTUAL_COLUMNS = (STARTED_AT, RUN_ID_KEY, BENCHMARK_FULL_KEY,
 _DEFAULT_CUSTOM_PROPERTIES = {
     _NAME, _PRODUCER_COMPONENT, _STATE, _PIPELINE_NAME
 }
+# Custom properties recorded by nitroml.orchestration.instrumentation on each
+# execution, and their cost columns. The wall time is also recorded on the
+# execution's output artifacts, so none of them are metrics.
+_COST_PROPERTIES = {
+    'nitroml_wall_time_seconds': WALL_TIME_KEY,
+    'nitroml_user_cpu_seconds': USER_CPU_KEY,
+    'nitroml_system_cpu_seconds': SYSTEM_CPU_KEY,
+    'nitroml_peak_rss_bytes': PEAK_RSS_KEY,
+    'nitroml_bytes_read': BYTES_READ_KEY,
+    'nitroml_bytes_written': BYTES_WRITTEN_KEY,
+}
+_COST_COLUMNS = (WALL_TIME_KEY, USER_CPU_KEY, SYSTEM_CPU_KEY, CPU_HOURS_KEY,
+                 PEAK_RSS_KEY, BYTES_READ_KEY, BYTES_WRITTEN_KEY)
+# Custom properties of BenchmarkResult artifacts which are not metrics.
+_NON_METRIC_PROPERTIES = frozenset({
+    _NAME, _PRODUCER_COMPONENT, _STATE, EVALUATION_ID_KEY, *_DEFAULT_COLUMNS,
+    *_COST_PROPERTIES
+})
+# Custom properties which are always published as strings, so never parsed.
+_STRING_PROPERTIES = frozenset({*_DEFAULT_CUSTOM_PROPERTIES, BENCHMARK_KEY})
+
+# Overview index constants
+_INDEX_VERSION = 2
+_INDEX_METADATA_KEY = b'nitroml_overview_index'
+_INDEX_KEY_COLUMN = '__result_key__'
+_JSON_DATETIME = '__datetime__'
+
+# Suffix of the benchmark names of repeated runs.
+_RUN_SUFFIX_PATTERN = r'\.run_\d_of_\d$'
+
+# Leaderboard constants
+_LEADERBOARD_VERSION = 1
+_PUBLISHED = 'published'
+# Results in this state may still be published, whereas the other states, e.g.
+# 'deleted', are final.
+_PENDING = 'pending'
+# Executions in these states never publish their pending outputs. TFX records
+# the state of completed executions in their 'state' property.
+_FINISHED_EXECUTION_STATES = (metadata_store_pb2.Execution.COMPLETE,
+                              metadata_store_pb2.Execution.FAILED,
+                              metadata_store_pb2.Execution.CANCELED)
+_COMPLETE = 'complete'
+
+# The prefix of the files of `PlotsForSlice` records written by the Evaluator.
+_PLOTS_PREFIX = 'plots'
+
+# Export constants
+_EXPORT_VERSION = 1
+_EXPORT_METADATA_KEY = b'nitroml_results_export'
+# Model dirs of the evaluations by eval config path and creation time, least
+# recently used first. Evaluations never change after they are written, and the
+# creation time tells apart the evaluations of stores sharing a pipeline root.
+_MODEL_DIRS_CACHE = collections.OrderedDict()
+_MODEL_DIRS_CACHE_LOCK = threading.Lock()
+_MODEL_DIRS_CACHE_SIZE = 100000
+# The maximum number of nodes per page when looking for new nodes.
+_ID_BATCH_SIZE = 1000
+_HPARAMS_SOURCE = 'hparams'
+_METRICS_SOURCE = 'metrics'
+_KAGGLE_SOURCE = 'kaggle'
+_COSTS_SOURCE = 'costs'
 
 
 class _Result(NamedTuple):
@@ -74,9 +179,60 @@ class _Result(NamedTuple):
 
 
 class _RunInfo(NamedTuple):
-  """Wrapper for run id and component name."""
+  """Wrapper for run id, component name and execution id and creation time."""
   run_id: Text
   component_name: Text
+  execution_id: Optional[int] = None
+  # Milliseconds since epoch, or 0 if unknown.
+  create_time_since_epoch: int = 0
+
+
+class _StorePool(object):
+  """Issues independent MLMD queries concurrently.
+
+  Each worker thread lazily opens its own `MetadataStore` connection to the
+  same MLMD instance, so that queries do not wait on each other's round trips.
+  Without a connection config, queries are issued serially on the given store.
+  """
+
+  def __init__(self,
+               store: metadata_store.MetadataStore,
+               connection_config: Optional[Any] = None,
+               max_workers: int = 4):
+    if max_workers <= 0:
+      raise ValueError('max_workers must be strictly positive; '
+                       f'got max_workers={max_workers} instead.')
+    self._store = store
+    self._connection_config = connection_config
+    self._local = threading.local()
+    self._executor = None
+    if connection_config is not None and max_workers > 1:
+      self._executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+
+  def __enter__(self) -> '_StorePool':
+    return self
+
+  def __exit__(self, *unused_exc_info) -> None:
+    if self._executor is not None:
+      self._executor.shutdown()
+
+  @property
+  def store(self) -> metadata_store.MetadataStore:
+    return self._store
+
+  def _thread_store(self) -> metadata_store.MetadataStore:
+    if not hasattr(self._local, 'store'):
+      self._local.store = metadata_store.MetadataStore(self._connection_config)
+    return self._local.store
+
+  def run(self, queries: List[Callable[[metadata_store.MetadataStore], Any]]
+         ) -> List[Any]:
+    """Returns the results of calling each query with a store, in order."""
+    if self._executor is None or len(queries) <= 1:
+      return [query(self._store) for query in queries]
+    return list(
+        self._executor.map(lambda query: query(self._thread_store()),
+                           queries))
 
 
 def _merge_results(results: List[_Result]) -> _Result:
@@ -101,12 +257,28 @@ def _to_pytype(val: str) -> Any:
     return val
 
 
-def _parse_value(value: metadata_store_pb2.Value) -> Any:
-  """Parse value from `metadata_store_pb2.Value` proto."""
-  if value.HasField('int_value'):
-    return value.int_value
-  elif value.HasField('double_value'):
+def _parse_value(value: metadata_store_pb2.Value,
+                 name: Optional[str] = None) -> Any:
+  """Parse value from `metadata_store_pb2.Value` proto.
+
+  Metrics are published as doubles, which are returned as is. String values
+  are parsed with `_to_pytype` for stores whose metrics were published as
+  strings, unless `name` is one of the properties known to be strings.
+
+  Args:
+    value: The value to parse.
+    name: Optional name of the property holding the value.
+
+  Returns:
+    The parsed value.
+  """
+  kind = value.WhichOneof('value')
+  if kind == 'double_value':
     return value.double_value
+  elif kind == 'int_value':
+    return value.int_value
+  elif name in _STRING_PROPERTIES:
+    return value.string_value
   else:
     return _to_pytype(value.string_value)
 
@@ -133,11 +305,29 @@ def _parse_hparams(hp_prop: str) -> Dict[str, Any]:
   return hparams
 
 
-def _get_hparams(store: metadata_store.MetadataStore) -> _Result:
+def _trainer_result_key(trainer_exec: metadata_store_pb2.Execution) -> Text:
+  """Returns the key of the result which an EstimatorTrainer contributes to."""
+  run_id = trainer_exec.properties[RUN_ID_KEY].string_value
+  component_id = trainer_exec.properties[_COMPONENT_ID].string_value
+  return run_id + component_id.replace(_TRAINER_PREFIX, '')
+
+
+def _kaggle_result_key(run_info: _RunInfo) -> Text:
+  """Returns the key of the result which a KagglePublisher contributes to."""
+  return run_info.run_id + run_info.component_name.replace(
+      _KAGGLE_PUBLISHER_PREFIX, '')
+
+
+def _get_hparams(
+    store: metadata_store.MetadataStore,
+    trainer_execs: Optional[List[metadata_store_pb2.Execution]] = None
+) -> _Result:
   """Returns the hparams of the EstimatorTrainer component.
 
   Args:
     store: MetaDataStore object to connect to MLMD instance.
+    trainer_execs: Optional list of the EstimatorTrainer executions to load.
+      Defaults to all of them.
 
   Returns:
     A _Result objects with properties containing hparams.
@@ -145,7 +335,8 @@ def _get_hparams(store: metadata_store.MetadataStore) -> _Result:
   results = {}
   hparam_names = set()
 
-  trainer_execs = store.get_executions_by_type(_TRAINER)
+  if trainer_execs is None:
+    trainer_execs = store.get_executions_by_type(_TRAINER)
   for ex in trainer_execs:
     run_id = ex.properties[RUN_ID_KEY].string_value
     hparams = _parse_hparams(ex.properties[_HPARAMS].string_value)
@@ -153,7 +344,7 @@ def _get_hparams(store: metadata_store.MetadataStore) -> _Result:
     hparams[RUN_ID_KEY] = run_id
     trainer_id = ex.properties[_COMPONENT_ID].string_value.replace(
         _TRAINER_PREFIX, '')
-    result_key = run_id + trainer_id
+    result_key = _trainer_result_key(ex)
     hparams[BENCHMARK_KEY] = trainer_id[1:]  # Removing '.' prefix
     # BeamDagRunner uses iso format timestamp. See for details:
     # http://google3/third_party/py/tfx/orchestration/beam/beam_dag_runner.py
@@ -176,45 +367,70 @@ def _get_artifact_run_info_map(store: metadata_store.MetadataStore,
   Returns:
     A dictionary containing artifact_id as a key and MyOrchestrator run_id as value.
   """
-  # Get events of artifacts.
+  if not artifact_ids:
+    return {}
+
+  # Get the events of the executions producing the artifacts. Executions
+  # consuming the artifacts, e.g. in later runs, are ignored.
   events = store.get_events_by_artifact_ids(artifact_ids)
-  exec_to_artifact = {}
+  artifact_to_exec = {}
   for event in events:
-    exec_to_artifact[event.execution_id] = event.artifact_id
+    if event.type == metadata_store_pb2.Event.OUTPUT:
+      artifact_to_exec[event.artifact_id] = event.execution_id
 
   # Get execution of artifacts.
-  executions = store.get_executions_by_id(list(exec_to_artifact.keys()))
-  artifact_to_run_info = {}
+  executions = store.get_executions_by_id(
+      sorted(set(artifact_to_exec.values())))
+  exec_to_run_info = {}
   for execution in executions:
     run_id = execution.properties[RUN_ID_KEY].string_value
     component = execution.properties[_COMPONENT_ID].string_value
-    artifact_id = exec_to_artifact[execution.id]
-    artifact_to_run_info[artifact_id] = _RunInfo(
-        run_id=run_id, component_name=component)
+    exec_to_run_info[execution.id] = _RunInfo(
+        run_id=run_id,
+        component_name=component,
+        execution_id=execution.id,
+        create_time_since_epoch=execution.create_time_since_epoch)
 
-  return artifact_to_run_info
+  return {
+      artifact_id: exec_to_run_info[execution_id]
+      for artifact_id, execution_id in artifact_to_exec.items()
+      if execution_id in exec_to_run_info
+  }
 
 
-def _get_benchmark_results(store: metadata_store.MetadataStore) -> _Result:
+def _get_benchmark_results(
+    store: metadata_store.MetadataStore,
+    publisher_artifacts: Optional[List[metadata_store_pb2.Artifact]] = None,
+    artifact_to_run_info: Optional[Dict[int, _RunInfo]] = None
+) -> _Result:
   """Returns the benchmark results of the BenchmarkResultPublisher component.
 
   Args:
     store: MetaDataStore object to connect to MLMD instance.
+    publisher_artifacts: Optional list of the BenchmarkResult artifacts to load.
+      Defaults to all of them.
+    artifact_to_run_info: Optional run info of the artifacts, as returned by
+      `_get_artifact_run_info_map`. Fetched if not given.
 
   Returns:
     A _Result objects with properties containing benchmark results.
   """
   metrics = {}
   property_names = set()
-  publisher_artifacts = store.get_artifacts_by_type(_BENCHMARK_RESULT)
+  if publisher_artifacts is None:
+    publisher_artifacts = store.get_artifacts_by_type(_BENCHMARK_RESULT)
   for artifact in publisher_artifacts:
+    # Benchmark runs which could not be published have no properties.
+    if BENCHMARK_KEY not in artifact.custom_properties:
+      continue
     evals = {}
     for key, val in artifact.custom_properties.items():
-      evals[key] = _parse_value(val)
+      evals[key] = _parse_value(val, key)
     property_names = property_names.union(evals.keys())
     metrics[artifact.id] = evals
 
-  artifact_to_run_info = _get_artifact_run_info_map(store, list(metrics.keys()))
+  if artifact_to_run_info is None:
+    artifact_to_run_info = _get_artifact_run_info_map(store, list(metrics))
 
   properties = {}
   for artifact_id, evals in metrics.items():
@@ -229,48 +445,728 @@ def _get_benchmark_results(store: metadata_store.MetadataStore) -> _Result:
     result_key = run_info.run_id + '.' + evals[BENCHMARK_KEY]
     properties[result_key] = evals
 
-  property_names = property_names.difference(
-      {_NAME, _PRODUCER_COMPONENT, _STATE, *_DEFAULT_COLUMNS})
+  property_names = property_names.difference(_NON_METRIC_PROPERTIES)
   return _Result(properties=properties, property_names=sorted(property_names))
 
 
-def _get_kaggle_results(store: metadata_store.MetadataStore) -> _Result:
+def _get_upstream_executions(store: metadata_store.MetadataStore,
+                             execution_ids: List[int]) -> Dict[int, Set[int]]:
+  """Returns the executions upstream of each execution, including itself.
+
+  The lineage is fetched one level at a time for all the executions at once.
+
+  Args:
+    store: MetaDataStore object to connect to MLMD instance.
+    execution_ids: A list of execution ids.
+
+  Returns:
+    A dictionary containing execution_id as a key and the set of its upstream
+    execution ids as value.
+  """
+  input_artifacts = {}  # Execution id to its input artifact ids.
+  producers = {}  # Artifact id to the id of the execution which output it.
+  frontier = set(execution_ids)
+  while frontier:
+    for execution_id in frontier:
+      input_artifacts[execution_id] = []
+    unknown_artifact_ids = set()
+    for event in store.get_events_by_execution_ids(list(frontier)):
+      if event.type == metadata_store_pb2.Event.INPUT:
+        input_artifacts[event.execution_id].append(event.artifact_id)
+        if event.artifact_id not in producers:
+          unknown_artifact_ids.add(event.artifact_id)
+    frontier = set()
+    for event in store.get_events_by_artifact_ids(list(unknown_artifact_ids)):
+      if event.type == metadata_store_pb2.Event.OUTPUT:
+        producers[event.artifact_id] = event.execution_id
+        if event.execution_id not in input_artifacts:
+          frontier.add(event.execution_id)
+
+  upstream_executions = {}
+
+  def _get_upstream(execution_id):
+    if execution_id not in upstream_executions:
+      upstream = {execution_id}
+      upstream_executions[execution_id] = upstream
+      for artifact_id in input_artifacts[execution_id]:
+        if artifact_id in producers:
+          upstream.update(_get_upstream(producers[artifact_id]))
+    return upstream_executions[execution_id]
+
+  return {
+      execution_id: _get_upstream(execution_id)
+      for execution_id in execution_ids
+  }
+
+
+def _get_execution_costs(
+    store: metadata_store.MetadataStore,
+    execution_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+  """Returns the recorded resource usage of each instrumented execution."""
+  costs = {}
+  for execution in store.get_executions_by_id(execution_ids):
+    cost = {
+        column: _parse_value(execution.custom_properties[name])
+        for name, column in _COST_PROPERTIES.items()
+        if name in execution.custom_properties
+    }
+    if cost:
+      costs[execution.id] = cost
+  return costs
+
+
+def _get_result_lineages(
+    store: metadata_store.MetadataStore,
+    artifacts: Dict[int, metadata_store_pb2.Artifact],
+    publisher_execution_ids: Dict[int, int]) -> Dict[int, Set[int]]:
+  """Returns the executions which each benchmark result depends on.
+
+  An aggregate publisher execution is downstream of many evaluations, so the
+  lineage of a result starts at the Evaluator of its own evaluation, and
+  includes the publisher's execution.
+
+  Args:
+    store: MetaDataStore object to connect to MLMD instance.
+    artifacts: Dict from artifact id to the BenchmarkResult artifact.
+    publisher_execution_ids: Dict from artifact id to the id of the execution
+      which published it.
+
+  Returns:
+    A dictionary from artifact id to the set of execution ids of its lineage.
+  """
+  evaluation_ids = {
+      artifact_id: artifacts[artifact_id].custom_properties[
+          EVALUATION_ID_KEY].int_value
+      for artifact_id in publisher_execution_ids
+      if EVALUATION_ID_KEY in artifacts[artifact_id].custom_properties
+  }
+  evaluator_execution_ids = {}
+  if evaluation_ids:
+    for event in store.get_events_by_artifact_ids(
+        sorted(set(evaluation_ids.values()))):
+      if event.type == metadata_store_pb2.Event.OUTPUT:
+        evaluator_execution_ids[event.artifact_id] = event.execution_id
+  lineage_roots = {
+      artifact_id: evaluator_execution_ids.get(
+          evaluation_ids.get(artifact_id), execution_id)
+      for artifact_id, execution_id in publisher_execution_ids.items()
+  }
+  upstream_executions = _get_upstream_executions(
+      store, sorted(set(lineage_roots.values())))
+  return {
+      artifact_id:
+      upstream_executions[root_id] | {publisher_execution_ids[artifact_id]}
+      for artifact_id, root_id in lineage_roots.items()
+  }
+
+
+def _get_downstream_results(
+    store: metadata_store.MetadataStore,
+    execution_ids: List[int]) -> Dict[int, int]:
+  """Returns the published benchmark results downstream of the executions.
+
+  The lineage is fetched one level at a time for all the executions at once.
+
+  Args:
+    store: MetaDataStore object to connect to MLMD instance.
+    execution_ids: A list of execution ids.
+
+  Returns:
+    A dictionary from the artifact id of each downstream BenchmarkResult to the
+    id of the execution which published it.
+  """
+  producers = {}  # Artifact id to the id of the execution which output it.
+  seen = set(execution_ids)
+  frontier = set(execution_ids)
+  while frontier:
+    output_artifact_ids = set()
+    for event in store.get_events_by_execution_ids(list(frontier)):
+      if (event.type == metadata_store_pb2.Event.OUTPUT and
+          event.artifact_id not in producers):
+        producers[event.artifact_id] = event.execution_id
+        output_artifact_ids.add(event.artifact_id)
+    frontier = set()
+    for event in store.get_events_by_artifact_ids(list(output_artifact_ids)):
+      if (event.type == metadata_store_pb2.Event.INPUT and
+          event.execution_id not in seen):
+        seen.add(event.execution_id)
+        frontier.add(event.execution_id)
+
+  artifact_type_ids = {
+      t.id for t in store.get_artifact_types() if t.name == _BENCHMARK_RESULT
+  }
+  return {
+      artifact.id: producers[artifact.id]
+      for artifact in store.get_artifacts_by_id(list(producers))
+      if artifact.type_id in artifact_type_ids and
+      BENCHMARK_KEY in artifact.custom_properties
+  }
+
+
+def _get_benchmark_costs(
+    store: metadata_store.MetadataStore,
+    publisher_artifacts: Optional[List[metadata_store_pb2.Artifact]] = None,
+    artifact_to_run_info: Optional[Dict[int, _RunInfo]] = None
+) -> _Result:
+  """Returns the cost of producing each benchmark result.
+
+  The cost of a benchmark result sums the resource usage of every execution
+  upstream of its BenchmarkResultPublisher, and takes the maximum of their
+  peak memory. For results published by an aggregate publisher, only the
+  executions upstream of their own evaluation are included, along with the
+  publisher's.
+
+  The usage of an execution shared by several benchmark results, e.g. of an
+  ExampleGen or of a deduplicated component, is split evenly between all the
+  benchmark results in the store which depend on it, whether or not they are
+  loaded. So summing the costs of the results never counts an execution twice.
+
+  Args:
+    store: MetaDataStore object to connect to MLMD instance.
+    publisher_artifacts: Optional list of the BenchmarkResult artifacts to load.
+      Defaults to all of them.
+    artifact_to_run_info: Optional run info of the artifacts, as returned by
+      `_get_artifact_run_info_map`. Fetched if not given.
+
+  Returns:
+    A _Result objects with properties containing benchmark costs.
+  """
+  if publisher_artifacts is None:
+    publisher_artifacts = store.get_artifacts_by_type(_BENCHMARK_RESULT)
+  # Benchmark runs which could not be published have no properties.
+  artifacts = {
+      artifact.id: artifact
+      for artifact in publisher_artifacts
+      if BENCHMARK_KEY in artifact.custom_properties
+  }
+  if artifact_to_run_info is None:
+    artifact_to_run_info = _get_artifact_run_info_map(store, list(artifacts))
+  publisher_execution_ids = {
+      artifact_id: artifact_to_run_info[artifact_id].execution_id
+      for artifact_id in artifacts
+      if artifact_id in artifact_to_run_info
+  }
+  lineages = _get_result_lineages(store, artifacts, publisher_execution_ids)
+  upstream_ids = sorted(set().union(*lineages.values()))
+
+  # The other results which share executions with the loaded ones.
+  other_publisher_execution_ids = {
+      artifact_id: execution_id for artifact_id, execution_id in
+      _get_downstream_results(store, upstream_ids).items()
+      if artifact_id not in lineages
+  }
+  other_lineages = {}
+  if other_publisher_execution_ids:
+    other_artifacts = {
+        artifact.id: artifact for artifact in store.get_artifacts_by_id(
+            list(other_publisher_execution_ids))
+    }
+    other_lineages = _get_result_lineages(store, other_artifacts,
+                                          other_publisher_execution_ids)
+  num_results = collections.Counter()
+  for lineage in itertools.chain(lineages.values(), other_lineages.values()):
+    num_results.update(lineage)
+  execution_costs = _get_execution_costs(store, upstream_ids)
+
+  properties = {}
+  for artifact_id, lineage in lineages.items():
+    costs = [(execution_costs[execution_id], num_results[execution_id])
+             for execution_id in lineage
+             if execution_id in execution_costs]
+    if not costs:
+      continue
+    total = {}
+    for column in _COST_PROPERTIES.values():
+      if column == PEAK_RSS_KEY:
+        values = [cost[column] for cost, _ in costs if column in cost]
+        if values:
+          total[column] = max(values)
+        continue
+      values = [cost[column] / n for cost, n in costs if column in cost]
+      if values:
+        total[column] = sum(values)
+    if USER_CPU_KEY in total and SYSTEM_CPU_KEY in total:
+      total[CPU_HOURS_KEY] = (
+          total[USER_CPU_KEY] + total[SYSTEM_CPU_KEY]) / 3600
+    benchmark = _parse_value(
+        artifacts[artifact_id].custom_properties[BENCHMARK_KEY], BENCHMARK_KEY)
+    result_key = artifact_to_run_info[artifact_id].run_id + '.' + benchmark
+    properties[result_key] = total
+
+  property_names = set()
+  for total in properties.values():
+    property_names.update(total)
+  return _Result(
+      properties=properties,
+      property_names=[c for c in _COST_COLUMNS if c in property_names])
+
+
+def _get_kaggle_results(
+    store: metadata_store.MetadataStore,
+    kaggle_artifacts: Optional[List[metadata_store_pb2.Artifact]] = None,
+    artifact_to_run_info: Optional[Dict[int, _RunInfo]] = None
+) -> _Result:
   """Returns the kaggle score detail from the KagglePublisher component.
 
   Args:
     store: MetaDataStore object to connect to MLMD instance.
+    kaggle_artifacts: Optional list of the KaggleSubmissionResult artifacts to
+      load. Defaults to all of them.
+    artifact_to_run_info: Optional run info of the artifacts, as returned by
+      `_get_artifact_run_info_map`. Fetched if not given.
 
   Returns:
     A _Result objects with properties containing kaggle results.
   """
   results = {}
   property_names = set()
-  kaggle_artifacts = store.get_artifacts_by_type(_KAGGLE_RESULT)
+  if kaggle_artifacts is None:
+    kaggle_artifacts = store.get_artifacts_by_type(_KAGGLE_RESULT)
   for artifact in kaggle_artifacts:
     submit_info = {}
     for key, val in artifact.custom_properties.items():
-      if key not in _DEFAULT_CUSTOM_PROPERTIES:
+      if key not in _DEFAULT_CUSTOM_PROPERTIES and key not in _COST_PROPERTIES:
         name = _KAGGLE + '_' + key
-        submit_info[name] = _parse_value(val)
+        submit_info[name] = _parse_value(val, key)
     property_names = property_names.union(submit_info.keys())
     results[artifact.id] = submit_info
 
-  artifact_to_run_info = _get_artifact_run_info_map(store, list(results.keys()))
+  if artifact_to_run_info is None:
+    artifact_to_run_info = _get_artifact_run_info_map(store, list(results))
 
   properties = {}
   for artifact_id, submit_info in results.items():
     run_info = artifact_to_run_info[artifact_id]
-    result_key = run_info.run_id + run_info.component_name.replace(
-        _KAGGLE_PUBLISHER_PREFIX, '')
-    properties[result_key] = submit_info
+    properties[_kaggle_result_key(run_info)] = submit_info
 
   property_names = property_names.difference(
       {_NAME, _PRODUCER_COMPONENT, _STATE, *_DEFAULT_COLUMNS})
   return _Result(properties=properties, property_names=sorted(property_names))
 
 
-def get_model_dir_map(store: metadata_store.MetadataStore) -> Dict[str, str]:
-  """Obtains a map of run_id to model_dir from the store."""
+class _ResultFilter(NamedTuple):
+  """Restricts which results are loaded from the store."""
+  benchmark_regex: Optional[Text] = None
+  run_ids: Optional[Set[Text]] = None
+  since: Optional[datetime.datetime] = None
+
+  @property
+  def filters_runs(self) -> bool:
+    return self.run_ids is not None or self.since is not None
+
+  def matches_run(self, run_id: Text, create_time_since_epoch: int = 0) -> bool:
+    """Returns whether the run matches, keeping runs which cannot be dated.
+
+    Args:
+      run_id: The id of the run.
+      create_time_since_epoch: The creation time in milliseconds of the run's
+        context or of one of its executions, or 0 to date the run by its id.
+    """
+    if self.run_ids is not None and run_id not in self.run_ids:
+      return False
+    if self.since is not None:
+      started_at = _run_started_at(run_id, create_time_since_epoch)
+      if started_at is not None and started_at < self.since:
+        return False
+    return True
+
+  def matches_run_info(self, run_info: _RunInfo) -> bool:
+    return self.matches_run(run_info.run_id, run_info.create_time_since_epoch)
+
+  def matches_benchmark(self, benchmark: Text) -> bool:
+    return (self.benchmark_regex is None or
+            re.match(self.benchmark_regex, benchmark) is not None)
+
+
+def _run_started_at(run_id: Text,
+                    create_time_since_epoch: int = 0
+                   ) -> Optional[datetime.datetime]:
+  """Returns the start time of a run, or None if it is unknown.
+
+  Args:
+    run_id: The id of the run, which is parsed when no creation time is given.
+      Run ids such as Kubeflow's cannot be parsed.
+    create_time_since_epoch: The creation time in milliseconds of the run's
+      context or of one of its executions, or 0 if it is unknown.
+  """
+  if create_time_since_epoch:
+    return datetime.datetime.fromtimestamp(create_time_since_epoch / 1000.)
+  # BeamDagRunner uses iso format timestamp. See for details:
+  # http://google3/third_party/py/tfx/orchestration/beam/beam_dag_runner.py
+  try:
+    return datetime.datetime.fromtimestamp(int(run_id))
+  except ValueError:
+    pass
+  try:
+    return datetime.datetime.fromisoformat(run_id)
+  except ValueError:
+    return None
+
+
+def _get_context_nodes(
+    store: metadata_store.MetadataStore, context_id: int
+) -> Tuple[List[metadata_store_pb2.Execution],
+           List[metadata_store_pb2.Artifact]]:
+  """Returns the executions and artifacts of a context."""
+  return (store.get_executions_by_context(context_id),
+          store.get_artifacts_by_context(context_id))
+
+
+def _select_nodes(
+    pool: _StorePool, result_filter: _ResultFilter
+) -> Tuple[List[metadata_store_pb2.Execution],
+           List[metadata_store_pb2.Artifact], List[metadata_store_pb2.Artifact],
+           Dict[int, _RunInfo]]:
+  """Returns the nodes of the results which match `result_filter`.
+
+  When filtering by run, only the nodes attributed to the matching TFX run
+  contexts are fetched. Stores without run contexts fall back to fetching the
+  nodes by type. Nodes are filtered on their own properties before their
+  lineage is fetched, so that only matching results are parsed.
+
+  Independent queries are issued concurrently on `pool`, and the run info of
+  all the result artifacts is fetched at once, so that each phase costs a
+  single round trip to the store.
+
+  Args:
+    pool: The pool of connections to the MLMD instance.
+    result_filter: The filter to apply.
+
+  Returns:
+    A tuple of the EstimatorTrainer executions, the BenchmarkResult artifacts,
+    the KaggleSubmissionResult artifacts to load, and of the run info of those
+    artifacts.
+  """
+  store = pool.store
+  run_contexts = []
+  if result_filter.filters_runs:
+    run_contexts = store.get_contexts_by_type(_RUN_CONTEXT)
+  if run_contexts:
+    execution_types, artifact_types, *context_nodes = pool.run([
+        lambda s: {t.id: t.name for t in s.get_execution_types()},
+        lambda s: {t.id: t.name for t in s.get_artifact_types()},
+    ] + [
+        functools.partial(_get_context_nodes, context_id=context.id)
+        for context in run_contexts
+        if result_filter.matches_run(context.properties[_RUN_ID].string_value,
+                                     context.create_time_since_epoch)
+    ])
+    executions, artifacts = {}, {}
+    for context_executions, context_artifacts in context_nodes:
+      for execution in context_executions:
+        executions[execution.id] = execution
+      for artifact in context_artifacts:
+        artifacts[artifact.id] = artifact
+    trainer_execs = [
+        e for e in executions.values()
+        if execution_types.get(e.type_id) == _TRAINER
+    ]
+    publisher_artifacts = [
+        a for a in artifacts.values()
+        if artifact_types.get(a.type_id) == _BENCHMARK_RESULT
+    ]
+    kaggle_artifacts = [
+        a for a in artifacts.values()
+        if artifact_types.get(a.type_id) == _KAGGLE_RESULT
+    ]
+    filter_artifact_runs = False
+  else:
+    trainer_execs, publisher_artifacts, kaggle_artifacts = pool.run([
+        lambda s: s.get_executions_by_type(_TRAINER),
+        lambda s: s.get_artifacts_by_type(_BENCHMARK_RESULT),
+        lambda s: s.get_artifacts_by_type(_KAGGLE_RESULT),
+    ])
+    # Artifacts do not record their run id, which is looked up below.
+    filter_artifact_runs = result_filter.filters_runs
+
+  trainer_execs = [
+      ex for ex in trainer_execs
+      if result_filter.matches_run(ex.properties[RUN_ID_KEY].string_value,
+                                   ex.create_time_since_epoch) and
+      result_filter.matches_benchmark(ex.properties[_COMPONENT_ID].string_value
+                                      .replace(_TRAINER_PREFIX + '.', '', 1))
+  ]
+  publisher_artifacts = [
+      artifact for artifact in publisher_artifacts
+      if result_filter.matches_benchmark(
+          artifact.custom_properties[BENCHMARK_KEY].string_value)
+  ]
+  # The run info of both result types is fetched in a single batch.
+  artifact_to_run_info = _get_artifact_run_info_map(
+      store, [a.id for a in publisher_artifacts + kaggle_artifacts])
+  if filter_artifact_runs or result_filter.benchmark_regex is not None:
+    publisher_artifacts = [
+        a for a in publisher_artifacts
+        if a.id in artifact_to_run_info and result_filter.matches_run_info(
+            artifact_to_run_info[a.id])
+    ]
+    kaggle_artifacts = [
+        a for a in kaggle_artifacts
+        if a.id in artifact_to_run_info and result_filter.matches_run_info(
+            artifact_to_run_info[a.id]) and
+        result_filter.matches_benchmark(artifact_to_run_info[a.id]
+                                        .component_name.replace(
+                                            _KAGGLE_PUBLISHER_PREFIX + '.', '',
+                                            1))
+    ]
+  return (trainer_execs, publisher_artifacts, kaggle_artifacts,
+          artifact_to_run_info)
+
+
+def _iter_node_batches(get_nodes, last_id: int = 0) -> Iterator[List[Any]]:
+  """Yields the MLMD nodes whose ids are greater than `last_id` in batches.
+
+  MLMD assigns increasing ids to new artifacts and executions, so nodes are
+  paged through by increasing ids, from the greatest id of the previous page,
+  until a page is not full. Unlike windows of consecutive ids, pages are not
+  cut short by gaps in the ids, e.g. of rolled back transactions.
+
+  Args:
+    get_nodes: Function which returns the nodes matching `list_options`, e.g.
+      `store.get_artifacts`.
+    last_id: The greatest id which was already loaded.
+
+  Yields:
+    Non-empty lists of nodes, by increasing ids.
+  """
+  while True:
+    batch = get_nodes(list_options=metadata_store.ListOptions(
+        limit=_ID_BATCH_SIZE,
+        order_by=metadata_store.OrderByField.ID,
+        is_asc=True,
+        filter_query=f'id > {last_id}'))
+    if batch:
+      yield batch
+      last_id = max(node.id for node in batch)
+    if len(batch) < _ID_BATCH_SIZE:
+      return
+
+
+def _get_new_nodes(get_nodes, last_id: int) -> List[Any]:
+  """Returns the MLMD nodes whose ids are greater than `last_id`."""
+  nodes = []
+  for batch in _iter_node_batches(get_nodes, last_id):
+    nodes += batch
+  return nodes
+
+
+def _encode_json_value(value: Any) -> Optional[str]:
+  """Serializes a result value to JSON, or None if it is missing."""
+  if value is None or (isinstance(value, float) and math.isnan(value)):
+    return None
+  if isinstance(value, datetime.datetime):
+    value = {_JSON_DATETIME: value.isoformat()}
+  return json.dumps(value)
+
+
+def _decode_json_object(obj: Dict[str, Any]) -> Any:
+  if set(obj) == {_JSON_DATETIME}:
+    return datetime.datetime.fromisoformat(obj[_JSON_DATETIME])
+  return obj
+
+
+def _decode_json_value(value: str) -> Any:
+  """Deserializes a result value which was encoded with _encode_json_value."""
+  return json.loads(value, object_hook=_decode_json_object)
+
+
+def _read_index(
+    index_path: Text) -> Optional[Tuple[pd.DataFrame, Dict[str, Any]]]:
+  """Reads the overview index at `index_path`.
+
+  Args:
+    index_path: Path to the index file.
+
+  Returns:
+    A tuple of the indexed results, one row per result key, and of the index
+    metadata. None if the index does not exist or has an older version.
+  """
+  # PyArrow is only imported when needed, since it is slow to import.
+  import pyarrow.parquet as pq  # pylint: disable=g-import-not-at-top
+
+  if not os.path.exists(index_path):
+    return None
+  table = pq.read_table(index_path)
+  metadata = json.loads(table.schema.metadata[_INDEX_METADATA_KEY])
+  if metadata['version'] != _INDEX_VERSION:
+    logging.info('Rebuilding the overview index %s of version %d.', index_path,
+                 metadata['version'])
+    return None
+  df = table.to_pandas(split_blocks=True, self_destruct=True)
+  del table  # Must not be used after a self-destructing conversion.
+  for column in metadata['json_columns']:
+    df[column] = df[column].map(_decode_json_value, na_action='ignore')
+  return df.set_index(_INDEX_KEY_COLUMN), metadata
+
+
+def _write_index(index_path: Text, df: pd.DataFrame,
+                 metadata: Dict[str, Any]) -> None:
+  """Atomically writes the overview index to `index_path`.
+
+  Numeric and timestamp columns are stored as typed Parquet columns. Other
+  columns may mix types, so their values are stored as JSON strings.
+
+  Args:
+    index_path: Path to the index file.
+    df: The indexed results, one row per result key.
+    metadata: The index metadata.
+  """
+  # PyArrow is only imported when needed, since it is slow to import.
+  import pyarrow as pa  # pylint: disable=g-import-not-at-top
+  import pyarrow.parquet as pq  # pylint: disable=g-import-not-at-top
+
+  df = df.reset_index()
+  json_columns = [
+      column for column in df.columns
+      if column != _INDEX_KEY_COLUMN and df[column].dtype == object
+  ]
+  for column in json_columns:
+    df[column] = df[column].map(_encode_json_value)
+  table = pa.Table.from_pandas(df, preserve_index=False)
+  schema_metadata = dict(table.schema.metadata or {})
+  schema_metadata[_INDEX_METADATA_KEY] = json.dumps(
+      dict(metadata, json_columns=json_columns))
+  table = table.replace_schema_metadata(schema_metadata)
+  tmp_path = index_path + '.tmp'
+  pq.write_table(table, tmp_path)
+  os.replace(tmp_path, index_path)
+
+
+def _update_index(
+    store: metadata_store.MetadataStore, index_path: Text
+) -> Tuple[pd.DataFrame, Dict[str, List[str]], Dict[str, int]]:
+  """Loads the results indexed at `index_path` and indexes the new ones.
+
+  The index records the greatest artifact, execution and context ids which it
+  has processed, so only the nodes which were added to the store since the last
+  update are fetched and parsed. An index must only ever be used with the same
+  store.
+
+  The index also records the creation time of each run, so that runs are dated
+  like in a full scan: by their run context, or by their earliest execution
+  without one.
+
+  Args:
+    store: MetaDataStore object for connecting to an MLMD instance.
+    index_path: Path to the index file. Created if it does not exist.
+
+  Returns:
+    A tuple of the indexed results, one row per result key, of a dict mapping
+    each result source to its property names, and of a dict mapping run ids to
+    their creation time in milliseconds since epoch.
+  """
+  index = _read_index(index_path)
+  if index is None:
+    df = pd.DataFrame(index=pd.Index([], name=_INDEX_KEY_COLUMN))
+    metadata = {
+        'version': _INDEX_VERSION,
+        'max_artifact_id': 0,
+        'max_execution_id': 0,
+        'max_context_id': 0,
+        'run_create_times': {},
+        'property_names': {
+            source: [] for source in (_HPARAMS_SOURCE, _METRICS_SOURCE,
+                                      _KAGGLE_SOURCE, _COSTS_SOURCE)
+        },
+    }
+  else:
+    df, metadata = index
+  property_names = metadata['property_names']
+  run_create_times = metadata['run_create_times']
+
+  executions = _get_new_nodes(store.get_executions,
+                              metadata['max_execution_id'])
+  artifacts = _get_new_nodes(store.get_artifacts, metadata['max_artifact_id'])
+  contexts = _get_new_nodes(store.get_contexts, metadata['max_context_id'])
+  if not executions and not artifacts and not contexts:
+    return df, property_names, run_create_times
+
+  # A run context is created before the executions of its run, so the earliest
+  # creation time is the context's when there is one.
+  context_types = {t.id: t.name for t in store.get_context_types()}
+  run_nodes = [(c.properties[_RUN_ID].string_value, c.create_time_since_epoch)
+               for c in contexts
+               if context_types.get(c.type_id) == _RUN_CONTEXT]
+  run_nodes += [(e.properties[RUN_ID_KEY].string_value,
+                 e.create_time_since_epoch)
+                for e in executions
+                if RUN_ID_KEY in e.properties]
+  for run_id, create_time in run_nodes:
+    if run_id and create_time:
+      run_create_times[run_id] = min(
+          create_time, run_create_times.get(run_id, create_time))
+
+  execution_types = {t.id: t.name for t in store.get_execution_types()}
+  artifact_types = {t.id: t.name for t in store.get_artifact_types()}
+  trainer_execs = [
+      e for e in executions if execution_types.get(e.type_id) == _TRAINER
+  ]
+  publisher_artifacts = [
+      a for a in artifacts if artifact_types.get(a.type_id) == _BENCHMARK_RESULT
+  ]
+  kaggle_artifacts = [
+      a for a in artifacts if artifact_types.get(a.type_id) == _KAGGLE_RESULT
+  ]
+  artifact_to_run_info = _get_artifact_run_info_map(
+      store, [a.id for a in publisher_artifacts + kaggle_artifacts])
+  new_results = {
+      _HPARAMS_SOURCE:
+          _get_hparams(store, trainer_execs),
+      _METRICS_SOURCE:
+          _get_benchmark_results(store, publisher_artifacts,
+                                 artifact_to_run_info),
+      _KAGGLE_SOURCE:
+          _get_kaggle_results(store, kaggle_artifacts, artifact_to_run_info),
+      _COSTS_SOURCE:
+          _get_benchmark_costs(store, publisher_artifacts,
+                               artifact_to_run_info),
+  }
+  for source, result in new_results.items():
+    names = set(property_names[source]).union(result.property_names)
+    if source == _COSTS_SOURCE:
+      property_names[source] = [c for c in _COST_COLUMNS if c in names]
+    else:
+      property_names[source] = sorted(names)
+
+  rows = _merge_results(list(new_results.values())).properties
+  if rows:
+    new_df = pd.DataFrame.from_dict(rows, orient='index')
+    new_df.index.name = _INDEX_KEY_COLUMN
+    # Newer values replace the indexed ones, like _merge_results.
+    df = new_df.combine_first(df)
+
+  if executions:
+    metadata['max_execution_id'] = max(e.id for e in executions)
+  if artifacts:
+    metadata['max_artifact_id'] = max(a.id for a in artifacts)
+  if contexts:
+    metadata['max_context_id'] = max(c.id for c in contexts)
+  _write_index(index_path, df, metadata)
+  logging.info('Indexed %d new executions and %d new artifacts in %s.',
+               len(executions), len(artifacts), index_path)
+  return df, property_names, run_create_times
+
+
+def get_model_dir_map(store: metadata_store.MetadataStore,
+                      max_workers: int = 16) -> Dict[str, str]:
+  """Obtains a map of run_id to model_dir from the store.
+
+  The evaluation configs are read concurrently, and the model dirs which they
+  contain are cached, since evaluations never change after they are written.
+  Subsequent calls only read the configs of new evaluations, as long as the
+  evaluations of all the stores fit in the cache of the most recently used
+  ones.
+
+  Args:
+    store: MetaDataStore object for connecting to an MLMD instance.
+    max_workers: The maximum number of evaluation configs read concurrently.
+
+  Returns:
+    A dict mapping run ids to the model dirs of their evaluations.
+  """
+
+  # TensorFlow is only imported when needed, since it is slow to import.
+  import tensorflow.compat.v2 as tf  # pylint: disable=g-import-not-at-top
 
   evaluator_execs = store.get_executions_by_type(_EVALUATOR)
 
@@ -280,21 +1176,41 @@ def get_model_dir_map(store: metadata_store.MetadataStore) -> Dict[str, str]:
       model_dir_set.add(os.sep.join(eval_model_dir.split(os.sep)[:-2]))
     return list(model_dir_set)
 
+  def _eval_config_path(eval_exec):
+    pipeline_root = eval_exec.properties[_PIPELINE_ROOT].string_value
+    eval_component_id = eval_exec.properties[_COMPONENT_ID].string_value
+    return os.path.join(pipeline_root, eval_component_id, 'evaluation',
+                        str(eval_exec.id), 'eval_config.json')
+
+  def _read_model_dirs(eval_config_path):
+    with tf.io.gfile.GFile(eval_config_path, 'r') as f:
+      eval_config = json.load(f)
+    return _go_up_2_levels(eval_config['modelLocations'].values())
+
   def _eval_execs_to_model_dir_map(eval_execs):
+    keys = [(_eval_config_path(eval_exec), eval_exec.create_time_since_epoch)
+            for eval_exec in eval_execs]
+    model_dirs_by_key = {}
+    with _MODEL_DIRS_CACHE_LOCK:
+      for key in keys:
+        if key in _MODEL_DIRS_CACHE:
+          _MODEL_DIRS_CACHE.move_to_end(key)
+          model_dirs_by_key[key] = _MODEL_DIRS_CACHE[key]
+    new_keys = sorted(set(keys).difference(model_dirs_by_key))
+    if new_keys:
+      with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        model_dirs = list(
+            executor.map(_read_model_dirs, [path for path, _ in new_keys]))
+      model_dirs_by_key.update(zip(new_keys, model_dirs))
+      with _MODEL_DIRS_CACHE_LOCK:
+        _MODEL_DIRS_CACHE.update(zip(new_keys, model_dirs))
+        while len(_MODEL_DIRS_CACHE) > _MODEL_DIRS_CACHE_SIZE:
+          _MODEL_DIRS_CACHE.popitem(last=False)
+
     model_dir_map = {}
-    for eval_exec in eval_execs:
+    for eval_exec, key in zip(eval_execs, keys):
       run_id = eval_exec.properties[_RUN_ID].string_value
-      pipeline_root = eval_exec.properties[_PIPELINE_ROOT].string_value
-      eval_component_id = eval_exec.properties[_COMPONENT_ID].string_value
-      eval_config_path = os.path.join(pipeline_root,
-                                      eval_component_id, 'evaluation',
-                                      str(eval_exec.id), 'eval_config.json')
-
-      with tf.io.gfile.GFile(eval_config_path, 'r') as f:
-        eval_config = json.load(f)
-
-      model_dir_map[run_id] = _go_up_2_levels(
-          eval_config['modelLocations'].values())
+      model_dir_map[run_id] = list(model_dirs_by_key[key])
     return model_dir_map
 
   return _eval_execs_to_model_dir_map(evaluator_execs)
@@ -309,7 +1225,155 @@ def get_statisticsgen_dir_list(
   return stat_dirs_list
 
 
-def _make_dataframe(metrics_list: List[Dict[str, Any]],
+def get_slice_metrics(store: metadata_store.MetadataStore,
+                      benchmark_regex: Optional[Text] = None,
+                      run_ids: Optional[Iterable[Text]] = None,
+                      since: Optional[datetime.datetime] = None,
+                      max_workers: int = 16) -> pd.DataFrame:
+  """Returns the metrics of every slice of the benchmark results.
+
+  The BenchmarkResultPublisher writes every slice, output and sub key (e.g. the
+  class id of multi-class metrics) of an evaluation to a compact NPZ file, so
+  that slice analyses across benchmarks do not need to load TFMA results.
+  Results published without slice metrics are skipped.
+
+  Args:
+    store: MetaDataStore object for connecting to an MLMD instance.
+    benchmark_regex: Optional regex, matched with `re.match`, which the
+      benchmark names must match, e.g. 'OpenMLCC18.*'.
+    run_ids: Optional run ids of the results to load.
+    since: Like in `overview`.
+    max_workers: The maximum number of slice metrics files read concurrently.
+
+  Returns:
+    A pandas DataFrame with a row per metric value, with the `run_id`,
+    `benchmark`, `benchmark_fullname`, `slice`, `output_name`, `sub_key`,
+    `metric` and `value` columns.
+  """
+
+  # TensorFlow is only imported when needed, since it is slow to import.
+  import tensorflow.compat.v2 as tf  # pylint: disable=g-import-not-at-top
+
+  result_filter = _ResultFilter(
+      benchmark_regex=benchmark_regex,
+      run_ids=None if run_ids is None else set(run_ids),
+      since=since)
+  with _StorePool(store) as pool:
+    _, publisher_artifacts, _, artifact_to_run_info = _select_nodes(
+        pool, result_filter)
+
+  def _read_slice_metrics(artifact):
+    path = os.path.join(artifact.uri, SLICE_METRICS_FILENAME)
+    if not tf.io.gfile.exists(path):
+      return None
+    with tf.io.gfile.GFile(path, 'rb') as f:
+      with np.load(io.BytesIO(f.read())) as columns:
+        df = pd.DataFrame(
+            {name: columns[name] for name in SLICE_METRICS_COLUMNS})
+    benchmark_fullname = artifact.custom_properties[BENCHMARK_KEY].string_value
+    df.insert(0, BENCHMARK_FULL_KEY, benchmark_fullname)
+    df.insert(0, BENCHMARK_KEY,
+              re.sub(_RUN_SUFFIX_PATTERN, '', benchmark_fullname))
+    df.insert(0, RUN_ID_KEY, artifact_to_run_info[artifact.id].run_id)
+    return df
+
+  with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+    dfs = [
+        df for df in executor.map(_read_slice_metrics, publisher_artifacts)
+        if df is not None
+    ]
+  if not dfs:
+    return pd.DataFrame(
+        columns=[RUN_ID_KEY, BENCHMARK_KEY, BENCHMARK_FULL_KEY] +
+        list(SLICE_METRICS_COLUMNS))
+  return pd.concat(dfs, ignore_index=True)
+
+
+def get_plots(store: metadata_store.MetadataStore,
+              benchmark_regex: Optional[Text] = None,
+              run_ids: Optional[Iterable[Text]] = None,
+              since: Optional[datetime.datetime] = None,
+              max_workers: int = 16) -> pd.DataFrame:
+  """Returns the plots of every slice of the benchmark results.
+
+  The BenchmarkResultPublisher only reads the metrics of evaluations, so plots,
+  e.g. calibration histograms or confusion matrices, are read on request from
+  the evaluations which the benchmark results record. Results published
+  without an evaluation id are skipped.
+
+  Args:
+    store: MetaDataStore object for connecting to an MLMD instance.
+    benchmark_regex: Optional regex, matched with `re.match`, which the
+      benchmark names must match, e.g. 'OpenMLCC18.*'.
+    run_ids: Optional run ids of the results to load.
+    since: Like in `overview`.
+    max_workers: The maximum number of evaluations read concurrently.
+
+  Returns:
+    A pandas DataFrame with a row per slice, with the `run_id`, `benchmark`,
+    `benchmark_fullname`, `slice` and `plots` columns. The `plots` are
+    `tfma` `PlotsForSlice` protos.
+  """
+
+  # TensorFlow is only imported when needed, since it is slow to import.
+  import tensorflow.compat.v2 as tf  # pylint: disable=g-import-not-at-top
+  from tensorflow_model_analysis.proto import metrics_for_slice_pb2  # pylint: disable=g-import-not-at-top
+  from tensorflow_model_analysis.slicer import slicer_lib  # pylint: disable=g-import-not-at-top
+
+  result_filter = _ResultFilter(
+      benchmark_regex=benchmark_regex,
+      run_ids=None if run_ids is None else set(run_ids),
+      since=since)
+  with _StorePool(store) as pool:
+    _, publisher_artifacts, _, artifact_to_run_info = _select_nodes(
+        pool, result_filter)
+  publisher_artifacts = [
+      a for a in publisher_artifacts
+      if EVALUATION_ID_KEY in a.custom_properties
+  ]
+  evaluation_uris = {
+      evaluation.id: evaluation.uri
+      for evaluation in store.get_artifacts_by_id(
+          sorted({
+              a.custom_properties[EVALUATION_ID_KEY].int_value
+              for a in publisher_artifacts
+          }))
+  }
+
+  def _read_plots(artifact):
+    evaluation_id = artifact.custom_properties[EVALUATION_ID_KEY].int_value
+    if evaluation_id not in evaluation_uris:
+      return []
+    benchmark_fullname = artifact.custom_properties[BENCHMARK_KEY].string_value
+    rows = []
+    for path in sorted(
+        tf.io.gfile.glob(
+            os.path.join(evaluation_uris[evaluation_id],
+                         _PLOTS_PREFIX + '*'))):
+      for record in tf.compat.v1.io.tf_record_iterator(path):
+        plots = metrics_for_slice_pb2.PlotsForSlice.FromString(record)
+        rows.append({
+            RUN_ID_KEY: artifact_to_run_info[artifact.id].run_id,
+            BENCHMARK_KEY: re.sub(_RUN_SUFFIX_PATTERN, '', benchmark_fullname),
+            BENCHMARK_FULL_KEY: benchmark_fullname,
+            SLICE_KEY: slicer_lib.stringify_slice_key(
+                slicer_lib.deserialize_slice_key(plots.slice_key)),
+            PLOTS_KEY: plots,
+        })
+    return rows
+
+  with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+    rows = list(
+        itertools.chain.from_iterable(
+            executor.map(_read_plots, publisher_artifacts)))
+  return pd.DataFrame(
+      rows,
+      columns=[
+          RUN_ID_KEY, BENCHMARK_KEY, BENCHMARK_FULL_KEY, SLICE_KEY, PLOTS_KEY
+      ])
+
+
+def _make_dataframe(metrics_list: Union[List[Dict[str, Any]], pd.DataFrame],
                     columns: List[str]) -> pd.DataFrame:
   """Makes pandas.DataFrame from metrics_list."""
   df = pd.DataFrame(metrics_list)
@@ -318,7 +1382,7 @@ def _make_dataframe(metrics_list: List[Dict[str, Any]],
     # Strip benchmark run repetition for aggregation.
     df[BENCHMARK_FULL_KEY] = df[BENCHMARK_KEY]
     df[BENCHMARK_KEY] = df[BENCHMARK_KEY].apply(
-        lambda x: re.sub(r'\.run_\d_of_\d$', '', x))
+        lambda x: re.sub(_RUN_SUFFIX_PATTERN, '', x))
 
     key_columns = list(_DATAFRAME_CONTEXTUAL_COLUMNS)
     if RUN_KEY not in df:
@@ -358,11 +1422,24 @@ def _aggregate_results(df: pd.DataFrame,
 def overview(
     store: metadata_store.MetadataStore,
     metric_aggregators: Optional[List[Any]] = None,
+    include_costs: bool = False,
+    index_path: Optional[Text] = None,
+    benchmark_regex: Optional[Text] = None,
+    run_ids: Optional[Iterable[Text]] = None,
+    since: Optional[datetime.datetime] = None,
+    metadata_connection_config: Optional[Any] = None,
+    max_workers: int = 4,
 ) -> pd.DataFrame:
   """Returns a pandas.DataFrame containing hparams and evaluation results.
 
   This method assumes that `tf.enable_v2_behavior()` was called beforehand.
-  It loads results for all evaluation therefore method can be slow.
+  It loads results for all evaluation therefore method can be slow, unless an
+  `index_path` is given.
+
+  The `benchmark_regex`, `run_ids` and `since` filters are applied before the
+  results are fetched and parsed: only the nodes of the matching runs are
+  fetched using the TFX run contexts, and only the lineage of the matching
+  benchmark results is loaded.
 
   TODO(b/151085210): Allow filtering incomplete benchmark runs.
 
@@ -378,17 +1455,73 @@ def overview(
       id, hparams), and aggregates metrics by the given functions. If a
       function, must either work when passed a DataFrame or when passed to
       DataFrame.apply.
+    include_costs: Whether to add cost columns, e.g. `cpu_hours`, next to the
+      metrics. The cost of a benchmark sums the resource usage recorded by all
+      the component executions upstream of its result, e.g. to rank pipelines
+      by quality per CPU-hour. The usage of executions shared by several
+      results is split evenly between them. See
+      `nitroml.orchestration.instrumentation`.
+    index_path: Optional path to a local Parquet file, e.g. next to the store,
+      which indexes the results already loaded from the store. Each call then
+      only fetches and parses the artifacts and executions which were added to
+      the store since the previous call, and updates the index. The index must
+      only be used with a single store.
+    benchmark_regex: Optional regex, matched with `re.match`, which the
+      benchmark names must match, e.g. 'OpenMLCC18.*'.
+    run_ids: Optional run ids of the results to load.
+    since: Optional datetime before which the runs to load must not start.
+      Runs are dated by the creation time of their MLMD run context or
+      executions. Runs which cannot be dated are kept.
+    metadata_connection_config: Optional `ConnectionConfig` or
+      `MetadataStoreClientConfig` of the store. When given, independent queries
+      are issued concurrently, each worker thread using its own connection,
+      e.g. to hide the latency of a remote MySQL-backed store.
+    max_workers: The maximum number of concurrent queries when a
+      `metadata_connection_config` is given.
 
   Returns:
     A pandas DataFrame with the loaded hparams and evaluations or an empty one
     if no evaluations and hparams could be found.
   """
-  hparams_result = _get_hparams(store)
-  metrics_result = _get_benchmark_results(store)
-  kaggle__result = _get_kaggle_results(store)
+  result_filter = _ResultFilter(
+      benchmark_regex=benchmark_regex,
+      run_ids=None if run_ids is None else set(run_ids),
+      since=since)
+  df, hparam_names = _load_overview(store, include_costs, index_path,
+                                    result_filter, metadata_connection_config,
+                                    max_workers)
+  if metric_aggregators:
+    return _aggregate_results(
+        df,
+        metric_aggregators=metric_aggregators,
+        groupby_columns=list(_DATAFRAME_CONTEXTUAL_COLUMNS) + hparam_names)
+  return df
+
+
+def _load_overview(
+    store: metadata_store.MetadataStore, include_costs: bool,
+    index_path: Optional[Text], result_filter: _ResultFilter,
+    metadata_connection_config: Optional[Any],
+    max_workers: int) -> Tuple[pd.DataFrame, List[str]]:
+  """Returns the `overview` without aggregation, and the hparam names."""
+  if index_path:
+    return _indexed_overview(store, index_path, include_costs, result_filter)
+
+  with _StorePool(store, metadata_connection_config, max_workers) as pool:
+    (trainer_execs, publisher_artifacts, kaggle_artifacts,
+     artifact_to_run_info) = _select_nodes(pool, result_filter)
+  hparams_result = _get_hparams(store, trainer_execs)
+  metrics_result = _get_benchmark_results(store, publisher_artifacts,
+                                          artifact_to_run_info)
+  kaggle__result = _get_kaggle_results(store, kaggle_artifacts,
+                                       artifact_to_run_info)
+  results_to_merge = [hparams_result, metrics_result, kaggle__result]
+  if include_costs:
+    results_to_merge.append(
+        _get_benchmark_costs(store, publisher_artifacts, artifact_to_run_info))
 
   # Merge results
-  result = _merge_results([hparams_result, metrics_result, kaggle__result])
+  result = _merge_results(results_to_merge)
 
   # Filter metrics that have empty hparams and evaluation results.
   results_list = [
@@ -397,10 +1530,523 @@ def overview(
   ]
 
   df = _make_dataframe(results_list, result.property_names)
+  return df, hparams_result.property_names
+
+
+def _indexed_overview(
+    store: metadata_store.MetadataStore, index_path: Text, include_costs: bool,
+    result_filter: _ResultFilter) -> Tuple[pd.DataFrame, List[str]]:
+  """Returns the `overview` of the results indexed at `index_path`."""
+  df, property_names, run_create_times = _update_index(store, index_path)
+  if result_filter.filters_runs and RUN_ID_KEY in df:
+    df = df[df[RUN_ID_KEY].map(lambda r: isinstance(r, str) and result_filter.
+                               matches_run(r, run_create_times.get(r, 0)))]
+  if result_filter.benchmark_regex is not None and BENCHMARK_KEY in df:
+    df = df[df[BENCHMARK_KEY].map(
+        lambda b: isinstance(b, str) and result_filter.matches_benchmark(b))]
+  sources = [_HPARAMS_SOURCE, _METRICS_SOURCE, _KAGGLE_SOURCE]
+  if include_costs:
+    sources.append(_COSTS_SOURCE)
+  else:
+    df = df.drop(columns=[c for c in _COST_COLUMNS if c in df])
+  columns = []
+  for source in sources:
+    columns += property_names[source]
+
+  # Filter metrics that have empty hparams and evaluation results.
+  df = df[df.notna().sum(axis=1) > len(_DEFAULT_COLUMNS)]
+
+  df = _make_dataframe(df.reset_index(drop=True), columns)
+  return df, property_names[_HPARAMS_SOURCE]
+
+
+def _source_name(connection_config: Any) -> Text:
+  """Returns a readable name for the store of `connection_config`."""
+  if isinstance(connection_config, metadata_store_pb2.ConnectionConfig):
+    if connection_config.HasField('sqlite'):
+      return connection_config.sqlite.filename_uri
+    if connection_config.HasField('mysql'):
+      mysql = connection_config.mysql
+      return f'mysql://{mysql.host}:{mysql.port}/{mysql.database}'
+  elif isinstance(connection_config,
+                  metadata_store_pb2.MetadataStoreClientConfig):
+    return f'grpc://{connection_config.host}:{connection_config.port}'
+  return str(connection_config)
+
+
+def overview_many(
+    connection_configs: Union[Sequence[Any], Mapping[Text, Any]],
+    max_workers: Optional[int] = None,
+    metric_aggregators: Optional[List[Any]] = None,
+    include_costs: bool = False,
+    benchmark_regex: Optional[Text] = None,
+    run_ids: Optional[Iterable[Text]] = None,
+    since: Optional[datetime.datetime] = None,
+) -> pd.DataFrame:
+  """Returns the merged `overview` of many MLMD stores.
+
+  Each local or sharded run writes its results to its own store, e.g. the
+  `mlmd.sqlite` of its pipeline root. The stores are read concurrently, and
+  their results are tagged with their store in the `source` column.
+
+  A result found in several stores, i.e. with the same run id and benchmark, is
+  only kept from the first store, e.g. when a store was copied.
+
+  Args:
+    connection_configs: The `ConnectionConfig`s or `MetadataStoreClientConfig`s
+      of the stores. Either a sequence, in which case the sources are named
+      after the store locations, or a mapping from source names to configs.
+    max_workers: The maximum number of stores read concurrently. Defaults to
+      one per store, up to 32.
+    metric_aggregators: Like in `overview`. The results are aggregated after
+      they are merged.
+    include_costs: Like in `overview`.
+    benchmark_regex: Like in `overview`.
+    run_ids: Like in `overview`.
+    since: Like in `overview`.
+
+  Returns:
+    A pandas DataFrame with the merged results of all the stores, or an empty
+    one if none could be found.
+
+  Raises:
+    ValueError: If `max_workers` is not strictly positive.
+  """
+  if max_workers is not None and max_workers <= 0:
+    raise ValueError('max_workers must be strictly positive; '
+                     f'got max_workers={max_workers} instead.')
+  if not isinstance(connection_configs, collections.abc.Mapping):
+    connection_configs = {
+        _source_name(config): config for config in connection_configs
+    }
+  if not connection_configs:
+    return pd.DataFrame()
+  result_filter = _ResultFilter(
+      benchmark_regex=benchmark_regex,
+      run_ids=None if run_ids is None else set(run_ids),
+      since=since)
+
+  def _load(config):
+    store = metadata_store.MetadataStore(config)
+    return _load_overview(
+        store,
+        include_costs,
+        index_path=None,
+        result_filter=result_filter,
+        metadata_connection_config=None,
+        max_workers=1)
+
+  with futures.ThreadPoolExecutor(
+      max_workers=max_workers or min(32, len(connection_configs))) as executor:
+    loaded = list(executor.map(_load, connection_configs.values()))
+
+  dfs = []
+  hparam_names = []
+  for source, (df, names) in zip(connection_configs, loaded):
+    hparam_names += [n for n in names if n not in hparam_names]
+    if df.empty:
+      continue
+    df.insert(0, SOURCE_KEY, source)
+    dfs.append(df)
+  if not dfs:
+    return pd.DataFrame()
+  df = pd.concat(dfs)
+  df = df[~df.duplicated(subset=[RUN_ID_KEY, BENCHMARK_FULL_KEY])]
+
   if metric_aggregators:
     return _aggregate_results(
         df,
         metric_aggregators=metric_aggregators,
-        groupby_columns=list(_DATAFRAME_CONTEXTUAL_COLUMNS) +
-        hparams_result.property_names)
+        groupby_columns=[SOURCE_KEY] + list(_DATAFRAME_CONTEXTUAL_COLUMNS) +
+        hparam_names)
   return df
+
+
+def iter_overview(store: metadata_store.MetadataStore,
+                  chunk_size: int = 10000,
+                  include_costs: bool = False) -> Iterator[pd.DataFrame]:
+  """Yields the `overview` of the benchmark results in chunks.
+
+  Unlike `overview`, the memory used does not grow with the number of results
+  in the store, so that a long history can be aggregated chunk by chunk, e.g.:
+
+    for df in results.iter_overview(store):
+      accuracy_sums = accuracy_sums.add(
+          df.groupby('benchmark')['accuracy'].sum(), fill_value=0)
+
+  The store is paged through twice by node ids: first to find the columns and
+  the nodes of each result, then to load the results in chunks, by increasing
+  artifact ids. Only node ids are kept in memory between the chunks.
+
+  Each row is a benchmark result, merged with its hparams and kaggle results
+  when any. Unlike `overview`, the results without a BenchmarkResult artifact
+  are not returned.
+
+  Args:
+    store: MetaDataStore object for connecting to an MLMD instance.
+    chunk_size: The maximum number of benchmark results per chunk.
+    include_costs: Whether to add cost columns, e.g. `cpu_hours`, next to the
+      metrics, like in `overview`.
+
+  Yields:
+    Non-empty pandas DataFrames, with the same columns as `overview` without
+    aggregation. All the chunks have the same columns.
+
+  Raises:
+    ValueError: If `chunk_size` is not strictly positive.
+  """
+  if chunk_size <= 0:
+    raise ValueError('chunk_size must be strictly positive; '
+                     f'got chunk_size={chunk_size} instead.')
+
+  execution_types = {t.id: t.name for t in store.get_execution_types()}
+  artifact_types = {t.id: t.name for t in store.get_artifact_types()}
+  hparam_names = set()
+  trainer_ids = {}  # Result key to the id of its trainer execution.
+  for executions in _iter_node_batches(store.get_executions):
+    trainer_execs = [
+        e for e in executions if execution_types.get(e.type_id) == _TRAINER
+    ]
+    hparam_names.update(_get_hparams(store, trainer_execs).property_names)
+    for trainer_exec in trainer_execs:
+      trainer_ids[_trainer_result_key(trainer_exec)] = trainer_exec.id
+  custom_property_names = set()
+  kaggle_names = set()
+  publisher_ids = []
+  kaggle_ids = {}  # Result key to the id of its kaggle result artifact.
+  for artifacts in _iter_node_batches(store.get_artifacts):
+    kaggle_artifacts = []
+    for artifact in artifacts:
+      type_name = artifact_types.get(artifact.type_id)
+      if type_name == _BENCHMARK_RESULT:
+        publisher_ids.append(artifact.id)
+        custom_property_names.update(artifact.custom_properties.keys())
+      elif type_name == _KAGGLE_RESULT:
+        kaggle_artifacts.append(artifact)
+    if kaggle_artifacts:
+      kaggle_names.update(
+          _get_kaggle_results(store, kaggle_artifacts).property_names)
+      artifact_to_run_info = _get_artifact_run_info_map(
+          store, [a.id for a in kaggle_artifacts])
+      for artifact_id, run_info in artifact_to_run_info.items():
+        kaggle_ids[_kaggle_result_key(run_info)] = artifact_id
+
+  columns = sorted(hparam_names) + sorted(
+      custom_property_names.difference(_NON_METRIC_PROPERTIES)) + sorted(
+          kaggle_names)
+  if include_costs:
+    columns += list(_COST_COLUMNS)
+  columns = list(dict.fromkeys(columns))
+  # All chunks have the key columns of the rows from all the chunks.
+  key_columns = [STARTED_AT, RUN_ID_KEY, BENCHMARK_KEY] + [
+      c for c in (RUN_KEY, NUM_RUNS_KEY) if c in custom_property_names
+  ]
+
+  for start in range(0, len(publisher_ids), chunk_size):
+    publisher_artifacts = store.get_artifacts_by_id(
+        publisher_ids[start:start + chunk_size])
+    metrics_result = _get_benchmark_results(store, publisher_artifacts)
+    keys = list(metrics_result.properties)
+    hparams_result = _get_hparams(
+        store,
+        store.get_executions_by_id(
+            [trainer_ids[k] for k in keys if k in trainer_ids]))
+    kaggle_result = _get_kaggle_results(
+        store,
+        store.get_artifacts_by_id(
+            [kaggle_ids[k] for k in keys if k in kaggle_ids]))
+    results_to_merge = [hparams_result, metrics_result, kaggle_result]
+    if include_costs:
+      results_to_merge.append(
+          _get_benchmark_costs(store, publisher_artifacts))
+    result = _merge_results(results_to_merge)
+
+    # Filter metrics that have empty hparams and evaluation results.
+    results_list = [
+        result.properties[key]
+        for key in keys
+        if len(result.properties[key]) > len(_DEFAULT_COLUMNS)
+    ]
+    if not results_list:
+      continue
+    df = pd.DataFrame(results_list).reindex(columns=key_columns + columns)
+    yield _make_dataframe(df, columns)
+
+
+def export(store: metadata_store.MetadataStore, path: Text,
+           **overview_kwargs) -> pd.DataFrame:
+  """Writes a snapshot of the `overview` of the store to `path`.
+
+  The snapshot is an uncompressed Arrow IPC file, which `load` memory-maps, so
+  that analyses can load large results almost instantly without connecting to
+  the store. Columns are typed, e.g. metrics and costs are stored as doubles.
+  Columns mixing types, which Arrow cannot represent, are stored as JSON
+  strings and decoded by `load`.
+
+  Args:
+    store: MetaDataStore object for connecting to an MLMD instance.
+    path: Path to the local file to write.
+    **overview_kwargs: Keyword arguments of `overview`, e.g. its filters.
+      Defaults to including the cost columns.
+
+  Returns:
+    The exported overview DataFrame.
+  """
+  # PyArrow is only imported when needed, since it is slow to import.
+  import pyarrow as pa  # pylint: disable=g-import-not-at-top
+
+  overview_kwargs.setdefault('include_costs', True)
+  df = overview(store, **overview_kwargs)
+  index_columns = [name for name in df.index.names if name is not None]
+  table_df = df.reset_index() if index_columns else df.copy()
+  json_columns = []
+  for column in table_df.columns:
+    if table_df[column].dtype != object:
+      continue
+    try:
+      pa.array(table_df[column], from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+      json_columns.append(column)
+      table_df[column] = table_df[column].map(_encode_json_value)
+
+  table = pa.Table.from_pandas(table_df, preserve_index=False)
+  schema_metadata = dict(table.schema.metadata or {})
+  schema_metadata[_EXPORT_METADATA_KEY] = json.dumps({
+      'version': _EXPORT_VERSION,
+      'index_columns': index_columns,
+      'json_columns': json_columns,
+  })
+  table = table.replace_schema_metadata(schema_metadata)
+  tmp_path = path + '.tmp'
+  with pa.OSFile(tmp_path, 'wb') as sink:
+    with pa.ipc.new_file(sink, table.schema) as writer:
+      writer.write_table(table)
+  os.replace(tmp_path, path)
+  return df
+
+
+def load(path: Text) -> pd.DataFrame:
+  """Loads a snapshot written by `export` by memory-mapping it.
+
+  Each column becomes its own pandas block, so numeric columns without missing
+  values can be used without copying them out of the memory map. Other
+  columns, e.g. strings, are converted, and the Arrow buffers are released as
+  they are.
+
+  Args:
+    path: Path to the local file written by `export`.
+
+  Returns:
+    The exported overview DataFrame.
+
+  Raises:
+    ValueError: If `path` was not written by `export`.
+  """
+  # PyArrow is only imported when needed, since it is slow to import.
+  import pyarrow as pa  # pylint: disable=g-import-not-at-top
+
+  with pa.memory_map(path, 'r') as source:
+    table = pa.ipc.open_file(source).read_all()
+  schema_metadata = table.schema.metadata or {}
+  if _EXPORT_METADATA_KEY not in schema_metadata:
+    raise ValueError(f'{path} was not written by nitroml.results.export.')
+  metadata = json.loads(schema_metadata[_EXPORT_METADATA_KEY])
+  df = table.to_pandas(split_blocks=True, self_destruct=True)
+  del table  # Must not be used after a self-destructing conversion.
+  for column in metadata['json_columns']:
+    df[column] = df[column].map(_decode_json_value, na_action='ignore')
+  if metadata['index_columns']:
+    df = df.set_index(metadata['index_columns'])
+  return df
+
+
+def _get_abandoned_artifacts(store: metadata_store.MetadataStore,
+                             artifact_ids: Iterable[int]) -> Set[int]:
+  """Returns the artifacts whose producing execution has finished.
+
+  Args:
+    store: MetaDataStore object for connecting to an MLMD instance.
+    artifact_ids: The ids of pending artifacts.
+
+  Returns:
+    The ids of the artifacts which will never be published, since the
+    execution which produces them is complete, failed or was canceled.
+  """
+  artifact_ids = sorted(artifact_ids)
+  if not artifact_ids:
+    return set()
+  artifact_to_exec = {
+      event.artifact_id: event.execution_id
+      for event in store.get_events_by_artifact_ids(artifact_ids)
+      if event.type == metadata_store_pb2.Event.OUTPUT
+  }
+  finished_exec_ids = {
+      execution.id
+      for execution in store.get_executions_by_id(
+          sorted(set(artifact_to_exec.values())))
+      if execution.last_known_state in _FINISHED_EXECUTION_STATES or
+      (_STATE in execution.properties and
+       execution.properties[_STATE].string_value == _COMPLETE)
+  }
+  return {
+      artifact_id for artifact_id, execution_id in artifact_to_exec.items()
+      if execution_id in finished_exec_ids
+  }
+
+
+class Leaderboard(object):
+  """Running statistics of the metrics of each benchmark, updated incrementally.
+
+  Each `update` tails the BenchmarkResult artifacts which were published since
+  the previous one, by increasing artifact ids, and folds their metrics into a
+  running mean and variance per benchmark across runs (Welford's algorithm).
+  The cost of an update only depends on the number of new artifacts, not on the
+  size of the store's history, and on the number of results still pending.
+  See `nitroml.results_watcher` for a process which serves a leaderboard while
+  a campaign runs.
+
+  A leaderboard must only ever be updated from the same store.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._last_artifact_id = 0
+    # Ids of the pending results before the last artifact, to revisit.
+    self._pending_artifact_ids = set()
+    # Benchmark to metric name to [count, mean, sum of squared deviations].
+    self._stats = {}
+
+  @property
+  def last_artifact_id(self) -> int:
+    return self._last_artifact_id
+
+  @property
+  def pending_artifact_ids(self) -> Set[int]:
+    with self._lock:
+      return set(self._pending_artifact_ids)
+
+  def update(self, store: metadata_store.MetadataStore) -> int:
+    """Folds the new benchmark results of the store into the leaderboard.
+
+    Pending results are revisited by later updates, and folded in once they are
+    published. Pending results whose producing execution has finished, e.g.
+    failed, are never published and are dropped. Results in any other state,
+    e.g. deleted ones, are skipped.
+
+    Args:
+      store: MetaDataStore object for connecting to an MLMD instance.
+
+    Returns:
+      The number of new benchmark results.
+    """
+    with self._lock:
+      pending_ids = set(self._pending_artifact_ids)
+    artifacts = []
+    if pending_ids:
+      artifacts = store.get_artifacts_by_id(sorted(pending_ids))
+    artifact_types = None
+    last_artifact_id = self._last_artifact_id
+    for new_artifacts in _iter_node_batches(store.get_artifacts,
+                                            last_artifact_id):
+      if artifact_types is None:
+        artifact_types = {t.id: t.name for t in store.get_artifact_types()}
+      artifacts += [
+          a for a in new_artifacts
+          if artifact_types.get(a.type_id) == _BENCHMARK_RESULT
+      ]
+      last_artifact_id = max(a.id for a in new_artifacts)
+
+    num_results = 0
+    pending_ids = set()
+    for artifact in artifacts:
+      state = _PUBLISHED
+      if _STATE in artifact.custom_properties:
+        state = artifact.custom_properties[_STATE].string_value
+      if state == _PENDING:
+        pending_ids.add(artifact.id)
+      # Results in other states, e.g. deleted ones, are skipped.
+      elif state == _PUBLISHED and BENCHMARK_KEY in artifact.custom_properties:
+        self._add_result(artifact)
+        num_results += 1
+    pending_ids.difference_update(_get_abandoned_artifacts(store, pending_ids))
+    with self._lock:
+      self._pending_artifact_ids = pending_ids
+      self._last_artifact_id = last_artifact_id
+    return num_results
+
+  def _add_result(self, artifact: metadata_store_pb2.Artifact) -> None:
+    benchmark = re.sub(_RUN_SUFFIX_PATTERN, '',
+                       artifact.custom_properties[BENCHMARK_KEY].string_value)
+    with self._lock:
+      benchmark_stats = self._stats.setdefault(benchmark, {})
+      for name, value in artifact.custom_properties.items():
+        if name in _NON_METRIC_PROPERTIES:
+          continue
+        value = _parse_value(value, name)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+          continue
+        stats = benchmark_stats.setdefault(name, [0, 0., 0.])
+        stats[0] += 1
+        delta = value - stats[1]
+        stats[1] += delta / stats[0]
+        stats[2] += delta * (value - stats[1])
+
+  def to_dataframe(self) -> pd.DataFrame:
+    """Returns the leaderboard, with a row per benchmark.
+
+    Returns:
+      A pandas DataFrame indexed by benchmark, with the `count`, `mean` and
+      sample `variance` of each metric across runs, e.g. `accuracy mean`.
+    """
+    rows = {}
+    with self._lock:
+      for benchmark, benchmark_stats in self._stats.items():
+        row = rows.setdefault(benchmark, {})
+        for name, (count, mean, squared_deviations) in sorted(
+            benchmark_stats.items()):
+          row[f'{name} count'] = count
+          row[f'{name} mean'] = mean
+          row[f'{name} variance'] = (
+              squared_deviations / (count - 1) if count > 1 else float('nan'))
+    df = pd.DataFrame.from_dict(rows, orient='index')
+    df.index.name = BENCHMARK_KEY
+    return df.sort_index()
+
+  def save(self, path: Text) -> None:
+    """Atomically writes the state of the leaderboard to a JSON file."""
+    with self._lock:
+      state = json.dumps({
+          'version': _LEADERBOARD_VERSION,
+          'last_artifact_id': self._last_artifact_id,
+          'pending_artifact_ids': sorted(self._pending_artifact_ids),
+          'stats': self._stats,
+      })
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+      f.write(state)
+    os.replace(tmp_path, path)
+
+  @classmethod
+  def load(cls, path: Text) -> 'Leaderboard':
+    """Returns the leaderboard saved at `path`, to resume updating it.
+
+    Args:
+      path: Path to a JSON file written by `save`.
+
+    Returns:
+      The loaded Leaderboard.
+
+    Raises:
+      ValueError: If the file was written by an unsupported version.
+    """
+    with open(path) as f:
+      state = json.load(f)
+    if state['version'] != _LEADERBOARD_VERSION:
+      raise ValueError(f'Unsupported leaderboard version {state["version"]}; '
+                       f'expected version {_LEADERBOARD_VERSION}.')
+    leaderboard = cls()
+    leaderboard._last_artifact_id = state['last_artifact_id']  # pylint: disable=protected-access
+    leaderboard._pending_artifact_ids = set(  # pylint: disable=protected-access
+        state.get('pending_artifact_ids', []))
+    leaderboard._stats = state['stats']  # pylint: disable=protected-access
+    return leaderboard
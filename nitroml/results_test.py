@@ -16,13 +16,16 @@
 """Tests for nitroml.results."""
 
 import datetime
+import json
 import os
-from typing import Dict
+from typing import Any, Dict, Optional, Sequence
 
 from absl.testing import absltest
 from absl.testing import parameterized
 
 from nitroml import results
+import numpy as np
+import pandas as pd
 from ml_metadata import metadata_store
 from ml_metadata.proto import metadata_store_pb2
 
@@ -32,6 +35,120 @@ _MLMD_04_01_20_PATH = os.path.join(
     os.path.dirname(__file__), 'testdata/mlmd/mlmd_04_01_20.sqlite')
 _MLMD_05_21_20_PATH = os.path.join(
     os.path.dirname(__file__), 'testdata/mlmd/mlmd_05_21_20.sqlite')
+_EVALUATION_PATH = os.path.join(
+    os.path.dirname(__file__), 'testdata/benchmark_results',
+    'Evaluator.AutoTFXTasks.benchmark.openml_vowel/evaluation/1062')
+
+
+def _set_custom_properties(node: Any, properties: Dict[str, Any]) -> None:
+  """Sets custom properties of an MLMD node, typed after their values."""
+  for key, value in properties.items():
+    if isinstance(value, str):
+      node.custom_properties[key].string_value = value
+    elif isinstance(value, int):
+      node.custom_properties[key].int_value = value
+    else:
+      node.custom_properties[key].double_value = value
+
+
+class _FakeResultStore(object):
+  """An in-memory MLMD store to which fake benchmark results can be added."""
+
+  def __init__(self):
+    config = metadata_store_pb2.ConnectionConfig()
+    config.fake_database.SetInParent()
+    self.store = metadata_store.MetadataStore(config)
+    exec_type = metadata_store_pb2.ExecutionType()
+    exec_type.name = 'BenchmarkResultPublisher'
+    exec_type.properties[results.RUN_ID_KEY] = metadata_store_pb2.STRING
+    self._exec_type_id = self.store.put_execution_type(exec_type)
+    artifact_type = metadata_store_pb2.ArtifactType()
+    artifact_type.name = 'Artifact'
+    self._artifact_type_id = self.store.put_artifact_type(artifact_type)
+    artifact_type = metadata_store_pb2.ArtifactType()
+    artifact_type.name = results._BENCHMARK_RESULT
+    self._result_type_id = self.store.put_artifact_type(artifact_type)
+    context_type = metadata_store_pb2.ContextType()
+    context_type.name = results._RUN_CONTEXT
+    context_type.properties[results.RUN_ID_KEY] = metadata_store_pb2.STRING
+    self._context_type_id = self.store.put_context_type(context_type)
+
+  def put_run_context(self, run_id: str) -> int:
+    """Puts a run context and returns its id."""
+    context = metadata_store_pb2.Context()
+    context.type_id = self._context_type_id
+    context.name = 'pipeline.' + run_id
+    context.properties[results.RUN_ID_KEY].string_value = run_id
+    return self.store.put_contexts([context])[0]
+
+  def put_artifact(self,
+                   benchmark: Optional[str] = None,
+                   properties: Optional[Dict[str, Any]] = None,
+                   uri: str = '') -> int:
+    """Puts an artifact, a BenchmarkResult if `benchmark` is set.
+
+    Custom properties are typed after their Python values. Returns the id of
+    the artifact.
+    """
+    artifact = metadata_store_pb2.Artifact()
+    artifact.type_id = self._artifact_type_id
+    artifact.uri = uri
+    if benchmark is not None:
+      artifact.type_id = self._result_type_id
+      artifact.custom_properties[results.BENCHMARK_KEY].string_value = (
+          benchmark)
+    _set_custom_properties(artifact, properties or {})
+    return self.store.put_artifacts([artifact])[0]
+
+  def put_execution(self,
+                    run_id: str = '0',
+                    inputs: Sequence[int] = (),
+                    outputs: Sequence[int] = (),
+                    context_id: Optional[int] = None,
+                    properties: Optional[Dict[str, Any]] = None) -> int:
+    """Puts an execution consuming and producing the given artifact ids."""
+    execution = metadata_store_pb2.Execution()
+    execution.type_id = self._exec_type_id
+    execution.properties[results.RUN_ID_KEY].string_value = run_id
+    _set_custom_properties(execution, properties or {})
+    execution_id = self.store.put_executions([execution])[0]
+    events = []
+    for event_type, artifact_ids in [(metadata_store_pb2.Event.INPUT, inputs),
+                                     (metadata_store_pb2.Event.OUTPUT, outputs)
+                                    ]:
+      for artifact_id in artifact_ids:
+        event = metadata_store_pb2.Event()
+        event.type = event_type
+        event.artifact_id = artifact_id
+        event.execution_id = execution_id
+        events.append(event)
+    self.store.put_events(events)
+    if context_id is not None:
+      self.store.put_attributions_and_associations([
+          metadata_store_pb2.Attribution(
+              artifact_id=artifact_id, context_id=context_id)
+          for artifact_id in outputs
+      ], [
+          metadata_store_pb2.Association(
+              execution_id=execution_id, context_id=context_id)
+      ])
+    return execution_id
+
+  def put_result(self,
+                 run_id: str,
+                 benchmark: str,
+                 properties: Optional[Dict[str, Any]] = None,
+                 uri: str = '',
+                 context_id: Optional[int] = None,
+                 execution_properties: Optional[Dict[str, Any]] = None) -> int:
+    """Puts a BenchmarkResult published by its own execution, returns its id."""
+    artifact_id = self.put_artifact(benchmark, properties, uri)
+    self.put_execution(
+        run_id,
+        outputs=[artifact_id],
+        context_id=context_id,
+        properties=execution_properties)
+    return artifact_id
 
 
 class OverviewTest(parameterized.TestCase):
@@ -264,6 +381,25 @@ class ToPyTypeTest(absltest.TestCase):
     self.assertEqual(val, 'Awesome')
 
 
+class ParseValueTest(absltest.TestCase):
+
+  def testDoubleVal(self):
+    value = metadata_store_pb2.Value(double_value=0.25)
+    self.assertEqual(0.25, results._parse_value(value, 'accuracy'))
+
+  def testIntVal(self):
+    value = metadata_store_pb2.Value(int_value=3)
+    self.assertEqual(3, results._parse_value(value, results.NUM_RUNS_KEY))
+
+  def testLegacyStringVal(self):
+    value = metadata_store_pb2.Value(string_value='0.25')
+    self.assertEqual(0.25, results._parse_value(value, 'accuracy'))
+
+  def testStringPropertyIsNotParsed(self):
+    value = metadata_store_pb2.Value(string_value='True')
+    self.assertEqual('True', results._parse_value(value, results.BENCHMARK_KEY))
+
+
 class ParseHparamsTest(parameterized.TestCase):
 
   @parameterized.named_parameters(
@@ -490,6 +626,673 @@ class GetBenchmarkResultsTest(absltest.TestCase):
     self.assertEqual(want_result, result)
 
 
+class GetArtifactRunInfoMapTest(absltest.TestCase):
+
+  def testIgnoresConsumers(self):
+    fake_store = _FakeResultStore()
+    artifact_id = fake_store.put_result('0', 'A')
+    fake_store.put_execution('1', inputs=[artifact_id])
+
+    run_info = results._get_artifact_run_info_map(fake_store.store,
+                                                  [artifact_id])
+
+    self.assertEqual('0', run_info[artifact_id].run_id)
+
+
+class GetBenchmarkCostsTest(absltest.TestCase):
+
+  def setUp(self):
+    super(GetBenchmarkCostsTest, self).setUp()
+    self.fake_store = _FakeResultStore()
+    self.store = self.fake_store.store
+
+  def _put_execution(self, inputs, wall_time, peak_rss, benchmark=None):
+    """Puts an execution consuming `inputs` and returns its output's id."""
+    properties = {'accuracy': '0.5'} if benchmark else {}
+    artifact_id = self.fake_store.put_artifact(benchmark, properties)
+    self.fake_store.put_execution(
+        inputs=inputs,
+        outputs=[artifact_id],
+        properties={
+            'nitroml_wall_time_seconds': wall_time,
+            'nitroml_user_cpu_seconds': wall_time,
+            'nitroml_system_cpu_seconds': wall_time,
+            'nitroml_peak_rss_bytes': peak_rss,
+        })
+    return artifact_id
+
+  def _put_shared_examples(self):
+    """Puts two results whose models are trained on the same examples."""
+    examples = self._put_execution([], wall_time=1800., peak_rss=100)
+    model_1 = self._put_execution([examples], wall_time=900., peak_rss=300)
+    model_2 = self._put_execution([examples], wall_time=3600., peak_rss=200)
+    return model_1, model_2
+
+  def testGetBenchmarkCosts(self):
+    model_1, model_2 = self._put_shared_examples()
+    self._put_execution([model_1], wall_time=0., peak_rss=10, benchmark='One')
+    self._put_execution([model_2], wall_time=0., peak_rss=10, benchmark='Two')
+
+    result = results._get_benchmark_costs(self.store)
+
+    # The usage of the shared examples is split between both results.
+    want_result = results._Result(
+        properties={
+            '0.One': {
+                results.WALL_TIME_KEY: 1800.,
+                results.USER_CPU_KEY: 1800.,
+                results.SYSTEM_CPU_KEY: 1800.,
+                results.CPU_HOURS_KEY: 1.,
+                results.PEAK_RSS_KEY: 300,
+            },
+            '0.Two': {
+                results.WALL_TIME_KEY: 4500.,
+                results.USER_CPU_KEY: 4500.,
+                results.SYSTEM_CPU_KEY: 4500.,
+                results.CPU_HOURS_KEY: 2.5,
+                results.PEAK_RSS_KEY: 200,
+            },
+        },
+        property_names=[
+            results.WALL_TIME_KEY, results.USER_CPU_KEY,
+            results.SYSTEM_CPU_KEY, results.CPU_HOURS_KEY,
+            results.PEAK_RSS_KEY
+        ])
+    self.assertEqual(want_result, result)
+
+  def testSplitsSharedCostsWithResultsWhichAreNotLoaded(self):
+    model_1, model_2 = self._put_shared_examples()
+    result_1 = self._put_execution([model_1],
+                                   wall_time=0.,
+                                   peak_rss=10,
+                                   benchmark='One')
+    self._put_execution([model_2], wall_time=0., peak_rss=10, benchmark='Two')
+
+    result = results._get_benchmark_costs(
+        self.store, self.store.get_artifacts_by_id([result_1]))
+
+    self.assertEqual(['0.One'], list(result.properties))
+    self.assertEqual(1800., result.properties['0.One'][results.WALL_TIME_KEY])
+
+  def testGetAggregateBenchmarkCosts(self):
+    model_1, model_2 = self._put_shared_examples()
+    # A single publisher execution publishes the results of both models.
+    artifact_ids = [
+        self.fake_store.put_artifact(
+            str(i), {results.EVALUATION_ID_KEY: evaluation_id})
+        for i, evaluation_id in enumerate([model_1, model_2])
+    ]
+    self.fake_store.put_execution(
+        inputs=[model_1, model_2], outputs=artifact_ids)
+
+    result = results._get_benchmark_costs(self.store)
+
+    self.assertEqual(1800., result.properties['0.0'][results.WALL_TIME_KEY])
+    self.assertEqual(4500., result.properties['0.1'][results.WALL_TIME_KEY])
+
+  def testCostsAreNotMetrics(self):
+    self._put_execution([], wall_time=1., peak_rss=1, benchmark='One')
+
+    result = results._get_benchmark_results(self.store)
+
+    self.assertEqual(['accuracy'], result.property_names)
+
+
+class IterOverviewTest(parameterized.TestCase):
+  """Tests nitroml.results.iter_overview."""
+
+  @parameterized.named_parameters(
+      ('03-31-20', _MLMD_03_31_20_PATH),
+      ('04-01-20', _MLMD_04_01_20_PATH),
+      ('05-21-20', _MLMD_05_21_20_PATH),
+  )
+  def testMatchesOverview(self, mlmd_store_path):
+    config = metadata_store_pb2.ConnectionConfig()
+    config.sqlite.filename_uri = mlmd_store_path
+    store = metadata_store.MetadataStore(config)
+    want = results.overview(store)
+
+    chunks = list(results.iter_overview(store, chunk_size=2))
+
+    for chunk in chunks:
+      self.assertBetween(len(chunk), 1, 2)
+      self.assertEqual(want.columns.tolist(), chunk.columns.tolist())
+    got = pd.concat(chunks)
+    self.assertCountEqual(want[results.BENCHMARK_FULL_KEY].tolist(),
+                          got[results.BENCHMARK_FULL_KEY].tolist())
+
+  def testInvalidChunkSizeThrows(self):
+    config = metadata_store_pb2.ConnectionConfig()
+    config.fake_database.SetInParent()
+    store = metadata_store.MetadataStore(config)
+    with self.assertRaises(ValueError):
+      next(results.iter_overview(store, chunk_size=0))
+
+
+class StorePoolTest(absltest.TestCase):
+  """Tests concurrent queries with nitroml.results._StorePool."""
+
+  def setUp(self):
+    super(StorePoolTest, self).setUp()
+    self.config = metadata_store_pb2.ConnectionConfig()
+    self.config.sqlite.filename_uri = _MLMD_05_21_20_PATH
+    self.store = metadata_store.MetadataStore(self.config)
+
+  def testRunReturnsResultsInOrder(self):
+    with results._StorePool(self.store, self.config, max_workers=3) as pool:
+      got = pool.run([lambda s, i=i: i for i in range(10)])
+    self.assertEqual(list(range(10)), got)
+
+  def testOverviewWithConnectionConfig(self):
+    want = results.overview(self.store, include_costs=True)
+
+    got = results.overview(
+        self.store,
+        include_costs=True,
+        metadata_connection_config=self.config,
+        max_workers=3)
+
+    self.assertEqual(want.columns.tolist(), got.columns.tolist())
+    self.assertCountEqual(want[results.BENCHMARK_FULL_KEY].tolist(),
+                          got[results.BENCHMARK_FULL_KEY].tolist())
+
+  def testInvalidMaxWorkersThrows(self):
+    with self.assertRaises(ValueError):
+      results._StorePool(self.store, self.config, max_workers=0)
+
+
+class OverviewFilterTest(parameterized.TestCase):
+  """Tests the filters of nitroml.results.overview."""
+
+  def setUp(self):
+    super(OverviewFilterTest, self).setUp()
+    self._make_store()
+
+  def _make_store(self):
+    self.fake_store = _FakeResultStore()
+    self.store = self.fake_store.store
+
+  def _put_results(self, run_id, benchmarks, with_context):
+    context_id = None
+    if with_context:
+      context_id = self.fake_store.put_run_context(run_id)
+    metrics = {metric: 0.5 for metric in ('accuracy', 'auc', 'precision')}
+    for benchmark in benchmarks:
+      self.fake_store.put_result(
+          run_id, benchmark, metrics, context_id=context_id)
+
+  @parameterized.named_parameters(
+      ('run_ids', dict(run_ids=['200']), ['200'], ['A.1', 'B.1']),
+      ('benchmark_regex', dict(benchmark_regex='A'), ['100', '200'],
+       ['A.0', 'A.1']),
+      ('all', dict(run_ids=['100'], benchmark_regex='B'), ['100'], ['B.0']),
+  )
+  def testFilters(self, filters, want_run_ids, want_benchmarks):
+    for with_context in (True, False):
+      self._make_store()
+      self._put_results('100', ['A.0', 'B.0'], with_context)
+      self._put_results('200', ['A.1', 'B.1'], with_context)
+
+      df = results.overview(self.store, **filters)
+
+      self.assertCountEqual(want_run_ids, set(df[results.RUN_ID_KEY]))
+      self.assertCountEqual(want_benchmarks, df[results.BENCHMARK_KEY])
+
+  def testSinceUsesCreationTime(self):
+    for with_context in (True, False):
+      self._make_store()
+      # Kubeflow run ids are not timestamps.
+      self._put_results('kfp-run-1', ['A.0'], with_context)
+
+      df = results.overview(self.store, since=datetime.datetime(2000, 1, 1))
+      self.assertEqual(['A.0'], df[results.BENCHMARK_KEY].tolist())
+
+      df = results.overview(
+          self.store,
+          since=datetime.datetime.now() + datetime.timedelta(days=1))
+      self.assertEmpty(df)
+
+  def testFetchesOnlyMatchingRuns(self):
+    self._put_results('100', ['A.0'], with_context=True)
+    self._put_results('200', ['A.1'], with_context=True)
+    self.store.get_artifacts_by_type = None
+    self.store.get_executions_by_type = None
+
+    df = results.overview(self.store, run_ids=['100'])
+
+    self.assertEqual(['A.0'], df[results.BENCHMARK_KEY].tolist())
+
+
+class OverviewIndexTest(parameterized.TestCase):
+  """Tests nitroml.results.overview with an index_path."""
+
+  def setUp(self):
+    super(OverviewIndexTest, self).setUp()
+    self.index_path = os.path.join(self.create_tempdir().full_path,
+                                   'overview.parquet')
+
+  @parameterized.named_parameters(
+      ('03-31-20', _MLMD_03_31_20_PATH, None),
+      ('04-01-20', _MLMD_04_01_20_PATH, None),
+      ('mean 05-21-20', _MLMD_05_21_20_PATH, ['mean']),
+  )
+  def testMatchesFullScan(self, mlmd_store_path, metric_aggregators):
+    config = metadata_store_pb2.ConnectionConfig()
+    config.sqlite.filename_uri = mlmd_store_path
+    store = metadata_store.MetadataStore(config)
+    want = results.overview(store, metric_aggregators=metric_aggregators)
+
+    # The first call builds the index, the second one only reads it.
+    for _ in range(2):
+      got = results.overview(
+          store,
+          metric_aggregators=metric_aggregators,
+          index_path=self.index_path)
+      self.assertEqual(want.columns.tolist(), got.columns.tolist())
+      self.assertCountEqual(want[results.RUN_ID_KEY].tolist(),
+                            got[results.RUN_ID_KEY].tolist())
+      self.assertCountEqual(want[results.BENCHMARK_KEY].tolist(),
+                            got[results.BENCHMARK_KEY].tolist())
+
+  def testIndexesNewResults(self):
+    fake_store = _FakeResultStore()
+    store = fake_store.store
+
+    def _put_result(benchmark, accuracy):
+      fake_store.put_result(
+          '0',
+          benchmark, {
+              'accuracy': accuracy,
+              'auc': accuracy,
+              'precision': accuracy,
+          },
+          execution_properties={'nitroml_wall_time_seconds': 1.})
+
+    _put_result('One', 0.25)
+    df = results.overview(store, index_path=self.index_path)
+    self.assertEqual(['One'], df[results.BENCHMARK_KEY].tolist())
+
+    _put_result('Two', 0.5)
+    df = results.overview(
+        store, include_costs=True, index_path=self.index_path)
+    self.assertEqual(['One', 'Two'], df[results.BENCHMARK_KEY].tolist())
+    self.assertEqual([0.25, 0.5], df['accuracy'].tolist())
+    self.assertEqual([1., 1.], df[results.WALL_TIME_KEY].tolist())
+
+    # Reading the index does not fetch the results again.
+    store.get_artifacts_by_type = None
+    df = results.overview(store, index_path=self.index_path)
+    self.assertEqual(['One', 'Two'], df[results.BENCHMARK_KEY].tolist())
+    self.assertNotIn(results.WALL_TIME_KEY, df)
+
+  @parameterized.named_parameters(('with_context', True),
+                                  ('without_context', False))
+  def testSinceMatchesFullScan(self, with_context):
+    fake_store = _FakeResultStore()
+    store = fake_store.store
+    # Kubeflow run ids are not timestamps, so runs are dated by their nodes.
+    context_id = None
+    if with_context:
+      context_id = fake_store.put_run_context('kfp-run-1')
+    fake_store.put_result(
+        'kfp-run-1',
+        'A.0', {metric: 0.5 for metric in ('accuracy', 'auc', 'precision')},
+        context_id=context_id)
+
+    since = datetime.datetime(2000, 1, 1)
+    want = results.overview(store, since=since)
+    got = results.overview(store, since=since, index_path=self.index_path)
+    self.assertEqual(['A.0'], want[results.BENCHMARK_KEY].tolist())
+    self.assertEqual(['A.0'], got[results.BENCHMARK_KEY].tolist())
+
+    since = datetime.datetime.now() + datetime.timedelta(days=1)
+    self.assertEmpty(results.overview(store, since=since))
+    self.assertEmpty(
+        results.overview(store, since=since, index_path=self.index_path))
+
+
+class GetModelDirMapTest(absltest.TestCase):
+
+  def setUp(self):
+    super(GetModelDirMapTest, self).setUp()
+    config = metadata_store_pb2.ConnectionConfig()
+    config.fake_database.SetInParent()
+    self.store = metadata_store.MetadataStore(config)
+    exec_type = metadata_store_pb2.ExecutionType()
+    exec_type.name = results._EVALUATOR
+    for name in (results._RUN_ID, results._PIPELINE_ROOT,
+                 results._COMPONENT_ID):
+      exec_type.properties[name] = metadata_store_pb2.STRING
+    self.exec_type_id = self.store.put_execution_type(exec_type)
+    self.pipeline_root = self.create_tempdir().full_path
+
+  def _put_evaluation(self, run_id: str, model_dir: str) -> str:
+    execution = metadata_store_pb2.Execution()
+    execution.type_id = self.exec_type_id
+    execution.properties[results._RUN_ID].string_value = run_id
+    execution.properties[
+        results._PIPELINE_ROOT].string_value = self.pipeline_root
+    execution.properties[results._COMPONENT_ID].string_value = 'Evaluator'
+    execution_id = self.store.put_executions([execution])[0]
+    eval_dir = os.path.join(self.pipeline_root, 'Evaluator', 'evaluation',
+                            str(execution_id))
+    os.makedirs(eval_dir)
+    eval_config_path = os.path.join(eval_dir, 'eval_config.json')
+    with open(eval_config_path, 'w') as f:
+      json.dump({
+          'modelLocations': {
+              '': os.path.join(model_dir, 'serving_model_dir', '1')
+          }
+      }, f)
+    return eval_config_path
+
+  def testGetModelDirMap(self):
+    path_1 = self._put_evaluation('1', '/models/1')
+    path_2 = self._put_evaluation('2', '/models/2')
+
+    want = {'1': ['/models/1'], '2': ['/models/2']}
+    self.assertEqual(want, results.get_model_dir_map(self.store))
+
+    # The model dirs are cached, so the configs are not read again.
+    os.remove(path_1)
+    os.remove(path_2)
+    self.assertEqual(want, results.get_model_dir_map(self.store))
+
+  def testEvictsLeastRecentlyUsedModelDirs(self):
+    cache_size = results._MODEL_DIRS_CACHE_SIZE
+    self.addCleanup(setattr, results, '_MODEL_DIRS_CACHE_SIZE', cache_size)
+    results._MODEL_DIRS_CACHE_SIZE = 1
+    path_1 = self._put_evaluation('1', '/models/1')
+    self._put_evaluation('2', '/models/2')
+    results.get_model_dir_map(self.store)
+
+    # The first evaluation was evicted, so its config is read again.
+    with open(path_1, 'w') as f:
+      json.dump({
+          'modelLocations': {
+              '': os.path.join('/models/3', 'serving_model_dir', '1')
+          }
+      }, f)
+
+    self.assertEqual({
+        '1': ['/models/3'],
+        '2': ['/models/2']
+    }, results.get_model_dir_map(self.store))
+    self.assertLen(results._MODEL_DIRS_CACHE, 1)
+
+
+class ExportTest(parameterized.TestCase):
+  """Tests nitroml.results.export and nitroml.results.load."""
+
+  @parameterized.named_parameters(
+      ('03-31-20', _MLMD_03_31_20_PATH, None),
+      ('mean 04-01-20', _MLMD_04_01_20_PATH, ['mean']),
+      ('05-21-20', _MLMD_05_21_20_PATH, None),
+  )
+  def testLoadExported(self, mlmd_store_path, metric_aggregators):
+    config = metadata_store_pb2.ConnectionConfig()
+    config.sqlite.filename_uri = mlmd_store_path
+    store = metadata_store.MetadataStore(config)
+    path = os.path.join(self.create_tempdir().full_path, 'results.arrow')
+
+    want = results.export(
+        store, path, metric_aggregators=metric_aggregators)
+    got = results.load(path)
+
+    self.assertEqual(want.index.names, got.index.names)
+    self.assertEqual(want.columns.tolist(), got.columns.tolist())
+    pd.testing.assert_frame_equal(want, got, check_dtype=False)
+
+  def testLoadInvalidFileThrows(self):
+    path = self.create_tempfile(content='not arrow').full_path
+    with self.assertRaises(ValueError):
+      results.load(path)
+
+
+class OverviewManyTest(absltest.TestCase):
+  """Tests nitroml.results.overview_many."""
+
+  def _config(self, path):
+    config = metadata_store_pb2.ConnectionConfig()
+    config.sqlite.filename_uri = path
+    return config
+
+  def testMergesStores(self):
+    paths = [_MLMD_04_01_20_PATH, _MLMD_05_21_20_PATH]
+    want = [
+        results.overview(metadata_store.MetadataStore(self._config(path)))
+        for path in paths
+    ]
+
+    df = results.overview_many([self._config(path) for path in paths],
+                               max_workers=2)
+
+    self.assertEqual(results.SOURCE_KEY, df.columns[0])
+    self.assertEqual([len(w) for w in want], [
+        (df[results.SOURCE_KEY] == path).sum() for path in paths
+    ])
+
+  def testDeduplicatesRuns(self):
+    config = self._config(_MLMD_05_21_20_PATH)
+    want = results.overview(metadata_store.MetadataStore(config))
+
+    df = results.overview_many({'first': config, 'copy': config})
+
+    self.assertLen(df, len(want))
+    self.assertEqual({'first'}, set(df[results.SOURCE_KEY]))
+
+  def testAggregatesMergedResults(self):
+    config = self._config(_MLMD_05_21_20_PATH)
+
+    df = results.overview_many([config], metric_aggregators=['mean'])
+
+    self.assertIn(results.SOURCE_KEY, df.columns)
+    self.assertNotIn(results.BENCHMARK_FULL_KEY, df.columns)
+
+  def testNoStores(self):
+    self.assertTrue(results.overview_many([]).empty)
+
+
+class IterNodeBatchesTest(absltest.TestCase):
+  """Tests nitroml.results._iter_node_batches."""
+
+  def _get_nodes(self, list_options):
+    self.assertTrue(list_options.is_asc)
+    last_id = int(list_options.filter_query.split('>')[1])
+    return [
+        metadata_store_pb2.Artifact(id=i)
+        for i in self._ids
+        if i > last_id
+    ][:list_options.limit]
+
+  def testPagesPastGapsInIds(self):
+    self._ids = list(range(1, 1001)) + list(range(3001, 3501)) + [10000]
+
+    batches = list(results._iter_node_batches(self._get_nodes))  # pylint: disable=protected-access
+
+    self.assertEqual([1000, 501], [len(batch) for batch in batches])
+    self.assertEqual(self._ids,
+                     [node.id for batch in batches for node in batch])
+
+  def testStartsAfterLastId(self):
+    self._ids = [1, 2, 5000]
+
+    batches = list(results._iter_node_batches(self._get_nodes, 2))  # pylint: disable=protected-access
+
+    self.assertEqual([[5000]], [[node.id for node in b] for b in batches])
+
+
+class LeaderboardTest(absltest.TestCase):
+  """Tests nitroml.results.Leaderboard."""
+
+  def setUp(self):
+    super(LeaderboardTest, self).setUp()
+    self.fake_store = _FakeResultStore()
+    self.store = self.fake_store.store
+
+  def _put_result(self, benchmark, accuracy, state='published'):
+    return self.fake_store.put_artifact(benchmark, {
+        'state': state,
+        results.RUN_KEY: 1,
+        'accuracy': accuracy,
+    })
+
+  def testUpdate(self):
+    leaderboard = results.Leaderboard()
+    self._put_result('A.run_1_of_2', 0.5)
+    self._put_result('B.run_1_of_1', 0.25)
+    self.assertEqual(2, leaderboard.update(self.store))
+    self._put_result('A.run_2_of_2', 1.)
+    self.assertEqual(1, leaderboard.update(self.store))
+    self.assertEqual(0, leaderboard.update(self.store))
+
+    df = leaderboard.to_dataframe()
+
+    self.assertEqual(['A', 'B'], df.index.tolist())
+    self.assertEqual(['accuracy count', 'accuracy mean', 'accuracy variance'],
+                     df.columns.tolist())
+    self.assertEqual([2, 1], df['accuracy count'].tolist())
+    self.assertEqual([0.75, 0.25], df['accuracy mean'].tolist())
+    self.assertAlmostEqual(0.125, df.loc['A', 'accuracy variance'])
+
+  def testRevisitsPendingResults(self):
+    leaderboard = results.Leaderboard()
+    self._put_result('A', 0.5)
+    pending_id = self._put_result('B', 0.5, state='pending')
+    last_id = self._put_result('C', 0.5)
+
+    self.assertEqual(2, leaderboard.update(self.store))
+    self.assertEqual(last_id, leaderboard.last_artifact_id)
+    self.assertEqual({pending_id}, leaderboard.pending_artifact_ids)
+
+    [artifact] = self.store.get_artifacts_by_id([pending_id])
+    artifact.custom_properties['state'].string_value = 'published'
+    self.store.put_artifacts([artifact])
+
+    self.assertEqual(1, leaderboard.update(self.store))
+    self.assertEmpty(leaderboard.pending_artifact_ids)
+    self.assertEqual(['A', 'B', 'C'], leaderboard.to_dataframe().index.tolist())
+
+  def testDropsPendingResultsOfFinishedExecutions(self):
+    leaderboard = results.Leaderboard()
+    failed_id = self.fake_store.put_result('0', 'A', {'state': 'pending'})
+    running_id = self.fake_store.put_result('0', 'B', {'state': 'pending'})
+    executions = self.store.get_executions()
+    executions[0].last_known_state = metadata_store_pb2.Execution.FAILED
+    executions[1].last_known_state = metadata_store_pb2.Execution.RUNNING
+    self.store.put_executions(executions)
+
+    self.assertEqual(0, leaderboard.update(self.store))
+    self.assertEqual(running_id, leaderboard.last_artifact_id)
+    self.assertEqual({running_id}, leaderboard.pending_artifact_ids)
+    self.assertNotIn(failed_id, leaderboard.pending_artifact_ids)
+
+  def testSkipsResultsInFinalStates(self):
+    leaderboard = results.Leaderboard()
+    self._put_result('A', 0.5, state='deleted')
+    self._put_result('B', 0.5, state='marked_for_deletion')
+    last_id = self._put_result('C', 0.5)
+
+    self.assertEqual(1, leaderboard.update(self.store))
+    self.assertEqual(last_id, leaderboard.last_artifact_id)
+    self.assertEqual(['C'], leaderboard.to_dataframe().index.tolist())
+
+  def testSaveAndLoad(self):
+    path = os.path.join(self.create_tempdir().full_path, 'leaderboard.json')
+    leaderboard = results.Leaderboard()
+    self._put_result('A', 0.5)
+    leaderboard.update(self.store)
+    leaderboard.save(path)
+
+    loaded = results.Leaderboard.load(path)
+    self._put_result('A', 1.)
+
+    self.assertEqual(1, loaded.update(self.store))
+    self.assertEqual([0.75], loaded.to_dataframe()['accuracy mean'].tolist())
+
+  def testSaveAndLoadPendingResults(self):
+    path = os.path.join(self.create_tempdir().full_path, 'leaderboard.json')
+    leaderboard = results.Leaderboard()
+    pending_id = self._put_result('A', 0.5, state='pending')
+    leaderboard.update(self.store)
+    leaderboard.save(path)
+
+    loaded = results.Leaderboard.load(path)
+
+    self.assertEqual({pending_id}, loaded.pending_artifact_ids)
+
+
+class GetSliceMetricsTest(absltest.TestCase):
+
+  def setUp(self):
+    super(GetSliceMetricsTest, self).setUp()
+    self.fake_store = _FakeResultStore()
+    self.store = self.fake_store.store
+
+  def _put_result(self, run_id, benchmark, accuracies=None):
+    uri = self.create_tempdir().full_path
+    self.fake_store.put_result(run_id, benchmark, uri=uri)
+    if accuracies is not None:
+      np.savez_compressed(
+          os.path.join(uri, results.SLICE_METRICS_FILENAME),
+          slice=np.array(['Overall'] * len(accuracies)),
+          output_name=np.array([''] * len(accuracies)),
+          sub_key=np.array([f'classId:{i}' for i in range(len(accuracies))]),
+          metric=np.array(['accuracy'] * len(accuracies)),
+          value=np.array(accuracies, dtype=np.float64))
+
+  def testGetSliceMetrics(self):
+    self._put_result('0', 'A.run_1_of_1', [0.25, 0.75])
+    self._put_result('1', 'B', [0.5])
+    self._put_result('2', 'C')
+
+    df = results.get_slice_metrics(self.store, benchmark_regex='A|C')
+
+    self.assertEqual([
+        results.RUN_ID_KEY, results.BENCHMARK_KEY, results.BENCHMARK_FULL_KEY
+    ] + list(results.SLICE_METRICS_COLUMNS), df.columns.tolist())
+    self.assertEqual(['A', 'A'], df[results.BENCHMARK_KEY].tolist())
+    self.assertEqual(['0', '0'], df[results.RUN_ID_KEY].tolist())
+    self.assertEqual(['classId:0', 'classId:1'],
+                     df[results.SUB_KEY].tolist())
+    self.assertEqual([0.25, 0.75], df[results.VALUE_KEY].tolist())
+
+  def testGetSliceMetricsWithoutResults(self):
+    df = results.get_slice_metrics(self.store)
+
+    self.assertTrue(df.empty)
+
+
+class GetPlotsTest(absltest.TestCase):
+
+  def setUp(self):
+    super(GetPlotsTest, self).setUp()
+    self.fake_store = _FakeResultStore()
+    self.store = self.fake_store.store
+
+  def testGetPlots(self):
+    evaluation_id = self.fake_store.put_artifact(uri=_EVALUATION_PATH)
+    self.fake_store.put_result('0', 'A.run_1_of_1',
+                               {results.EVALUATION_ID_KEY: evaluation_id})
+    # Results without an evaluation id are skipped.
+    self.fake_store.put_result('0', 'B')
+
+    df = results.get_plots(self.store)
+
+    self.assertEqual([
+        results.RUN_ID_KEY, results.BENCHMARK_KEY, results.BENCHMARK_FULL_KEY,
+        results.SLICE_KEY, results.PLOTS_KEY
+    ], df.columns.tolist())
+    self.assertNotEmpty(df)
+    self.assertEqual({'A'}, set(df[results.BENCHMARK_KEY]))
+    self.assertIn('Overall', df[results.SLICE_KEY].tolist())
+
+  def testGetPlotsWithoutResults(self):
+    df = results.get_plots(self.store)
+
+    self.assertTrue(df.empty)
+
+
 class GetStatisticsGenDirectoryTest(absltest.TestCase):
 
   def setUp(self):
@@ -0,0 +1,166 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+# Lint as: python3
+"""A process which serves a leaderboard of the results of an MLMD store.
+
+The watcher tails the benchmark results published to the store, updates a
+`nitroml.results.Leaderboard` with only the new ones, and writes it to a JSON
+file. It can also serve the leaderboard as JSON over HTTP. Each poll costs the
+same whatever the length of the store's history, so campaigns can be
+monitored while they run:
+
+  python -m nitroml.results_watcher \
+      --mlmd_sqlite=/tmp/nitroml/mlmd.sqlite \
+      --leaderboard_path=/tmp/nitroml/leaderboard.json \
+      --port=8080
+
+The leaderboard file is reloaded when the watcher restarts, so that it resumes
+from the last result which it processed.
+"""
+
+from http import server
+import os
+import threading
+import time
+from typing import Optional, Text
+
+from absl import app
+from absl import flags
+from absl import logging
+from nitroml import results
+
+from ml_metadata import metadata_store
+from ml_metadata.proto import metadata_store_pb2
+
+FLAGS = flags.FLAGS
+
+flags.DEFINE_string("mlmd_sqlite", None,
+                    "Path to the SQLite MLMD store to watch.")
+flags.DEFINE_string("leaderboard_path", None,
+                    "Path to the JSON file where the leaderboard is saved, and "
+                    "from which it is resumed.")
+flags.DEFINE_integer(
+    "port", None, "Optional port on which to serve the leaderboard as JSON "
+    "over HTTP.")
+flags.DEFINE_string(
+    "host", "localhost", "The host on which to serve the leaderboard. Pass an "
+    "empty string to serve it on all interfaces, e.g. to other machines.")
+flags.DEFINE_float("poll_interval_seconds", 10.,
+                   "The number of seconds between polls of the store.")
+
+
+class _LeaderboardHandler(server.BaseHTTPRequestHandler):
+  """Serves the leaderboard as a JSON object with a key per benchmark."""
+
+  leaderboard = None  # type: results.Leaderboard
+
+  def do_GET(self):  # pylint: disable=invalid-name
+    df = self.leaderboard.to_dataframe()
+    body = df.to_json(orient="index").encode("utf-8")
+    self.send_response(200)
+    self.send_header("Content-Type", "application/json")
+    self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+    logging.debug(format, *args)
+
+
+def serve(leaderboard: results.Leaderboard,
+          port: int,
+          host: Text = "localhost") -> server.HTTPServer:
+  """Serves the leaderboard over HTTP on `port` from a daemon thread.
+
+  Args:
+    leaderboard: The leaderboard to serve.
+    port: The port on which to serve.
+    host: The host on which to serve. Defaults to the loopback interface, so
+      that the leaderboard is only served to the local machine. An empty string
+      serves it on all interfaces.
+
+  Returns:
+    The running HTTP server.
+  """
+
+  handler = type("LeaderboardHandler", (_LeaderboardHandler,),
+                 {"leaderboard": leaderboard})
+  http_server = server.ThreadingHTTPServer((host, port), handler)
+  thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+  thread.start()
+  logging.info("Serving the leaderboard on %s:%d.", host or "*",
+               http_server.server_address[1])
+  return http_server
+
+
+def watch(store: metadata_store.MetadataStore,
+          leaderboard: results.Leaderboard,
+          leaderboard_path: Optional[Text] = None,
+          poll_interval_seconds: float = 10.,
+          max_polls: Optional[int] = None) -> None:
+  """Polls the store, updating and saving the leaderboard with new results.
+
+  Args:
+    store: MetaDataStore object for connecting to an MLMD instance.
+    leaderboard: The leaderboard to update.
+    leaderboard_path: Optional path to the JSON file where the leaderboard is
+      saved when it changes, including when it only skips past artifacts.
+    poll_interval_seconds: The number of seconds between polls.
+    max_polls: Optional maximum number of polls. Defaults to polling forever.
+
+  Raises:
+    ValueError: If `poll_interval_seconds` is negative.
+  """
+
+  if poll_interval_seconds < 0:
+    raise ValueError("poll_interval_seconds must be positive; "
+                     f"got poll_interval_seconds={poll_interval_seconds} "
+                     "instead.")
+  num_polls = 0
+  while max_polls is None or num_polls < max_polls:
+    if num_polls:
+      time.sleep(poll_interval_seconds)
+    num_polls += 1
+    cursor = (leaderboard.last_artifact_id, leaderboard.pending_artifact_ids)
+    num_results = leaderboard.update(store)
+    if num_results:
+      logging.info("Added %d new results to the leaderboard.", num_results)
+    elif cursor == (leaderboard.last_artifact_id,
+                    leaderboard.pending_artifact_ids):
+      continue
+    if leaderboard_path:
+      leaderboard.save(leaderboard_path)
+
+
+def _main(argv):
+  del argv  # Unused.
+
+  config = metadata_store_pb2.ConnectionConfig()
+  config.sqlite.filename_uri = FLAGS.mlmd_sqlite
+  store = metadata_store.MetadataStore(config)
+  leaderboard = results.Leaderboard()
+  if FLAGS.leaderboard_path and os.path.exists(FLAGS.leaderboard_path):
+    leaderboard = results.Leaderboard.load(FLAGS.leaderboard_path)
+    logging.info("Resuming the leaderboard after artifact %d.",
+                 leaderboard.last_artifact_id)
+  if FLAGS.port is not None:
+    serve(leaderboard, FLAGS.port, FLAGS.host)
+  watch(store, leaderboard, FLAGS.leaderboard_path,
+        FLAGS.poll_interval_seconds)
+
+
+if __name__ == "__main__":
+  flags.mark_flag_as_required("mlmd_sqlite")
+  app.run(_main)
@@ -0,0 +1,93 @@
+# Copyright 2020 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+# Lint as: python3
+"""Tests for nitroml.results_watcher."""
+
+import json
+import os
+from urllib import request
+
+from absl.testing import absltest
+from nitroml import results
+from nitroml import results_watcher
+
+from ml_metadata import metadata_store
+from ml_metadata.proto import metadata_store_pb2
+
+
+class ResultsWatcherTest(absltest.TestCase):
+
+  def setUp(self):
+    super(ResultsWatcherTest, self).setUp()
+    config = metadata_store_pb2.ConnectionConfig()
+    config.fake_database.SetInParent()
+    self.store = metadata_store.MetadataStore(config)
+    artifact_type = metadata_store_pb2.ArtifactType()
+    artifact_type.name = results._BENCHMARK_RESULT
+    artifact = metadata_store_pb2.Artifact()
+    artifact.type_id = self.store.put_artifact_type(artifact_type)
+    artifact.custom_properties[results.BENCHMARK_KEY].string_value = 'A'
+    artifact.custom_properties['accuracy'].double_value = 0.5
+    self.store.put_artifacts([artifact])
+
+  def testWatchSavesLeaderboard(self):
+    path = os.path.join(self.create_tempdir().full_path, 'leaderboard.json')
+    leaderboard = results.Leaderboard()
+
+    results_watcher.watch(
+        self.store,
+        leaderboard,
+        path,
+        poll_interval_seconds=0.,
+        max_polls=2)
+
+    loaded = results.Leaderboard.load(path)
+    self.assertEqual(leaderboard.last_artifact_id, loaded.last_artifact_id)
+    self.assertEqual([0.5], loaded.to_dataframe()['accuracy mean'].tolist())
+
+  def testWatchSavesCursorPastSkippedArtifacts(self):
+    path = os.path.join(self.create_tempdir().full_path, 'leaderboard.json')
+    leaderboard = results.Leaderboard()
+    results_watcher.watch(self.store, leaderboard, path, max_polls=1)
+    artifact_type = metadata_store_pb2.ArtifactType()
+    artifact_type.name = 'Examples'
+    artifact = metadata_store_pb2.Artifact()
+    artifact.type_id = self.store.put_artifact_type(artifact_type)
+    [artifact_id] = self.store.put_artifacts([artifact])
+
+    results_watcher.watch(self.store, leaderboard, path, max_polls=1)
+
+    loaded = results.Leaderboard.load(path)
+    self.assertEqual(artifact_id, loaded.last_artifact_id)
+
+  def testServe(self):
+    leaderboard = results.Leaderboard()
+    leaderboard.update(self.store)
+    http_server = results_watcher.serve(leaderboard, port=0)
+    self.addCleanup(http_server.shutdown)
+
+    url = f'http://localhost:{http_server.server_address[1]}/'
+    with request.urlopen(url) as response:
+      body = json.loads(response.read())
+
+    self.assertEqual({'A': {
+        'accuracy count': 1,
+        'accuracy mean': 0.5,
+        'accuracy variance': None
+    }}, body)
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -15,8 +15,18 @@
 # Lint as: python3
 """Package nitroml.suites."""
 
-from nitroml.suites.openml_cc18 import OpenMLCC18
-from nitroml.suites.suite import Suite
+import typing
+
+from nitroml import _lazy
+
+if typing.TYPE_CHECKING:
+  from nitroml.suites.openml_cc18 import OpenMLCC18
+  from nitroml.suites.suite import Suite
+
+__getattr__, __dir__ = _lazy.attach(__name__, {
+    "OpenMLCC18": "nitroml.suites.openml_cc18",
+    "Suite": "nitroml.suites.suite",
+})
 
 __all__ = [
     "OpenMLCC18",
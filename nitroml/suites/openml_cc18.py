@@ -20,7 +20,7 @@ import datetime
 import functools
 import json
 import os
-from typing import Any, Dict, List, Iterator
+from typing import Any, Callable, Dict, List, Iterator, Optional
 
 from absl import logging
 from nitroml.suites import data_utils
@@ -33,6 +33,8 @@ _OPENML_API_URL = 'https://www.openml.org/api/v1/json'
 _OPENML_FILE_API_URL = 'https://www.openml.org/data/v1'
 _DATASET_FILTERS = ['status=active', 'tag=OpenML-CC18']
 _OPENML_API_KEY = 'OPENML_API_KEY'
+_DOWNLOAD_CHUNK_BYTES = 2**20
+_WRITE_BUFFER_CHARS = 2**22
 
 
 class OpenMLCC18(suite.Suite):
@@ -41,6 +43,11 @@ class OpenMLCC18(suite.Suite):
   The object downloads the suite of OpenML-CC18 datasets provided by OpenML
   and creates the ExampleGen components from the raw CSV files which can be
   used in a TFX pipeline.
+
+  When a `task_filter` is given, only the datasets of the tasks whose names
+  pass the filter are downloaded and iterated over. For example, passing
+  `task_filter=self.matches_sub_benchmark` from a `nitroml.Benchmark` skips
+  the datasets of the sub-benchmarks which `--match` rules out.
   """
 
   def __init__(self,
@@ -48,7 +55,8 @@ class OpenMLCC18(suite.Suite):
                api_key: str = None,
                use_cache: bool = True,
                max_threads: int = 1,
-               mock_data: bool = False):
+               mock_data: bool = False,
+               task_filter: Optional[Callable[[str], bool]] = None):
 
     if max_threads <= 0:
       raise ValueError('Number of threads should be greater than 0.')
@@ -66,9 +74,12 @@ class OpenMLCC18(suite.Suite):
     self.root_dir = os.path.join(root_dir, 'openML_datasets')
     self.max_threads = max_threads
     self.api_key = api_key
+    self._task_filter = task_filter
     if use_cache:
 
-      if tf.io.gfile.exists(self.root_dir):
+      # Filtered suites may have been cached partially, so the datasets which
+      # pass the filter and are missing from the cache are downloaded.
+      if tf.io.gfile.exists(self.root_dir) and task_filter is None:
         logging.info('The directory %s exists. %d datasets found',
                      self.root_dir, len(tf.io.gfile.listdir(self.root_dir)))
       else:
@@ -108,7 +119,8 @@ class OpenMLCC18(suite.Suite):
 
     tasks = []
     for dataset_name in tf.io.gfile.listdir(self.root_dir):
-      tasks.append(self._load_task(dataset_name))
+      if self._matches(dataset_name):
+        tasks.append(self._load_task(dataset_name))
 
     return tasks
 
@@ -124,6 +136,11 @@ class OpenMLCC18(suite.Suite):
         data_utils.parse_dataset_filters(_DATASET_FILTERS))
     logging.info('There are %s datasets.', len(datasets))
     datasets = self._latest_version_only(datasets)
+    datasets = [
+        dataset for dataset in datasets
+        if self._matches(dataset['name']) and
+        not tf.io.gfile.exists(self._task_path(dataset['name']))
+    ]
 
     parallel_fns = [
         functools.partial(self._dump_dataset, dataset, self.root_dir)
@@ -169,6 +186,19 @@ class OpenMLCC18(suite.Suite):
     logging.info('Done! Succeeded=%s, failed=%s, skipped=%s', succeeded,
                  len(failed), skipped)
 
+  def _matches(self, dataset_name: str) -> bool:
+    """Returns whether the task of the dataset passes the task filter."""
+
+    if self._task_filter is None:
+      return True
+    # Matches the name of the `OpenMLTask` created by `_load_task`.
+    task_name = (
+        f'OpenML.{data_utils.convert_to_valid_identifier(dataset_name)}')
+    return self._task_filter(task_name)
+
+  def _task_path(self, dataset_name: str) -> str:
+    return os.path.join(self.root_dir, dataset_name, 'task', 'task.json')
+
   def _list_datasets(self, filters: Dict[str, str]) -> List[Any]:
     """Returns the list of names of all `active` datasets.
 
@@ -280,6 +310,7 @@ class OpenMLCC18(suite.Suite):
     """Downloads the  OpenML dataset corresponding to `file_id`.
 
     Note: The OpenML `file_id` does not correspond to the OpenML `dataset_id`.
+    The whole CSV is held in memory; prefer `iter_csv_lines` for large datasets.
 
     Args:
       file_id: The id of the file to download from OpenML.
@@ -288,14 +319,51 @@ class OpenMLCC18(suite.Suite):
       The downloaded CSV.
     """
 
-    resp = data_utils.get(f'{_OPENML_FILE_API_URL}/get_csv/{file_id}')
-    resp = resp.text.replace(', ', ',').replace(' ,', ',')
-    return resp
+    return '\n'.join(self.iter_csv_lines(file_id))
+
+  def iter_csv_lines(self, file_id: str) -> Iterator[str]:
+    """Streams the lines of the OpenML dataset corresponding to `file_id`.
+
+    The response body is read in chunks, so memory usage does not depend on the
+    size of the dataset. Spaces around the separators are removed.
+
+    Args:
+      file_id: The id of the file to download from OpenML.
+
+    Yields:
+      The lines of the downloaded CSV, without line terminators.
+    """
+
+    resp = data_utils.get(
+        f'{_OPENML_FILE_API_URL}/get_csv/{file_id}', stream=True)
+    # OpenML serves UTF-8, which is decoded unless the response declares another
+    # charset. Without one, `resp.encoding` defaults to ISO-8859-1 for text
+    # responses, and `resp.apparent_encoding` would read the whole body.
+    encoding = 'utf-8'
+    if 'charset' in resp.headers.get('content-type', '').lower():
+      encoding = resp.encoding
+
+    def _decode(line: bytes) -> str:
+      line = line.rstrip(b'\r').decode(encoding)
+      return line.replace(', ', ',').replace(' ,', ',')
+
+    # Lines are split on b'\n' explicitly, since `resp.iter_lines` yields an
+    # extra empty line when a b'\r\n' terminator spans two chunks.
+    with resp:
+      partial_line = b''
+      for chunk in resp.iter_content(chunk_size=_DOWNLOAD_CHUNK_BYTES):
+        lines = (partial_line + chunk).split(b'\n')
+        partial_line = lines.pop()
+        for line in lines:
+          yield _decode(line)
+      if partial_line:
+        yield _decode(partial_line)
 
   def _download_dataset(self, file_id: str, dataset_dir: str) -> Dict[str, Any]:
     """Downloads the OpenML dataset in CSV format.
 
-    The columns are renamed to be valid python identifiers.
+    The columns are renamed to be valid python identifiers. The CSV is streamed
+    to disk, so memory usage does not depend on the size of the dataset.
 
     Args:
       file_id: The OpenML file_id of the dataset to download.
@@ -305,24 +373,34 @@ class OpenMLCC18(suite.Suite):
       A dictionary of <original column name> -> <renamed column name>.
     """
 
-    csv = self.get_csv(file_id)
+    dataset_dir = os.path.join(dataset_dir, 'data')
+    if not tf.io.gfile.isdir(dataset_dir):
+      tf.io.gfile.makedirs(dataset_dir)
+
+    lines = self.iter_csv_lines(file_id)
+    columns = next(lines, '').split(',')
 
     # Rename the columns in the CSV to be valid python identifiers. This ensures
     # the column names (and label in the problem_statement proto) are the same
     # for both the CSV and the tf.Example datasets.
-    csv = csv.split('\n')
-    columns = csv[0].split(',')
     column_rename_dict = data_utils.rename_columns(columns)
-    csv[0] = ','.join([column_rename_dict[column] for column in columns])
-    csv = '\n'.join(csv)
-
-    dataset_dir = os.path.join(dataset_dir, 'data')
-    if not tf.io.gfile.isdir(dataset_dir):
-      tf.io.gfile.makedirs(dataset_dir)
 
     csv_path = os.path.join(dataset_dir, 'dataset.csv')
     with tf.io.gfile.GFile(csv_path, mode='w') as fout:
-      fout.write(csv)
+      fout.write(','.join([column_rename_dict[column] for column in columns]))
+      fout.write('\n')
+      # Lines are batched, since each GFile write is a call into TensorFlow.
+      buffer = []
+      buffer_size = 0
+      for line in lines:
+        buffer.append(line)
+        buffer.append('\n')
+        buffer_size += len(line) + 1
+        if buffer_size >= _WRITE_BUFFER_CHARS:
+          fout.write(''.join(buffer))
+          buffer = []
+          buffer_size = 0
+      fout.write(''.join(buffer))
 
     return column_rename_dict
 
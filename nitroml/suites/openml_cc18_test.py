@@ -51,6 +51,79 @@ class OpenMLCC18Test(parameterized.TestCase, absltest.TestCase):
 
     self.assertNotEmpty(list(suite))
 
+  def test_task_filter(self):
+    root_dir = self.create_tempdir().full_path
+    with requests_mock.Mocker() as mocker:
+      testing_utils.register_mock_urls(mocker)
+      suite = openml_cc18.OpenMLCC18(
+          root_dir,
+          mock_data=True,
+          task_filter=lambda name: name == 'OpenML.mockdata_1')
+      downloaded = [
+          request.url for request in mocker.request_history
+          if '/get_csv/' in request.url
+      ]
+
+    self.assertEqual(['OpenML.mockdata_1'], [task.name for task in suite])
+    self.assertLen(downloaded, 1)
+
+  def test_download_dataset_streams_csv(self):
+    root_dir = self.create_tempdir().full_path
+    # An existing cache prevents the suite from downloading every dataset.
+    os.makedirs(os.path.join(root_dir, 'openML_datasets'))
+    suite = openml_cc18.OpenMLCC18(root_dir, use_cache=True, mock_data=True)
+    dataset_dir = os.path.join(root_dir, 'dataset')
+    csv_url = f'{openml_cc18._OPENML_FILE_API_URL}/get_csv/1'  # pylint: disable=protected-access
+
+    with requests_mock.Mocker() as mocker:
+      mocker.get(csv_url, text='"a b", "1c"\n0 ,1\n2, 3\n')
+      column_rename_dict = suite._download_dataset('1', dataset_dir)  # pylint: disable=protected-access
+
+    self.assertEqual({'"a b"': 'ab', '"1c"': 'c'}, column_rename_dict)
+    with open(os.path.join(dataset_dir, 'data', 'dataset.csv')) as fin:
+      self.assertEqual('ab,c\n0,1\n2,3\n', fin.read())
+
+  def _make_suite(self):
+    root_dir = self.create_tempdir().full_path
+    # An existing cache prevents the suite from downloading every dataset.
+    os.makedirs(os.path.join(root_dir, 'openML_datasets'))
+    return openml_cc18.OpenMLCC18(root_dir, use_cache=True, mock_data=True)
+
+  @parameterized.named_parameters(
+      ('without_content_type', {}, 'caf\xe9, b\n'.encode('utf-8')),
+      ('without_charset', {
+          'Content-Type': 'text/csv'
+      }, 'caf\xe9, b\n'.encode('utf-8')),
+      ('with_charset', {
+          'Content-Type': 'text/csv; charset=ISO-8859-1'
+      }, b'caf\xe9, b\n'),
+  )
+  def test_iter_csv_lines_encoding(self, headers, content):
+    suite = self._make_suite()
+    csv_url = f'{openml_cc18._OPENML_FILE_API_URL}/get_csv/1'  # pylint: disable=protected-access
+
+    with requests_mock.Mocker() as mocker:
+      mocker.get(csv_url, content=content, headers=headers)
+      lines = list(suite.iter_csv_lines('1'))
+
+    self.assertEqual(['caf\xe9,b'], lines)
+
+  def test_iter_csv_lines_across_chunks(self):
+    suite = self._make_suite()
+    csv_url = f'{openml_cc18._OPENML_FILE_API_URL}/get_csv/1'  # pylint: disable=protected-access
+    content = b'a,b\r\n1,2\r\n3,4'
+    chunk_bytes = openml_cc18._DOWNLOAD_CHUNK_BYTES  # pylint: disable=protected-access
+    self.addCleanup(setattr, openml_cc18, '_DOWNLOAD_CHUNK_BYTES', chunk_bytes)
+    openml_cc18._DOWNLOAD_CHUNK_BYTES = 4  # pylint: disable=protected-access
+
+    with requests_mock.Mocker() as mocker:
+      mocker.get(csv_url, content=content)
+      lines = list(suite.iter_csv_lines('1'))
+
+    # The first chunk ends between b'\r' and b'\n'.
+    self.assertEqual(b'a,b\r', content[:4])
+    self.assertEqual(['a,b', '1,2', '3,4'], lines)
+
 
 if __name__ == '__main__':
   absltest.main()
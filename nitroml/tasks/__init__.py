@@ -15,9 +15,20 @@
 # Lint as: python3
 """Package nitroml.tasks."""
 
-from nitroml.tasks.openml_task import OpenMLTask
-from nitroml.tasks.task import Task
-from nitroml.tasks.tfds_task import TFDSTask
+import typing
+
+from nitroml import _lazy
+
+if typing.TYPE_CHECKING:
+  from nitroml.tasks.openml_task import OpenMLTask
+  from nitroml.tasks.task import Task
+  from nitroml.tasks.tfds_task import TFDSTask
+
+__getattr__, __dir__ = _lazy.attach(__name__, {
+    "OpenMLTask": "nitroml.tasks.openml_task",
+    "Task": "nitroml.tasks.task",
+    "TFDSTask": "nitroml.tasks.tfds_task",
+})
 
 __all__ = [
     "OpenMLTask",